@@ -0,0 +1,389 @@
+"""
+Moteur d'analyse locale de l'assistant IA
+=========================================
+
+Répond sans appel à OpenAI, en quelques millisecondes, aux questions
+structurées sur le classeur :
+
+- « Quelle solution répond au plus d'exigences dans le domaine Sécurité ? »
+- « Quelle est la solution la moins chère sur 5 ans ? » (coût total de possession)
+- « Quelles entreprises ont leur siège au Québec ? »
+- « Combien d'exigences / d'entreprises / de solutions ? »
+
+Une petite grammaire d'intentions (formes de question complètes, sans
+accents) oriente la question vers des agrégats précalculés une fois par jeu
+de données : scores de couverture par entreprise et par domaine, coûts
+initiaux et récurrents, localisations. Une question qui ne correspond
+entièrement à aucune forme (mot en trop, qualificatif, domaine inconnu)
+reste confiée au modèle.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from app.utils import dataframe_fingerprint, ANSWER_LOOKUP, ANSWER_YES, ANSWER_PARTIAL, NA_STRINGS
+
+# =================== CONFIGURATION ===================
+SHEETS_COMPARATIVE = ["Analyse comparative", "Comparatif"]
+SHEETS_COMPANIES = ["Entreprise", "Entreprises"]
+SHEETS_SOLUTIONS = ["Solution", "Solutions"]
+
+COMPARISON_BASE_COLUMNS = ["Type d'exigence", "Domaine", "Exigence différenciateur", "Exigence", "Description", "Catégorie"]
+COMPARISON_INFO_MARKER = "Information complémentaire"
+COLUMN_DOMAIN = "Domaine"
+ANSWER_SCORES = {ANSWER_YES: 1.0, ANSWER_PARTIAL: 0.5}
+
+DEFAULT_TCO_YEARS = 5
+DEFAULT_TOP_N = 5
+MAX_TOP_N = 20
+ENGINE_CACHE_MAX = 4
+_ENGINE_CACHE = OrderedDict()
+_ENGINE_CACHE_LOCK = threading.Lock()
+
+# Grammaire d'intentions (appliquée à la question en minuscules sans accents)
+INTENT_BEST_COVERAGE = "couverture"
+INTENT_CHEAPEST_TCO = "tco"
+INTENT_LOCATION = "localisation"
+INTENT_COUNT = "denombrement"
+
+# Chaque intention est décrite par des formes de question complètes (fullmatch) :
+# s'il reste le moindre mot hors de la forme, la question est confiée au modèle.
+_WHICH = r"(?:quel(?:le)?s? (?:(?:est|sont) )?(?:(?:la|les) |l')?)"
+_TOP_N = r"(?:(?P<n>\d{1,2}) )?"
+_YEARS = r"(?: (?:sur|over) (?P<years>\d{1,2}) (?:ans|annees|years))?"
+_COVERAGE_SUBJECT = r"(?P<subject>entreprises?|solutions?|fournisseurs?)"
+_COVERAGE_VERB = r"(?:qui )?(?:repond(?:ent)?|satisfai(?:t|sent)|couvre(?:nt)?|rempli(?:t|ssent))"
+_COVERAGE_DOMAIN = r"(?: (?:dans|pour|en) (?:le |la |les |l')?(?:domaine )?(?P<domain>[a-z0-9][a-z0-9' -]*))?"
+_PLACE = r"(?:au|aux|a|en|dans le|dans la|dans les) (?P<place>[a-z][a-z' -]*)"
+
+INTENT_GRAMMAR = [
+    (INTENT_COUNT, re.compile(
+        r"combien (?:y a-t-il )?(?:d'|de |des )(?P<what>exigences|criteres|entreprises|solutions|domaines)(?: y a-t-il| au total)?"
+    )),
+    (INTENT_COUNT, re.compile(
+        r"(?:quel est le )?nombre (?:total )?(?:d'|de |des )(?P<what>exigences|criteres|entreprises|solutions|domaines)"
+    )),
+    (INTENT_COUNT, re.compile(r"how many (?P<what>requirements|companies|solutions|domains)(?: are there)?")),
+    (INTENT_BEST_COVERAGE, re.compile(
+        _WHICH + _TOP_N + _COVERAGE_SUBJECT + " " + _COVERAGE_VERB
+        + r" (?:a |aux |au |le )?(?:le )?plus (?:d'|de |grand nombre d')?exigences" + _COVERAGE_DOMAIN
+    )),
+    (INTENT_BEST_COVERAGE, re.compile(
+        _WHICH + _TOP_N + _COVERAGE_SUBJECT + r" (?:qui )?(?:a|ont|offre|offrent) la meilleure couverture des exigences"
+        + _COVERAGE_DOMAIN
+    )),
+    (INTENT_BEST_COVERAGE, re.compile(
+        r"which (?P<subject>company|solution) meets the most requirements(?: in (?:the )?(?:domaine? )?(?P<domain>[a-z0-9][a-z0-9' -]*))?"
+    )),
+    (INTENT_CHEAPEST_TCO, re.compile(
+        _WHICH + _TOP_N + r"solutions? (?:la |les )?moins (?:chere?s?|couteuse?s?)" + _YEARS
+    )),
+    (INTENT_CHEAPEST_TCO, re.compile(
+        _WHICH + r"solution (?:qui )?a le (?:cout total de possession|cout total|tco) le plus (?:bas|faible)" + _YEARS
+    )),
+    (INTENT_CHEAPEST_TCO, re.compile(r"(?:the )?cheapest (?:(?P<years>\d{1,2})[ -]years? )?tco")),
+    (INTENT_LOCATION, re.compile(
+        _WHICH + r"entreprises? (?:qui )?(?:ont (?:leur|son) siege(?: social)?|a son siege(?: social)?"
+        r"|(?:est|sont) (?:situees?|basees?|localisees?|implantees?)|dont le siege(?: social)? est(?: situe)?) " + _PLACE
+    )),
+    (INTENT_LOCATION, re.compile(
+        r"(?:which )?companies (?:are )?(?:headquartered|based|located) in (?P<place>[a-z][a-z' -]*)"
+    )),
+]
+AMOUNT_SPACES_PATTERN = re.compile(r"[\s\u00a0\u202f]")
+THOUSANDS_SEPARATOR_PATTERN = re.compile(r"(?<=\d)[.,](?=\d{3}(?!\d))")
+AMOUNT_PATTERN = re.compile(r"\d+(?:[.,]\d+)?")
+QUESTION_PUNCTUATION = re.compile(r"[\s?!.]+$")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+COUNT_ALIASES = {"requirements": "exigences", "companies": "entreprises", "domains": "domaines"}
+
+# =================== MESSAGES ===================
+MSG_COVERAGE_TITLE = "**Couverture des exigences{scope}** ({count} exigence(s), Oui = 1, Partiel = 0,5) :"
+MSG_COVERAGE_SCOPE = " — domaine {domain}"
+MSG_COVERAGE_ITEM = "{rank}. **{name}** : {score:g} / {count} ({ratio:.0%})"
+MSG_TCO_TITLE = "**Coût total de possession sur {years} an(s)** (coûts initiaux + récurrents annuels × {years}) :"
+MSG_TCO_ITEM = "{rank}. **{name}** : {total} $ (initial {initial} $, récurrent {recurring} $/an)"
+MSG_LOCATION_TITLE = "**Entreprises dont la localisation mentionne « {place} »** ({count}) :"
+MSG_LOCATION_ITEM = "- **{name}** : {location}"
+MSG_LOCATION_NONE = "Aucune entreprise dont la localisation mentionne « {place} »."
+MSG_COUNT = "Le classeur contient **{count}** {what}."
+MSG_SUMMARY_TITLE = "**Synthèse des données** :"
+MSG_SUMMARY_SHEET = "- {sheet} : {rows} ligne(s), {cols} colonne(s)"
+MSG_SUMMARY_LEADERS = "**Meilleure couverture des exigences** :"
+MSG_NO_DATA = "Les données nécessaires ({sheet}) ne sont pas disponibles dans le classeur."
+
+
+@dataclass(frozen=True)
+class AnalyticsAnswer:
+    """Réponse calculée localement : intention reconnue et texte Markdown."""
+    intent: str
+    text: str
+
+
+def fold(text):
+    """Minuscules sans accents (« Québec » → « quebec »)."""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_question(question):
+    """Question repliée (sans accents), apostrophes et espaces unifiés, ponctuation finale retirée."""
+    folded = fold(question).replace("\u2019", "'").replace("\u00a0", " ")
+    return QUESTION_PUNCTUATION.sub("", WHITESPACE_PATTERN.sub(" ", folded).strip())
+
+
+def parse_intent(question):
+    """
+    Reconnaît la forme complète d'une question structurée.
+
+    Args:
+        question (str): Question de l'utilisateur
+
+    Returns:
+        tuple: (intention, paramètres nommés non vides), ou None pour une question libre
+    """
+    normalized = normalize_question(question)
+    for intent, pattern in INTENT_GRAMMAR:
+        match = pattern.fullmatch(normalized)
+        if match:
+            return intent, {name: value.strip() for name, value in match.groupdict().items() if value}
+    return None
+
+
+def _sheet(all_dfs, names):
+    """Première feuille non vide parmi des noms possibles (les pages n'emploient pas toutes les mêmes)."""
+    for name in names:
+        df = (all_dfs or {}).get(name)
+        if df is not None and not df.empty:
+            return df
+    return None
+
+
+def _find_column(df, *keywords):
+    """Première colonne dont le nom (sans accents ni espaces) contient tous les mots-clés."""
+    for column in df.columns:
+        name = fold(column).replace(" ", "")
+        if all(keyword in name for keyword in keywords):
+            return column
+    return None
+
+
+def _money(value):
+    """Montant arrondi avec séparateur de milliers à la française (« 12 500 »)."""
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def _amounts(values):
+    """
+    Montants numériques extraits de cellules texte, NaN sinon.
+
+    Les séparateurs de milliers (espace, ou « , » / « . » suivi d'exactement
+    trois chiffres) sont retirés avant de lire la partie décimale :
+    « 12 500 $ », « 12,500 $ », « $12,500.00 » → 12500.0 ; « 1.250.000 € » → 1250000.0 ;
+    « 12,5 k$ » → 12.5.
+
+    Les expressions sont appliquées avec le module re, cellule par cellule :
+    le moteur des chaînes Arrow (pandas 3) refuse les échappements \\u et
+    les assertions avant/arrière.
+    """
+    return pd.to_numeric(values.astype(object).map(_amount_text), errors="coerce")
+
+
+def _amount_text(value):
+    """Partie numérique d'une cellule (« 12 500,5 $ » → « 12500.5 »), None si absente."""
+    text = THOUSANDS_SEPARATOR_PATTERN.sub("", AMOUNT_SPACES_PATTERN.sub("", str(value)))
+    match = AMOUNT_PATTERN.search(text)
+    return match.group(0).replace(",", ".") if match else None
+
+
+class AnalyticsEngine:
+    """Agrégats précalculés d'un classeur et réponses aux questions structurées."""
+
+    def __init__(self, all_dfs):
+        self.all_dfs = all_dfs or {}
+        self._prepare_coverage(_sheet(all_dfs, SHEETS_COMPARATIVE))
+        self._prepare_costs(_sheet(all_dfs, SHEETS_SOLUTIONS))
+        self._prepare_locations(_sheet(all_dfs, SHEETS_COMPANIES))
+
+    # ---------- Agrégats ----------
+    def _prepare_coverage(self, df_comp):
+        """Scores par exigence et par entreprise, puis totaux globaux et par domaine."""
+        self.scores = None
+        self.domains = {}
+        if df_comp is None:
+            return
+        company_columns = [
+            column for column in df_comp.columns
+            if column not in COMPARISON_BASE_COLUMNS and COMPARISON_INFO_MARKER not in column
+        ]
+        if not company_columns:
+            return
+        answers = df_comp[company_columns].astype(str).apply(lambda column: column.str.strip().str.lower())
+        answers = answers.mask(df_comp[company_columns].isna() | answers.isin(NA_STRINGS), "")
+        # Une table de correspondance par colonne : réponse → catégorie → score
+        self.scores = answers.apply(lambda column: column.map(ANSWER_LOOKUP).map(ANSWER_SCORES)).fillna(0.0)
+        if COLUMN_DOMAIN in df_comp.columns:
+            domain_values = df_comp[COLUMN_DOMAIN].fillna("").astype(str).str.strip()
+            self.domain_scores = self.scores.groupby(domain_values).sum()
+            self.domain_counts = domain_values.value_counts()
+            self.domains = {normalize_question(domain): domain for domain in self.domain_scores.index if domain}
+        self.total_scores = self.scores.sum().sort_values(ascending=False, kind="stable")
+
+    def _prepare_costs(self, df_sol):
+        """Coûts initiaux et récurrents annuels par solution."""
+        self.costs = None
+        if df_sol is None:
+            return
+        name_column = _find_column(df_sol, "nom", "solution") or _find_column(df_sol, "solution")
+        initial_column = _find_column(df_sol, "cout", "initia")
+        recurring_column = _find_column(df_sol, "cout", "recurrent")
+        if name_column is None or initial_column is None or recurring_column is None:
+            return
+        costs = pd.DataFrame({
+            "name": df_sol[name_column],
+            "initial": _amounts(df_sol[initial_column]).fillna(0.0),
+            "recurring": _amounts(df_sol[recurring_column]).fillna(0.0),
+        }).dropna(subset=["name"])
+        self.costs = costs.groupby("name", sort=False)[["initial", "recurring"]].sum()
+
+    def _prepare_locations(self, df_ent):
+        """Localisations des entreprises (colonnes « Localisation ... »), texte original et replié."""
+        self.locations = None
+        if df_ent is None:
+            return
+        location_columns = [column for column in df_ent.columns if fold(column).startswith("localisation")]
+        if not location_columns:
+            return
+        locations = df_ent[location_columns].astype(str).where(df_ent[location_columns].notna(), "")
+        joined = locations.apply(lambda row: " ; ".join(value.strip() for value in row if value.strip()), axis=1)
+        self.locations = pd.DataFrame({"name": df_ent.iloc[:, 0], "location": joined, "folded": joined.map(fold)})
+        self.locations = self.locations[self.locations["location"] != ""]
+
+    # ---------- Réponses ----------
+    def answer(self, question):
+        """
+        Répond à une question structurée à partir des agrégats.
+
+        Args:
+            question (str): Question de l'utilisateur
+
+        Returns:
+            AnalyticsAnswer: Réponse locale, ou None si aucune intention ne correspond
+        """
+        parsed = parse_intent(question)
+        if parsed is None:
+            return None
+        intent, params = parsed
+        top_n = max(1, min(MAX_TOP_N, int(params.get("n", DEFAULT_TOP_N))))
+        if intent == INTENT_COUNT:
+            return self.count(COUNT_ALIASES.get(params["what"], params["what"]))
+        if intent == INTENT_CHEAPEST_TCO:
+            return self.cheapest_tco(int(params.get("years", DEFAULT_TCO_YEARS)), top_n)
+        if intent == INTENT_LOCATION:
+            return self.companies_located(params["place"])
+        domain = None
+        if "domain" in params:
+            # Domaine inconnu : la question porte sur autre chose, le modèle y répond
+            domain = self.domains.get(params["domain"])
+            if domain is None:
+                return None
+        return self.best_coverage(domain, top_n)
+
+    def best_coverage(self, domain=None, top_n=DEFAULT_TOP_N):
+        """Entreprises classées par nombre d'exigences satisfaites (globalement ou dans un domaine)."""
+        if self.scores is None:
+            return AnalyticsAnswer(INTENT_BEST_COVERAGE, MSG_NO_DATA.format(sheet=SHEETS_COMPARATIVE[0]))
+        if domain is None:
+            ranking, count, scope = self.total_scores, len(self.scores), ""
+        else:
+            ranking = self.domain_scores.loc[domain].sort_values(ascending=False, kind="stable")
+            count, scope = int(self.domain_counts[domain]), MSG_COVERAGE_SCOPE.format(domain=domain)
+        lines = [MSG_COVERAGE_TITLE.format(scope=scope, count=count)]
+        lines += [
+            MSG_COVERAGE_ITEM.format(rank=rank, name=name, score=score, count=count, ratio=score / count if count else 0)
+            for rank, (name, score) in enumerate(ranking.head(top_n).items(), start=1)
+        ]
+        return AnalyticsAnswer(INTENT_BEST_COVERAGE, "\n".join(lines))
+
+    def cheapest_tco(self, years=DEFAULT_TCO_YEARS, top_n=DEFAULT_TOP_N):
+        """Solutions classées par coût total de possession sur un nombre d'années."""
+        if self.costs is None or self.costs.empty:
+            return AnalyticsAnswer(INTENT_CHEAPEST_TCO, MSG_NO_DATA.format(sheet=SHEETS_SOLUTIONS[0]))
+        totals = (self.costs["initial"] + self.costs["recurring"] * years).sort_values(kind="stable")
+        lines = [MSG_TCO_TITLE.format(years=years)]
+        lines += [
+            MSG_TCO_ITEM.format(
+                rank=rank, name=name, total=_money(total),
+                initial=_money(self.costs.at[name, "initial"]), recurring=_money(self.costs.at[name, "recurring"])
+            )
+            for rank, (name, total) in enumerate(totals.head(top_n).items(), start=1)
+        ]
+        return AnalyticsAnswer(INTENT_CHEAPEST_TCO, "\n".join(lines))
+
+    def companies_located(self, place):
+        """Entreprises dont la localisation contient un lieu (sans tenir compte des accents)."""
+        if self.locations is None:
+            return AnalyticsAnswer(INTENT_LOCATION, MSG_NO_DATA.format(sheet=SHEETS_COMPANIES[0]))
+        matches = self.locations[self.locations["folded"].str.contains(place, regex=False)]
+        if matches.empty:
+            return AnalyticsAnswer(INTENT_LOCATION, MSG_LOCATION_NONE.format(place=place))
+        lines = [MSG_LOCATION_TITLE.format(place=place, count=len(matches))]
+        lines += [MSG_LOCATION_ITEM.format(name=name, location=location) for name, location in zip(matches["name"], matches["location"])]
+        return AnalyticsAnswer(INTENT_LOCATION, "\n".join(lines))
+
+    def count(self, what):
+        """Nombre d'exigences, de domaines, d'entreprises ou de solutions."""
+        if what in ("exigences", "criteres"):
+            count, label = (len(self.scores) if self.scores is not None else 0), "exigence(s)"
+        elif what == "domaines":
+            count, label = len(self.domains), "domaine(s)"
+        elif what == "entreprises":
+            df = _sheet(self.all_dfs, SHEETS_COMPANIES)
+            count, label = (len(df) if df is not None else 0), "entreprise(s)"
+        else:
+            df = _sheet(self.all_dfs, SHEETS_SOLUTIONS)
+            count, label = (len(df) if df is not None else 0), "solution(s)"
+        return AnalyticsAnswer(INTENT_COUNT, MSG_COUNT.format(count=count, what=label))
+
+    def summary(self, top_n=3):
+        """Synthèse des feuilles chargées et des meilleures couvertures d'exigences (action rapide)."""
+        lines = [MSG_SUMMARY_TITLE]
+        lines += [
+            MSG_SUMMARY_SHEET.format(sheet=sheet, rows=len(df), cols=len(df.columns))
+            for sheet, df in self.all_dfs.items() if df is not None and not df.empty
+        ]
+        if self.scores is not None:
+            lines += ["", MSG_SUMMARY_LEADERS]
+            lines += self.best_coverage(top_n=top_n).text.split("\n")[1:]
+        return "\n".join(lines)
+
+
+def get_engine(all_dfs):
+    """
+    Retourne le moteur du jeu de données, construit au premier appel puis mis en cache.
+
+    Args:
+        all_dfs (dict): Nom de feuille → DataFrame
+
+    Returns:
+        AnalyticsEngine: Moteur aux agrégats précalculés
+    """
+    key = tuple((sheet, dataframe_fingerprint(df)) for sheet, df in (all_dfs or {}).items())
+    with _ENGINE_CACHE_LOCK:
+        engine = _ENGINE_CACHE.get(key)
+        if engine is not None:
+            _ENGINE_CACHE.move_to_end(key)
+            return engine
+    engine = AnalyticsEngine(all_dfs)
+    with _ENGINE_CACHE_LOCK:
+        _ENGINE_CACHE[key] = engine
+        while len(_ENGINE_CACHE) > ENGINE_CACHE_MAX:
+            _ENGINE_CACHE.popitem(last=False)
+    return engine
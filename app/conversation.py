@@ -0,0 +1,229 @@
+"""
+Fenêtre de conversation de l'assistant IA
+=========================================
+
+Donne une mémoire multi-tours au chatbot à coût borné : chaque requête
+contient le contexte système, un résumé compact des échanges anciens et les
+derniers tours complets, dans la limite d'un budget de tokens par requête
+(plafonné par la fenêtre du modèle moins la longueur de réponse réservée,
+max_tokens).
+
+Les tours qui sortent de la fenêtre sont intégrés au résumé une seule fois
+(résumé incrémental) ; le résumé est produit par le modèle si une fonction
+de résumé est fournie, sinon par extraction des premières phrases.
+
+Les tokens sont comptés avec tiktoken s'il est installé, sinon estimés à
+partir du nombre de caractères. Ce module n'importe pas Streamlit.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import functools
+import re
+from dataclasses import dataclass
+
+# =================== CONFIGURATION ===================
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+REQUEST_TOKEN_BUDGET = 6000    # tokens d'entrée maximum par requête (coût et latence bornés)
+RECENT_TURNS_MAX = 12          # messages récents conservés en entier au plus
+SUMMARY_MAX_TOKENS = 400       # taille maximale du résumé des échanges anciens
+MESSAGE_OVERHEAD_TOKENS = 4    # balises de rôle ajoutées par l'API à chaque message
+CHARS_PER_TOKEN = 4            # estimation sans tiktoken
+EXTRACT_MAX_CHARS = 200        # extrait conservé par message dans le résumé de repli
+FALLBACK_ENCODING = "cl100k_base"
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s")
+ROLE_LABELS = {"user": "Utilisateur", "assistant": "Assistant"}
+
+# =================== MESSAGES ===================
+LABEL_MEMORY_HEADER = "RÉSUMÉ DES ÉCHANGES PRÉCÉDENTS (tours plus anciens de la conversation) :"
+LABEL_TRUNCATED = "…"
+SUMMARY_INSTRUCTIONS = (
+    "Résume la conversation suivante en français, en quelques puces concises. "
+    "Conserve les questions posées, les entreprises, solutions, exigences et chiffres cités, "
+    "ainsi que les conclusions. N'ajoute rien qui ne figure pas dans les échanges."
+)
+
+
+@dataclass
+class ConversationMemory:
+    """Résumé des échanges anciens et nombre de messages de l'historique déjà résumés."""
+    summary: str = ""
+    summarized_count: int = 0
+
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model):
+    """Encodage tiktoken du modèle (None si tiktoken n'est pas installé)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def count_tokens(text, model=None):
+    """
+    Nombre de tokens d'un texte.
+
+    Args:
+        text (str): Texte à mesurer
+        model (str): Modèle OpenAI (détermine l'encodage)
+
+    Returns:
+        int: Tokens (estimation par caractères sans tiktoken)
+    """
+    encoding = _encoding(model or "")
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message, model=None):
+    """Tokens d'un message de l'API (contenu et surcoût du rôle)."""
+    return count_tokens(message["content"], model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """
+    Tronque un texte à un nombre de tokens.
+
+    Args:
+        text (str): Texte à tronquer
+        max_tokens (int): Nombre maximal de tokens
+        model (str): Modèle OpenAI
+
+    Returns:
+        str: Texte intact s'il tient, sinon son début suivi de « … »
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model or "")
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN].rstrip() + LABEL_TRUNCATED
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]).rstrip() + LABEL_TRUNCATED
+
+
+def input_budget(model, max_tokens, budget=REQUEST_TOKEN_BUDGET):
+    """
+    Tokens disponibles pour les messages envoyés.
+
+    Args:
+        model (str): Modèle OpenAI
+        max_tokens (int): Longueur de réponse réservée (réglage de la sidebar)
+        budget (int): Plafond de tokens d'entrée par requête
+
+    Returns:
+        int: min(budget, fenêtre du modèle - max_tokens)
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return max(0, min(budget, window - int(max_tokens)))
+
+
+def format_transcript(messages):
+    """Transcription « Rôle : contenu » de messages de l'historique."""
+    return "\n".join(f"{ROLE_LABELS.get(message['role'], message['role'])} : {message['content']}" for message in messages)
+
+
+def extractive_summary(previous_summary, messages):
+    """
+    Résumé de repli sans appel au modèle : première phrase de chaque message.
+
+    Args:
+        previous_summary (str): Résumé existant
+        messages (list): Messages à y ajouter
+
+    Returns:
+        str: Résumé complété
+    """
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        first_sentence = SENTENCE_PATTERN.split(message["content"].strip(), maxsplit=1)[0]
+        lines.append(f"- {ROLE_LABELS.get(message['role'], message['role'])} : {first_sentence[:EXTRACT_MAX_CHARS]}")
+    return "\n".join(lines)
+
+
+def _drop_oldest_lines(summary, max_tokens, model=None):
+    """Retire les lignes les plus anciennes d'un résumé jusqu'à ce qu'il tienne dans max_tokens."""
+    lines = summary.split("\n")
+    while len(lines) > 1 and count_tokens("\n".join(lines), model) > max_tokens:
+        lines.pop(0)
+    return truncate_to_tokens("\n".join(lines), max_tokens, model)
+
+
+def _chat_history(history):
+    """Messages utilisateur et assistant non vides, au format de l'API."""
+    return [
+        {"role": message["role"], "content": message["content"]}
+        for message in history
+        if message.get("role") in ROLE_LABELS and message.get("content")
+    ]
+
+
+def build_messages(system_context, history, user_message, memory, model, max_tokens,
+                   summarize=None, budget=REQUEST_TOKEN_BUDGET):
+    """
+    Construit les messages d'une requête dans le budget de tokens.
+
+    Les derniers messages de l'historique sont repris tels quels, du plus
+    récent au plus ancien, tant que le budget le permet ; ceux qui sortent de
+    la fenêtre et ne sont pas encore résumés sont ajoutés au résumé.
+
+    Args:
+        system_context (str): Contexte système (données, extraits)
+        history (list): Messages précédents (dict role/content), sans la question courante
+        user_message (str): Question courante
+        memory (ConversationMemory): Résumé de la conversation, mis à jour ici
+        model (str): Modèle OpenAI
+        max_tokens (int): Longueur de réponse réservée
+        summarize (callable): summarize(previous_summary, messages) -> str, ou None pour le repli extractif
+        budget (int): Plafond de tokens d'entrée par requête
+
+    Returns:
+        list: Messages pour chat.completions.create
+    """
+    available = input_budget(model, max_tokens, budget)
+    question = {"role": "user", "content": user_message}
+    available -= message_tokens(question, model)
+    # Contexte système tronqué si besoin pour laisser la place du résumé (et au moins la moitié du budget)
+    system_context = truncate_to_tokens(system_context, max(available // 2, available - SUMMARY_MAX_TOKENS) - MESSAGE_OVERHEAD_TOKENS, model)
+    available -= count_tokens(system_context, model) + MESSAGE_OVERHEAD_TOKENS
+    available -= SUMMARY_MAX_TOKENS if memory.summary or history else 0
+
+    turns = _chat_history(history)
+    recent = []
+    for message in reversed(turns[-RECENT_TURNS_MAX:]):
+        cost = message_tokens(message, model)
+        if cost > available:
+            break
+        recent.insert(0, message)
+        available -= cost
+
+    # Historique effacé entre-temps : le résumé ne s'applique plus
+    if memory.summarized_count > len(turns):
+        memory.summary, memory.summarized_count = "", 0
+    # Messages sortis de la fenêtre et pas encore résumés
+    first_recent = len(turns) - len(recent)
+    evicted = turns[memory.summarized_count:first_recent]
+    if evicted:
+        try:
+            memory.summary = summarize(memory.summary, evicted) if summarize else extractive_summary(memory.summary, evicted)
+        except Exception:
+            memory.summary = extractive_summary(memory.summary, evicted)
+        memory.summary = _drop_oldest_lines(memory.summary, SUMMARY_MAX_TOKENS, model)
+        memory.summarized_count = first_recent
+
+    messages = [{"role": "system", "content": system_context}]
+    if memory.summary:
+        messages.append({"role": "system", "content": f"{LABEL_MEMORY_HEADER}\n{memory.summary}"})
+    return messages + recent + [question]
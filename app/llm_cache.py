@@ -0,0 +1,198 @@
+"""
+Cache persistant des réponses de l'assistant IA
+===============================================
+
+Les réponses d'OpenAI sont conservées dans une base SQLite, indexées par une
+empreinte de la requête : modèle, température, longueur maximale, question
+normalisée (casse, espaces), empreinte du contexte système (qui décrit les
+données chargées) et empreinte de la conversation en cours (résumé et tours
+récents). Une même question posée sur les mêmes données, au même point d'une
+conversation, est servie instantanément, sans nouvel appel facturé.
+
+Les entrées expirent après LLM_CACHE_TTL_SECONDS ; au-delà de
+LLM_CACHE_MAX_ENTRIES entrées ou LLM_CACHE_MAX_BYTES octets, les moins
+récemment lues sont évincées.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from pathlib import Path
+
+import streamlit as st
+
+# =================== CONFIGURATION ===================
+LLM_CACHE_PATH = Path(os.getenv("IVEO_LLM_CACHE_PATH", Path(tempfile.gettempdir()) / "iveo_llm_cache.sqlite3"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("IVEO_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+LLM_CACHE_TIMEOUT = 5  # secondes d'attente sur le verrou SQLite
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def normalize_message(message):
+    """Forme canonique d'une question : Unicode NFKC, casse ignorée, espaces réduits."""
+    return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", message)).strip().casefold()
+
+
+def context_hash(system_context):
+    """Empreinte SHA-256 du contexte système (décrit les données chargées)."""
+    return hashlib.sha256(system_context.encode("utf-8")).hexdigest()
+
+
+def conversation_hash(summary, messages):
+    """
+    Empreinte SHA-256 d'une conversation : résumé des échanges anciens et tours récents.
+
+    Vide pour une conversation sans historique (chat rapide, première question),
+    dont les réponses restent partagées entre les sessions.
+    """
+    if not summary and not messages:
+        return ""
+    turns = [[message.get("role", ""), str(message.get("content", ""))] for message in messages]
+    payload = json.dumps([summary, turns], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(model, temperature, max_tokens, user_message, system_context, conversation=""):
+    """
+    Clé de cache d'une requête de complétion.
+
+    Args:
+        model (str): Modèle OpenAI
+        temperature (float): Température
+        max_tokens (int): Longueur maximale de la réponse
+        user_message (str): Question de l'utilisateur (normalisée ici)
+        system_context (str): Contexte système envoyé avec la question
+        conversation (str): Empreinte de la conversation (voir conversation_hash)
+
+    Returns:
+        str: Empreinte hexadécimale
+    """
+    payload = json.dumps(
+        [model, round(float(temperature), 3), int(max_tokens), normalize_message(user_message),
+         context_hash(system_context), conversation],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Cache SQLite des réponses, partagé par les sessions et les processus du serveur."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                 max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            # WAL : lectures concurrentes pendant une écriture (plusieurs processus Streamlit)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """Connexion courte, fermée par l'appelant (with closing)."""
+        return closing(sqlite3.connect(self.path, timeout=LLM_CACHE_TIMEOUT))
+
+    def get(self, key):
+        """
+        Retourne la réponse en cache pour une clé, ou None (absente ou expirée).
+
+        Args:
+            key (str): Clé calculée par cache_key
+
+        Returns:
+            str: Réponse mise en cache, ou None
+        """
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn, conn:
+                row = conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                response, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                return response
+        except sqlite3.Error:
+            # Cache indisponible (verrou, disque) : l'appel à l'API reste possible
+            return None
+
+    def put(self, key, model, response):
+        """
+        Enregistre une réponse puis applique l'expiration et les plafonds de taille.
+
+        Args:
+            key (str): Clé calculée par cache_key
+            model (str): Modèle ayant produit la réponse
+            response (str): Réponse à conserver
+        """
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, len(response.encode("utf-8")), now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, now):
+        """Supprime les entrées expirées, puis les moins récemment lues au-delà des plafonds."""
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        excess_rows = max(0, count - self.max_entries)
+        excess_bytes = max(0, total - self.max_bytes)
+        removed_rows = removed_bytes = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if removed_rows >= excess_rows and removed_bytes >= excess_bytes:
+                break
+            stale.append((key,))
+            removed_rows += 1
+            removed_bytes += size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock, self._connect() as conn, conn:
+            conn.execute("DELETE FROM responses")
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm_cache():
+    """Retourne le cache de réponses partagé par toutes les sessions du serveur."""
+    return LLMResponseCache()
@@ -0,0 +1,265 @@
+"""
+Pool de clients OpenAI partagé entre les sessions
+=================================================
+
+Un seul client par clé API (indexé par l'empreinte de la clé, jamais par la
+clé elle-même), réutilisé par toutes les sessions Streamlit qui l'emploient :
+le client httpx sous-jacent garde ses connexions TLS ouvertes (keep-alive)
+d'une question à l'autre. Chaque clé a son propre limiteur de débit (seau à
+jetons) et les appels sont relancés avec un délai exponentiel en cas de
+limite de débit, d'erreur serveur ou réseau.
+
+Les clients OpenAI et httpx synchrones sont sûrs entre threads : ils
+conviennent aux threads de script de Streamlit sans boucle asyncio dédiée.
+Un client en cours d'usage (requête ou flux non terminé) n'est jamais fermé
+par l'éviction des clés les moins récentes.
+openai et httpx ne sont importés qu'à la création du premier client.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+
+import streamlit as st
+
+# =================== CONFIGURATION ===================
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("IVEO_LLM_RPM", "60"))
+LLM_RATE_MAX_WAIT = 30         # secondes d'attente maximale d'un jeton avant abandon
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE = 0.5         # secondes, doublées à chaque tentative
+LLM_BACKOFF_MAX = 20
+LLM_TIMEOUT = 60               # secondes par requête
+LLM_CONNECT_TIMEOUT = 10
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE = 10
+LLM_KEEPALIVE_EXPIRY = 120     # secondes avant fermeture d'une connexion inactive
+LLM_CLIENTS_MAX = 32           # clés distinctes conservées (les moins récentes sont fermées)
+
+# =================== MESSAGES ===================
+MSG_RATE_LIMITED = "Trop de requêtes vers OpenAI : réessayez dans quelques secondes."
+
+
+class RateLimitExceeded(Exception):
+    """Le limiteur de débit n'a pas délivré de jeton dans le délai imparti."""
+
+
+def key_fingerprint(api_key):
+    """Empreinte SHA-256 d'une clé API (la clé n'est jamais conservée comme index)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class RateLimiter:
+    """Seau à jetons : rate_per_minute requêtes par minute, rafales jusqu'à burst."""
+
+    def __init__(self, rate_per_minute=LLM_REQUESTS_PER_MINUTE, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, rate_per_minute // 6))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=LLM_RATE_MAX_WAIT):
+        """
+        Prend un jeton, en attendant si nécessaire.
+
+        Args:
+            max_wait (float): Attente maximale en secondes
+
+        Raises:
+            RateLimitExceeded: Aucun jeton disponible dans le délai
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(MSG_RATE_LIMITED)
+            time.sleep(wait)
+
+
+def _retryable_errors():
+    """Erreurs OpenAI transitoires (import différé d'openai)."""
+    import openai
+    return (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+
+def _retry_delay(attempt, error):
+    """Délai avant la tentative suivante : en-tête Retry-After s'il existe, sinon exponentiel avec gigue."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(LLM_BACKOFF_MAX, float(retry_after))
+    except (TypeError, ValueError):
+        return min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class _TrackedStream:
+    """Flux de réponse qui libère son client une fois lu jusqu'au bout ou fermé."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        """Ferme le flux et libère le client (une seule fois)."""
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            if hasattr(self._stream, "close"):
+                self._stream.close()
+        finally:
+            release()
+
+
+class PooledClient:
+    """Client OpenAI d'une clé API, avec son pool de connexions et son limiteur de débit."""
+
+    def __init__(self, api_key):
+        import httpx
+        from openai import OpenAI
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+        )
+        # Relances gérées ici (limiteur + délai), pas par le client OpenAI
+        self.client = OpenAI(api_key=api_key, http_client=self.http_client, max_retries=0)
+        self.limiter = RateLimiter()
+        self.last_used = time.monotonic()
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def busy(self):
+        """bool: Une requête ou un flux est en cours sur ce client."""
+        with self._in_flight_lock:
+            return self.in_flight > 0
+
+    def _acquire(self):
+        with self._in_flight_lock:
+            self.in_flight += 1
+        self.last_used = time.monotonic()
+
+    def _release(self):
+        with self._in_flight_lock:
+            self.in_flight -= 1
+        self.last_used = time.monotonic()
+
+    def create_completion(self, **params):
+        """
+        Appelle chat.completions.create avec limitation de débit et relances.
+
+        En mode stream=True, seule l'ouverture du flux est relancée : une
+        réponse déjà en cours d'affichage n'est jamais rejouée. Le client reste
+        marqué occupé jusqu'à la fin de la lecture ou la fermeture du flux.
+
+        Args:
+            **params: Paramètres de chat.completions.create
+
+        Returns:
+            Réponse OpenAI (ou flux de fragments, à fermer par close(), si stream=True)
+
+        Raises:
+            RateLimitExceeded: Débit local épuisé
+            openai.OpenAIError: Échec après LLM_MAX_RETRIES relances
+        """
+        retryable = _retryable_errors()
+        self._acquire()
+        try:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                self.limiter.acquire()
+                try:
+                    response = self.client.chat.completions.create(**params)
+                    break
+                except retryable as e:
+                    if attempt == LLM_MAX_RETRIES:
+                        raise
+                    time.sleep(_retry_delay(attempt, e))
+        except BaseException:
+            self._release()
+            raise
+        if params.get("stream"):
+            return _TrackedStream(response, self._release)
+        self._release()
+        return response
+
+    def close(self):
+        """Ferme les connexions du client."""
+        self.http_client.close()
+
+
+class LLMClientPool:
+    """Clients OpenAI partagés, un par empreinte de clé API."""
+
+    def __init__(self, max_clients=LLM_CLIENTS_MAX):
+        self.max_clients = max_clients
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_key):
+        """
+        Retourne le client de la clé API, créé au premier appel.
+
+        Args:
+            api_key (str): Clé API OpenAI
+
+        Returns:
+            PooledClient: Client partagé de cette clé
+        """
+        fingerprint = key_fingerprint(api_key)
+        with self._lock:
+            client = self._clients.get(fingerprint)
+            if client is None:
+                client = PooledClient(api_key)
+                self._clients[fingerprint] = client
+            client.last_used = time.monotonic()
+            self._evict(keep=fingerprint)
+            return client
+
+    def _evict(self, keep=None):
+        """
+        Ferme les clients inactifs les moins récemment utilisés au-delà de max_clients.
+
+        Les clients occupés (requête ou flux en cours) et celui qui vient
+        d'être demandé sont conservés, quitte à dépasser temporairement
+        max_clients : les autres seront évincés à un prochain appel, une fois
+        libérés.
+
+        Args:
+            keep (str): Empreinte du client remis à l'appelant
+        """
+        excess = len(self._clients) - self.max_clients
+        if excess <= 0:
+            return
+        idle = [
+            fingerprint for fingerprint, client in self._clients.items()
+            if fingerprint != keep and not client.busy
+        ]
+        for fingerprint in sorted(idle, key=lambda fingerprint: self._clients[fingerprint].last_used)[:excess]:
+            self._clients.pop(fingerprint).close()
+
+
+@st.cache_resource(show_spinner=False)
+def get_client_pool():
+    """Retourne le pool de clients partagé par toutes les sessions du serveur."""
+    return LLMClientPool()
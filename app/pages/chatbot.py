@@ -29,6 +29,16 @@ LABEL_CHAT_ASSISTANT = "assistant"
 LABEL_CHAT_USER = "user"
 LABEL_CHAT_THINKING = "L'IA réfléchit..."
 LABEL_CHAT_CONFIGURE_API = "Veuillez configurer votre clé API OpenAI dans la sidebar."
+LABEL_CHAT_STOP = "⏹ Arrêter"
+LABEL_CHAT_CANCELLED = "*(réponse interrompue)*"
+LABEL_CHAT_STREAM_METRICS = "Premier token en {ttft_s:.2f} s · {tokens_per_s:.0f} tokens/s"
+LABEL_CHAT_CACHED = "Réponse servie depuis le cache"
+LABEL_CHAT_LOCAL = "Réponse calculée localement en {elapsed_ms:.0f} ms (sans appel à l'IA)"
+LABEL_SIDEBAR_COVERAGE = "Meilleure couverture des exigences"
+LABEL_SIDEBAR_TCO = "Coût total sur 5 ans"
+LABEL_SIDEBAR_CLEAR_CACHE = "Vider le cache des réponses"
+LABEL_SIDEBAR_STREAMING = "Réponse en continu"
+LABEL_SIDEBAR_STREAMING_HELP = "Affiche la réponse au fil de sa génération (annulable)"
 LABEL_TEMP_HEADER = "Assistant Temporaire (sans IA)"
 LABEL_TEMP_INFO = "En attendant la correction d'OpenAI, voici ce que je peux vous dire sur vos données :"
 LABEL_TEMP_DATA_SUMMARY = "Résumé des données"
@@ -44,6 +54,9 @@ LABEL_TEMP_FEEDBACK_EXPANDER = "Demande {i} - {timestamp}"
 LABEL_TEMP_FEEDBACK_BUTTON = "Enregistrer la demande"
 LABEL_TEMP_METRIC_ROWS = "Total lignes"
 LABEL_TEMP_METRIC_COLS = "Total colonnes"
+KEY_STREAMING = "chat_streaming"
+KEY_STREAM_PARTIAL = "chat_stream_partial"
+KEY_CHAT_MEMORY = "chat_memory"
 """
 Page Chatbot IA - Application IVÉO BI
 =====================================
@@ -52,32 +65,45 @@ Cette page offre un assistant IA conversationnel intégré pour aider les utilis
 avec leurs analyses et questions sur les données de l'application.
 
 Fonctionnalités :
-- Chat interactif avec OpenAI GPT
-- Historique des conversations
+- Chat interactif avec OpenAI GPT, réponses affichées en continu (annulables)
+- Cache persistant des réponses (app.llm_cache) pour les questions répétées
+- Lignes du classeur pertinentes pour la question injectées dans le prompt (app.retrieval)
+- Clients OpenAI mutualisés par clé API entre les sessions (app.llm_client)
+- Historique des conversations, repris dans les requêtes dans un budget de tokens
+  (derniers tours complets, tours anciens résumés ; app.conversation)
 - Interface moderne et responsive
 - Analyse contextuelle des données
 - Suggestions intelligentes
 
-Version : 1.0 - 2025.01.14
+Le client OpenAI lit OPENAI_BASE_URL : un serveur local compatible
+(simulateur) peut remplacer l'API pour mesurer le temps jusqu'au premier
+token et le débit.
+
+Version : 1.1 - 2025.01.16
 """
 
+import importlib.util
+import time
 import streamlit as st
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-    openai_client = None
-except ImportError as e:
-    OPENAI_AVAILABLE = False
-    openai_client = None
+# Présence d'openai vérifiée sans l'importer : le client est chargé à l'initialisation de l'API
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 from datetime import datetime
 import json
 from sidebar import apply_sidebar_styles
+from app.llm_cache import get_llm_cache, cache_key, conversation_hash
+from app.llm_client import get_client_pool, RateLimitExceeded
+from app.conversation import (
+    ConversationMemory, build_messages, count_tokens, format_transcript, SUMMARY_INSTRUCTIONS, SUMMARY_MAX_TOKENS
+)
 
 # Configuration OpenAI
 def init_openai():
-    """Initialise l'API OpenAI avec la clé fournie par l'utilisateur."""
-    global openai_client
-
+    """
+    Vérifie que l'API OpenAI est utilisable avec la clé de la session.
+    
+    Le client lui-même est partagé par clé API entre les sessions
+    (voir _get_client) : rien n'est recréé à chaque appel.
+    """
     if not OPENAI_AVAILABLE:
         return False
 
@@ -86,16 +112,20 @@ def init_openai():
 
     if st.session_state.openai_api_key:
         try:
-            global openai_client
-            # Import OpenAI class inside the function to avoid issues if openai is not installed
-            from openai import OpenAI
-            openai_client = OpenAI(api_key=st.session_state.openai_api_key)
+            _get_client()
             return True
         except Exception as e:
             st.error(f"Erreur d'initialisation OpenAI : {str(e)}")
             return False
     return False
 
+def _get_client():
+    """Client OpenAI mutualisé de la clé API de la session (None sans clé)."""
+    api_key = st.session_state.get("openai_api_key", "")
+    if not OPENAI_AVAILABLE or not api_key:
+        return None
+    return get_client_pool().get(api_key)
+
 def display(all_dfs):
     """
     Fonction principale d'affichage de la page Chatbot.
@@ -318,6 +348,13 @@ def _setup_sidebar_chat(all_dfs):
         )
         st.session_state.max_tokens = max_tokens
         
+        st.toggle(
+            LABEL_SIDEBAR_STREAMING,
+            value=True,
+            key=KEY_STREAMING,
+            help=LABEL_SIDEBAR_STREAMING_HELP
+        )
+        
         st.markdown("---")
         
         # Mini chat dans la sidebar
@@ -330,7 +367,10 @@ def _setup_sidebar_chat(all_dfs):
         )
         
         if st.button("Envoyer", key="sidebar_send"):
-            if quick_question and init_openai():
+            local = _answer_locally(quick_question, all_dfs) if quick_question else None
+            if local is not None:
+                st.success(local[0])
+            elif quick_question and init_openai():
                 with st.spinner("Réflexion..."):
                     response = _get_ai_response(quick_question, all_dfs, is_quick=True)
                     st.success(f": {response}")
@@ -340,18 +380,27 @@ def _setup_sidebar_chat(all_dfs):
         # Actions rapides
         st.markdown("## Actions Rapides")
         
+        # Calculées localement : aucune clé API nécessaire
         if st.button("Analyser les données", key="analyze_data"):
-            if init_openai():
-                _add_system_message("Analyse des données en cours...", all_dfs)
+            _add_system_message("Analyse des données en cours...", all_dfs)
+        
+        if st.button(LABEL_SIDEBAR_COVERAGE, key="best_coverage"):
+            _add_system_message(LABEL_SIDEBAR_COVERAGE, all_dfs)
+        
+        if st.button(LABEL_SIDEBAR_TCO, key="cheapest_tco"):
+            _add_system_message(LABEL_SIDEBAR_TCO, all_dfs)
         
         if st.button("Suggestions d'amélioration", key="suggestions"):
-            if init_openai():
-                _add_system_message("Génération de suggestions...", all_dfs)
+            _add_system_message("Génération de suggestions...", all_dfs)
         
         if st.button("Effacer l'historique", key="clear_history"):
             st.session_state.chat_messages = []
+            st.session_state[KEY_CHAT_MEMORY] = ConversationMemory()
             st.rerun()
         
+        if st.button(LABEL_SIDEBAR_CLEAR_CACHE, key="clear_llm_cache"):
+            get_llm_cache().clear()
+        
         st.markdown('</div>', unsafe_allow_html=True)
 
 def _render_main_chat():
@@ -367,16 +416,7 @@ def _render_main_chat():
         )
 
     for message in st.session_state.chat_messages:
-        if message["role"] == LABEL_CHAT_USER or message["role"] == "user":
-            st.markdown(
-                f'<div class="user-message">{message["content"]}</div>',
-                unsafe_allow_html=True
-            )
-        else:
-            st.markdown(
-                f'<div class="assistant-message">{message["content"]}</div>',
-                unsafe_allow_html=True
-            )
+        _render_message(message)
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -400,6 +440,17 @@ def _render_main_chat():
             "content": user_input,
             "timestamp": datetime.now().isoformat()
         })
+        # Questions structurées : réponse calculée sur les données, sans appel à l'IA
+        local = _answer_locally(user_input, st.session_state.get("all_dfs", {}))
+        if local is not None:
+            content, elapsed_ms = local
+            st.session_state.chat_messages.append({
+                "role": LABEL_CHAT_ASSISTANT,
+                "content": content,
+                "metrics": {"local": True, "elapsed_ms": elapsed_ms},
+                "timestamp": datetime.now().isoformat()
+            })
+            st.rerun()
         if not init_openai():
             st.session_state.chat_messages.append({
                 "role": LABEL_CHAT_ASSISTANT,
@@ -407,6 +458,9 @@ def _render_main_chat():
                 "timestamp": datetime.now().isoformat()
             })
             return
+        if st.session_state.get(KEY_STREAMING, True):
+            _stream_main_response(user_input, st.session_state.get("all_dfs", {}))
+            st.rerun()
         with st.spinner(LABEL_CHAT_THINKING):
             ai_response = _get_ai_response(user_input, st.session_state.get("all_dfs", {}))
         st.session_state.chat_messages.append({
@@ -417,6 +471,87 @@ def _render_main_chat():
         if ai_response is not None and not ai_response.startswith("Erreur") and not ai_response.startswith("Veuillez"):
             st.rerun()
 
+def _render_message(message):
+    """Affiche un message de l'historique (et les mesures de débit des réponses en continu)."""
+    if message["role"] == LABEL_CHAT_USER or message["role"] == "user":
+        st.markdown(
+            f'<div class="user-message">{message["content"]}</div>',
+            unsafe_allow_html=True
+        )
+        return
+    st.markdown(
+        f'<div class="assistant-message">{message["content"]}</div>',
+        unsafe_allow_html=True
+    )
+    metrics = message.get("metrics")
+    if metrics and metrics.get("local"):
+        st.caption(LABEL_CHAT_LOCAL.format(**metrics))
+    elif metrics and metrics.get("cached"):
+        st.caption(LABEL_CHAT_CACHED)
+    elif metrics and metrics.get("ttft_s") is not None:
+        st.caption(LABEL_CHAT_STREAM_METRICS.format(**metrics))
+
+def _stream_main_response(user_message, all_dfs):
+    """
+    Affiche la réponse au fil de l'eau puis l'ajoute à l'historique avec ses mesures.
+    
+    Le bouton d'arrêt relance le script : Streamlit interrompt alors la lecture
+    du flux, et le rappel _cancel_stream conserve le texte déjà reçu.
+    """
+    _render_message({"role": LABEL_CHAT_USER, "content": user_message})
+    metrics = {}
+    st.session_state[KEY_STREAM_PARTIAL] = {"content": "", "metrics": metrics}
+    st.button(LABEL_CHAT_STOP, key="chat_stop", on_click=_cancel_stream)
+    # Fragments de texte uniquement : st.write_stream retourne la réponse complète (str)
+    content = st.write_stream(_stream_ai_response(user_message, all_dfs, metrics))
+    st.session_state.pop(KEY_STREAM_PARTIAL, None)
+    st.session_state.chat_messages.append({
+        "role": LABEL_CHAT_ASSISTANT,
+        "content": content.strip(),
+        "metrics": metrics,
+        "timestamp": datetime.now().isoformat()
+    })
+
+def _cancel_stream():
+    """Rappel du bouton d'arrêt : la réponse partielle rejoint l'historique."""
+    partial = st.session_state.pop(KEY_STREAM_PARTIAL, None)
+    if partial is None:
+        return
+    st.session_state.chat_messages.append({
+        "role": LABEL_CHAT_ASSISTANT,
+        "content": f"{partial['content']}\n\n{LABEL_CHAT_CANCELLED}".strip(),
+        "metrics": partial["metrics"],
+        "timestamp": datetime.now().isoformat()
+    })
+
+def _get_analytics_engine(all_dfs):
+    """Moteur d'analyse locale du jeu de données (None si pandas n'est pas disponible)."""
+    try:
+        from app.analytics import get_engine
+        return get_engine(all_dfs)
+    except ImportError:
+        return None
+
+def _answer_locally(user_message, all_dfs):
+    """
+    Répond à une question structurée sans appel à l'IA.
+
+    Args:
+        user_message (str): Message de l'utilisateur
+        all_dfs (dict): DataFrames disponibles
+
+    Returns:
+        tuple: (réponse Markdown, durée en ms), ou None pour une question libre
+    """
+    if not all_dfs:
+        return None
+    started = time.perf_counter()
+    engine = _get_analytics_engine(all_dfs)
+    local = engine.answer(user_message) if engine is not None else None
+    if local is None:
+        return None
+    return local.text, round((time.perf_counter() - started) * 1000, 1)
+
 def _get_system_context(all_dfs):
     """
     Génère le contexte système pour l'IA en fonction des DataFrames disponibles.
@@ -474,40 +609,229 @@ def _get_ai_response(user_message, all_dfs, is_quick=False):
     Returns:
         str: Réponse de l'IA ou message d'erreur
     """
-    if not OPENAI_AVAILABLE or openai_client is None:
+    client = _get_client()
+    if client is None:
         return "Erreur : OpenAI n'est pas disponible. Veuillez vérifier la configuration."
     try:
-        # Préparer le contexte système
-        system_context = _get_system_context(all_dfs)
-        messages = [
-            {"role": "system", "content": system_context},
-            {"role": "user", "content": user_message}
-        ]
-        model = st.session_state.get("selected_model", "gpt-3.5-turbo")
-        temperature = st.session_state.get("temperature", 0.7)
-        max_tokens = st.session_state.get("max_tokens", 500)
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+        request = _request_settings(user_message, all_dfs)
+        key = _response_cache_key(user_message, request, with_history=not is_quick)
+        cached = get_llm_cache().get(key)
+        if cached is not None:
+            return cached
+        # Le chat rapide reste sans mémoire : questions ponctuelles
+        params = _completion_params(user_message, request, with_history=not is_quick)
+        response = client.create_completion(**params)
         content = response.choices[0].message.content
-        return content.strip() if content is not None else ""
+        content = content.strip() if content is not None else ""
+        if content:
+            get_llm_cache().put(key, params["model"], content)
+        return content
+    except RateLimitExceeded as e:
+        return f"Erreur : {str(e)}"
     except Exception as e:
         return f"Erreur lors de la génération de la réponse : {str(e)}"
 
+def _response_cache_key(user_message, request, with_history=True):
+    """
+    Clé du cache de réponses : modèle, réglages, question normalisée, contexte
+    système (données, extraits) et conversation en cours.
+
+    Le cache est partagé entre les sessions : une question de suite n'est
+    servie que pour la même conversation (résumé et tours pas encore résumés).
+    La clé est calculée avant la construction des messages, si bien qu'une
+    réponse en cache ne déclenche ni résumé payant ni mise à jour de la mémoire.
+
+    Args:
+        user_message (str): Message de l'utilisateur
+        request (dict): Contexte et réglages (voir _request_settings)
+        with_history (bool): Requête envoyée avec l'historique de la conversation
+
+    Returns:
+        str: Clé du cache
+    """
+    conversation = ""
+    if with_history:
+        memory = st.session_state.get(KEY_CHAT_MEMORY) or ConversationMemory()
+        history = _conversation_history(user_message)
+        if memory.summarized_count > len(history):
+            # Historique effacé : la mémoire sera remise à zéro par build_messages
+            memory = ConversationMemory()
+        conversation = conversation_hash(memory.summary, history[memory.summarized_count:])
+    return cache_key(
+        request["model"], request["temperature"], request["max_tokens"],
+        user_message, request["system_context"], conversation
+    )
+
+def _get_retrieved_context(user_message, all_dfs):
+    """Lignes du classeur les plus pertinentes pour la question (vide si l'index est indisponible)."""
+    try:
+        # Index (NumPy/scipy) chargé à la première question seulement
+        from app.retrieval import retrieve_context
+        return retrieve_context(user_message, all_dfs)
+    except ImportError:
+        return ""
+
+def _conversation_history(user_message):
+    """Messages précédant la question courante, hors erreurs et invitations à configurer l'API."""
+    history = list(st.session_state.get("chat_messages", []))
+    if history and history[-1].get("role") == LABEL_CHAT_USER and history[-1].get("content") == user_message:
+        history.pop()
+    return [
+        message for message in history
+        if not (message.get("role") == LABEL_CHAT_ASSISTANT
+                and str(message.get("content", "")).startswith(("Erreur", LABEL_CHAT_CONFIGURE_API)))
+    ]
+
+def _summarize_turns(previous_summary, messages):
+    """Résumé par le modèle des tours sortis de la fenêtre (repli extractif en cas d'échec)."""
+    client = _get_client()
+    if client is None:
+        raise RuntimeError("OpenAI indisponible")
+    transcript = format_transcript(messages)
+    if previous_summary:
+        transcript = f"Résumé existant :\n{previous_summary}\n\nNouveaux échanges :\n{transcript}"
+    response = client.create_completion(
+        model=st.session_state.get("selected_model", "gpt-3.5-turbo"),
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": transcript}
+        ],
+        temperature=0,
+        max_tokens=SUMMARY_MAX_TOKENS,
+    )
+    return (response.choices[0].message.content or "").strip()
+
+def _request_settings(user_message, all_dfs):
+    """
+    Contexte système (données, extraits) et réglages de la sidebar, sans l'historique.
+
+    Args:
+        user_message (str): Message de l'utilisateur
+        all_dfs (dict): DataFrames disponibles
+
+    Returns:
+        dict: model, temperature, max_tokens et system_context
+    """
+    system_context = _get_system_context(all_dfs)
+    retrieved = _get_retrieved_context(user_message, all_dfs)
+    if retrieved:
+        system_context = f"{system_context}\n{retrieved}\n\nAppuie-toi sur ces extraits pour citer les entreprises, solutions et exigences concernées.\n"
+    return {
+        "model": st.session_state.get("selected_model", "gpt-3.5-turbo"),
+        "temperature": st.session_state.get("temperature", 0.7),
+        "max_tokens": st.session_state.get("max_tokens", 500),
+        "system_context": system_context,
+    }
+
+def _completion_params(user_message, request, with_history=True):
+    """
+    Paramètres de la requête de complétion (contexte système, historique, réglages de la sidebar).
+
+    À n'appeler qu'en cas d'absence du cache : les tours sortis de la fenêtre
+    y sont résumés (appel payant) et la mémoire de conversation mise à jour.
+
+    Args:
+        user_message (str): Message de l'utilisateur
+        request (dict): Contexte et réglages (voir _request_settings)
+        with_history (bool): Reprendre la conversation (derniers tours et résumé des plus anciens)
+
+    Returns:
+        dict: Paramètres de chat.completions.create
+    """
+    if KEY_CHAT_MEMORY not in st.session_state:
+        st.session_state[KEY_CHAT_MEMORY] = ConversationMemory()
+    # Budget de tokens d'entrée : fenêtre du modèle moins la réponse réservée (max_tokens)
+    messages = build_messages(
+        request["system_context"],
+        _conversation_history(user_message) if with_history else [],
+        user_message,
+        st.session_state[KEY_CHAT_MEMORY] if with_history else ConversationMemory(),
+        request["model"],
+        request["max_tokens"],
+        summarize=_summarize_turns,
+    )
+    return {
+        "model": request["model"],
+        "messages": messages,
+        "temperature": request["temperature"],
+        "max_tokens": request["max_tokens"],
+    }
+
+def _stream_ai_response(user_message, all_dfs, metrics):
+    """
+    Produit la réponse de l'IA fragment par fragment (à passer à st.write_stream).
+
+    Args:
+        user_message (str): Message de l'utilisateur
+        all_dfs (dict): DataFrames disponibles
+        metrics (dict): Complété avec ttft_s (premier token), tokens et tokens_per_s
+
+    Yields:
+        str: Fragments de texte de la réponse
+    """
+    client = _get_client()
+    if client is None:
+        yield "Erreur : OpenAI n'est pas disponible. Veuillez vérifier la configuration."
+        return
+    partial = st.session_state.get(KEY_STREAM_PARTIAL, {"content": ""})
+    first_token_at = None
+    tokens = 0
+    stream = None
+    try:
+        request = _request_settings(user_message, all_dfs)
+        key = _response_cache_key(user_message, request)
+        cached = get_llm_cache().get(key)
+        if cached is not None:
+            metrics["cached"] = True
+            yield cached
+            return
+        params = _completion_params(user_message, request)
+        started = time.perf_counter()
+        stream = client.create_completion(stream=True, **params)
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics["ttft_s"] = round(first_token_at - started, 3)
+            # Un fragment peut porter plusieurs tokens : comptage avec l'encodage du modèle
+            tokens += count_tokens(delta, params["model"])
+            elapsed = time.perf_counter() - first_token_at
+            metrics["tokens"] = tokens
+            metrics["tokens_per_s"] = round(tokens / elapsed, 1) if elapsed > 0 else 0.0
+            partial["content"] += delta
+            yield delta
+        # Flux terminé sans erreur ni interruption : la réponse complète est mise en cache
+        if partial["content"].strip():
+            get_llm_cache().put(key, params["model"], partial["content"].strip())
+    except Exception as e:
+        yield f"Erreur lors de la génération de la réponse : {str(e)}"
+    finally:
+        # Arrêt demandé (relance du script) : la connexion HTTP est libérée tout de suite
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+
 def _add_system_message(action_description, all_dfs):
     """Ajoute un message système basé sur une action rapide."""
     message = "Action non reconnue."
+    engine = _get_analytics_engine(all_dfs) if all_dfs else None
     if action_description == "Analyse des données en cours...":
         message = "Analyse des données effectuée. Voici un résumé :\n\n"
-        if all_dfs:
+        if engine is not None:
+            message += engine.summary() + "\n"
+        elif all_dfs:
             for sheet_name, df in all_dfs.items():
                 if df is not None and not df.empty:
                     message += f"{sheet_name}: {len(df)} entrées avec {len(df.columns)} critères\n"
         message += "\nQue souhaitez-vous analyser en détail ?"
         
+    elif action_description == LABEL_SIDEBAR_COVERAGE and engine is not None:
+        message = engine.best_coverage().text
+        
+    elif action_description == LABEL_SIDEBAR_TCO and engine is not None:
+        message = engine.cheapest_tco().text
+        
     elif action_description == "Génération de suggestions...":
         message = """
         Suggestions d'amélioration pour votre analyse :
@@ -3,11 +3,8 @@ LABEL_INFO_VALEUR_PAR_DEFAUT = "N/A"
 import streamlit as st
 from sidebar import show_sidebar
 import pandas as pd
-import pydeck as pdk
-import json
 import requests
 import io
-from geopy.geocoders import Nominatim
 
 """
 === CONSTANTES GLOBALES (labels, colonnes, messages, titres, etc.) ===
@@ -35,7 +32,7 @@ LABEL_BOUTON_VIDEO = "Vidéo"
 LABEL_BOUTON_VOIR_LOGO = "Voir le logo sur SharePoint"
 LABEL_LOGO_NON_AFFICHE = "Le logo n'a pu être affiché directement."
 LOGO_CAPTION = "Logo de l'entreprise"
-from sidebar import cookies, apply_sidebar_styles
+from sidebar import get_preferences, apply_sidebar_styles
 
 # --- Visual Theme avec Transparence Simple ---
 THEME = {
@@ -62,11 +59,11 @@ HR = '<hr style="margin:1.5rem 0 1rem 0; border:none; border-top:2px solid #e3f0
 SEPARATOR = '<div style="margin:0.8rem 0;border-bottom:1px solid rgba(0,0,0,0.1);"></div>'
 
 # --- Caching Geocoder ---
-from geopy.extra.rate_limiter import RateLimiter
-
 @st.cache_data(show_spinner=False)
 def geocode(address: str):
     import time
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
     try:
         geolocator = Nominatim(user_agent="entreprise_app")
         # Timeout fixé à 5 secondes
@@ -360,7 +357,7 @@ def display_logo(logo_img):
 def sidebar_setup(df_ent):
     companies = df_ent[LABEL_ENTREPRISES].dropna().unique()
     selected = st.sidebar.selectbox(LABEL_CHOISISSEZ_ENTREPRISE, companies, key='select_entreprise')
-    cookies['entreprise_selected'] = json.dumps([selected])
+    get_preferences().set('entreprise_selected', [selected])
     info = df_ent[df_ent[LABEL_ENTREPRISES] == selected].iloc[0]
     color = st.sidebar.color_picker(LABEL_COULEUR_PRINCIPALE, THEME['accent'])
     fields = [c for c in df_ent.columns if c not in [LABEL_ENTREPRISES, LABEL_DESCRIPTION, LABEL_URL_LOGO, LABEL_URL_VIDEO, LABEL_LOGO]]
@@ -474,6 +471,7 @@ def render_description_section(info):
     st.markdown(desc_html, unsafe_allow_html=True)
 
 def render_map_section(info):
+    import pydeck as pdk
     render_section('Localisation')
     
     # Trouver toutes les colonnes qui commencent par "localisation" ou "Localisation"
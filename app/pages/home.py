@@ -1,13 +1,9 @@
 import streamlit as st
-import plotly.express as px
 import pandas as pd
-from sidebar import show_sidebar, cookies
+from sidebar import show_sidebar
 import json
 import pandas as pd
-import pydeck as pdk
 import time
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
 
 # === CONSTANTES GLOBALES ===
 SCORE_GLOBAL = "Score global"
@@ -105,6 +101,10 @@ def display(all_dfs: dict):
     show_global_map(df_ent)
 
 def show_global_map(df_ent):
+    # Imports différés : cartographie et géocodage ne sont chargés qu'à l'affichage de la carte
+    import pydeck as pdk
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
     
     st.markdown("---")
     st.markdown(f"<div style='text-align:center; font-size:1.08em; color:{COLOR_COST_TITLE}; font-weight:600; margin-bottom:0.2em;'>Carte des entreprises</div>", unsafe_allow_html=True)
@@ -484,13 +484,19 @@ def _build_cost_bar_chart(df_agg):
 def show_costs(df_sol):
     # Affiche le comparatif prévisionnel des coûts par entreprise.
     st.markdown("---")
+    _show_costs_fragment(df_sol)
+
+@st.fragment
+def _show_costs_fragment(df_sol):
+    # Fragment : déplacer le curseur ne ré-exécute que ce graphique,
+    # pas la page entière (CSS, cookies, carte, logos).
     st.markdown(f"<div style='text-align:center; font-size:1.08em; color:{COLOR_COST_TITLE}; font-weight:600; margin-bottom:0.2em;'>{TITRE_COST}</div>", unsafe_allow_html=True)
     if _show_costs_info_if_missing(df_sol):
         return
     col_init, col_rec, col_sol = _find_cost_columns(df_sol)
     if _show_costs_info_if_invalid_columns(col_init, col_rec, col_sol):
         return
-    mois = _show_costs_sidebar_slider()
+    mois = _show_costs_slider()
     df_plot = _prepare_cost_dataframe(df_sol, col_sol, col_init, col_rec, mois)
     if _show_costs_info_if_no_data(df_plot):
         return
@@ -509,10 +515,10 @@ def _show_costs_info_if_invalid_columns(col_init, col_rec, col_ent):
         return True
     return False
 
-def _show_costs_sidebar_slider():
-    with st.sidebar:
-        mois = st.slider("Nombre de mois pour la prévision", min_value=1, max_value=120, value=12, key=KEY_SLIDER_MOIS)
-    return mois
+def _show_costs_slider():
+    # Le curseur vit dans le corps du fragment : un fragment ne peut pas écrire
+    # à la fois dans la sidebar et dans la page principale.
+    return st.slider("Nombre de mois pour la prévision", min_value=1, max_value=120, value=12, key=KEY_SLIDER_MOIS)
 
 def _show_costs_info_if_no_data(df_plot):
     if df_plot is None or df_plot.empty:
@@ -24,14 +24,11 @@ Version : 3.0 (Refactorisée - 2025.01.10)
 
 import streamlit as st
 import pandas as pd
-import pydeck as pdk
-import json
 import os
 import hashlib
 import time
 from pathlib import Path
-from geopy.geocoders import Nominatim
-from sidebar import cookies, apply_sidebar_styles, show_sidebar
+from sidebar import get_preferences, apply_sidebar_styles, show_sidebar
 from app.pages.entreprise import render_left_column, get_url_site, render_logo_section, render_description_section, render_map_section, render_header
 from typing import Any
 
@@ -54,6 +51,7 @@ LABEL_IMAGE_UPLOADED_CAPTION = "Image: {name}"
 LABEL_IMPOSSIBLE_CHARGER_IMAGE = "Impossible de charger l'image depuis l'URL: {url}"
 LABEL_ERREUR_URL = "Erreur lors du traitement de l'URL: {url}"
 LABEL_ASTUCE_URL = "Astuce : Assurez-vous que l'URL pointe directement vers un fichier image (.jpg, .png, .gif, etc.)"
+KEY_IMAGE_URLS_STATE = "solution_image_urls"
 # --- Configuration pour la persistance des images ---
 UPLOAD_DIR = Path("uploads/user_images")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -188,22 +186,17 @@ def load_saved_image(filepath):
 
 def get_persistent_images(solution_name):
     """
-    Récupère les images persistantes pour une solution depuis les cookies.
+    Récupère les images persistantes pour une solution depuis les préférences.
     Args:
         solution_name: Nom de la solution
     Returns:
         tuple: (urls_list, saved_files_paths_list)
     """
-    cookie_key_urls = f"solution_images_urls_{solution_name}"
-    cookie_key_files = f"solution_images_files_{solution_name}"
+    preferences = get_preferences()
     
-    # Récupérer les URLs depuis les cookies
-    saved_urls_raw = cookies.get(cookie_key_urls)
-    saved_urls = json.loads(saved_urls_raw) if saved_urls_raw else []
-    
-    # Récupérer les chemins de fichiers depuis les cookies
-    saved_files_raw = cookies.get(cookie_key_files)
-    saved_files = json.loads(saved_files_raw) if saved_files_raw else []
+    # Récupérer les URLs et les chemins de fichiers (anciens cookies repris au besoin)
+    saved_urls = preferences.get(f"solution_images_urls_{solution_name}") or []
+    saved_files = preferences.get(f"solution_images_files_{solution_name}") or []
     
     # Vérifier que les fichiers existent encore
     valid_files = []
@@ -215,18 +208,17 @@ def get_persistent_images(solution_name):
 
 def save_persistent_images(solution_name, urls_list, uploaded_files):
     """
-    Sauvegarde les images et leurs références dans les cookies.
+    Sauvegarde les images et leurs références dans les préférences.
     Args:
         solution_name: Nom de la solution
         urls_list: Liste des URLs d'images
         uploaded_files: Liste des fichiers uploadés
     """
-    cookie_key_urls = f"solution_images_urls_{solution_name}"
-    cookie_key_files = f"solution_images_files_{solution_name}"
+    preferences = get_preferences()
     
     # Sauvegarder les URLs
     clean_urls = [url.strip() for url in urls_list if url and url.strip()]
-    cookies[cookie_key_urls] = json.dumps(clean_urls)
+    preferences.set(f"solution_images_urls_{solution_name}", clean_urls)
     
     # Sauvegarder les fichiers uploadés et stocker leurs chemins
     saved_files = []
@@ -240,7 +232,7 @@ def save_persistent_images(solution_name, urls_list, uploaded_files):
     _, old_files = get_persistent_images(solution_name)
     all_files = list(set(old_files + saved_files))  # Éviter les doublons
     
-    cookies[cookie_key_files] = json.dumps(all_files)
+    preferences.set(f"solution_images_files_{solution_name}", all_files)
 
 # --- HTML Generators ---
 def _wrap_html(html: str, max_width: int = 900):
@@ -529,6 +521,35 @@ def _validate_dataframe(df_sol: pd.DataFrame) -> tuple[bool, str]:
         return False, LABEL_ERREUR_AUCUNE_SOLUTION
     return True, solution_column
 
+@st.fragment
+def _render_image_url_inputs() -> list:
+    """
+    Champs de saisie des URLs d'images, isolés dans un fragment.
+
+    Modifier le nombre de champs ou un champ vide ne ré-exécute que ce fragment.
+    La page complète n'est relancée que lorsque la liste effective d'URLs change,
+    puisque c'est elle qui alimente la section Images.
+
+    Returns:
+        list: URLs non vides saisies par l'utilisateur
+    """
+    st.markdown(f"**{LABEL_URLS_IMAGES}**")
+    num_urls = st.number_input(LABEL_NB_URLS_IMAGES, min_value=0, max_value=5, value=1, key='num_image_urls')
+    image_urls = []
+    for i in range(num_urls):
+        url = st.text_input(
+            f"URL de l'image {i+1}",
+            placeholder=LABEL_PLACEHOLDER_URL,
+            key=f'custom_image_url_{i}'
+        )
+        if url and url.strip():
+            image_urls.append(url.strip())
+    previous_urls = st.session_state.get(KEY_IMAGE_URLS_STATE)
+    st.session_state[KEY_IMAGE_URLS_STATE] = image_urls
+    if previous_urls is not None and previous_urls != image_urls:
+        st.rerun()
+    return image_urls
+
 def _setup_sidebar_inputs(solutions: list) -> tuple[str, list, Any]:
     """
     Configure les éléments d'entrée de la sidebar.
@@ -544,7 +565,7 @@ def _setup_sidebar_inputs(solutions: list) -> tuple[str, list, Any]:
         selected = st.sidebar.selectbox(LABEL_CHOIX_SOLUTION, solutions, key='select_solution')
     else:
         selected = ""
-    cookies['solution_selected'] = json.dumps([selected])
+    get_preferences().set('solution_selected', [selected])
 
     # Champs visibles : tous les champs valides pour la solution sélectionnée
     import pandas as pd
@@ -574,18 +595,9 @@ def _setup_sidebar_inputs(solutions: list) -> tuple[str, list, Any]:
             st.session_state['selected_fields_sidebar'] = selected_fields
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"**{LABEL_AJOUTER_IMAGES}**")
-    # URLs d'images
-    st.sidebar.markdown(f"**{LABEL_URLS_IMAGES}**")
-    num_urls = st.sidebar.number_input(LABEL_NB_URLS_IMAGES, min_value=0, max_value=5, value=1, key='num_image_urls')
-    image_urls = []
-    for i in range(num_urls):
-        url = st.sidebar.text_input(
-            f"URL de l'image {i+1}",
-            placeholder=LABEL_PLACEHOLDER_URL,
-            key=f'custom_image_url_{i}'
-        )
-        if url and url.strip():
-            image_urls.append(url.strip())
+    # URLs d'images (fragment : éditer les champs ne relance pas toute la page)
+    with st.sidebar:
+        image_urls = _render_image_url_inputs()
     # Upload d'images
     st.sidebar.markdown(f"**{LABEL_TELECHARGER_IMAGES}**")
     # Clé dynamique pour le file_uploader
@@ -657,8 +669,7 @@ def _render_url_deletion_buttons(persistent_urls: list, selected: str):
         with col2:
             if st.button(LABEL_SUPPRIMER_URL, key=f"delete_url_{i}", help=LABEL_SUPPRIMER_URL_TOOLTIP):
                 updated_urls = [u for j, u in enumerate(persistent_urls) if j != i]
-                cookie_key_urls = f"solution_images_urls_{selected}"
-                cookies[cookie_key_urls] = json.dumps(updated_urls)
+                get_preferences().set(f"solution_images_urls_{selected}", updated_urls)
                 st.sidebar.success(LABEL_SUPPRIMER_URL_SUCCESS)
                 st.rerun()
 
@@ -691,8 +702,7 @@ def _render_file_deletion_buttons(persistent_files: list, selected: str):
                 
                 # Supprimer de la liste persistante
                 updated_files = [f for j, f in enumerate(persistent_files) if j != i]
-                cookie_key_files = f"solution_images_files_{selected}"
-                cookies[cookie_key_files] = json.dumps(updated_files)
+                get_preferences().set(f"solution_images_files_{selected}", updated_files)
                 
                 # Assurer que la clé existe avant de l'incrémenter
                 if 'file_uploader_key' not in st.session_state:
@@ -721,11 +731,9 @@ def _render_global_deletion_button(persistent_urls: list, persistent_files: list
             except Exception:
                 pass
         
-        # Nettoyer les cookies
-        cookie_key_urls = f"solution_images_urls_{selected}"
-        cookie_key_files = f"solution_images_files_{selected}"
-        cookies[cookie_key_urls] = json.dumps([])
-        cookies[cookie_key_files] = json.dumps([])
+        # Nettoyer les préférences
+        get_preferences().set(f"solution_images_urls_{selected}", [])
+        get_preferences().set(f"solution_images_files_{selected}", [])
         
         # Assurer que la clé existe avant de l'incrémenter
         if 'file_uploader_key' not in st.session_state:
@@ -1062,7 +1070,7 @@ def display(df_sol: pd.DataFrame):
     solutions = df_sol[solution_column].dropna().unique()
     selected, image_urls, uploaded_images, selected_fields = _setup_sidebar_inputs(list(solutions))
     info = df_sol[df_sol[solution_column] == selected].iloc[0] if selected else df_sol.iloc[0]
-    cookies['solution_selected'] = json.dumps([selected])
+    get_preferences().set('solution_selected', [selected])
     st.session_state['selected_fields_sidebar'] = selected_fields
     persistent_urls, persistent_files = _handle_image_persistence(selected, image_urls, uploaded_images)
     _render_persistent_images_sidebar(selected, persistent_urls, persistent_files)
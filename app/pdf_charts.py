@@ -2,35 +2,25 @@
 Module d'amélioration du générateur PDF avec graphiques et statistiques
 ====================================================================
 
-Ce module étend le générateur PDF de base avec des fonctionnalités avancées :
-- Graphiques en barres et camemberts
-- Analyses statistiques des données
-- Visualisations des filtres appliqués
-- Métriques de performance
+Ce module fournit les graphiques du générateur PDF de base (option
+chart_backend d'IVEOPDFGenerator) :
+- Graphiques en barres et camemberts (images matplotlib ou dessins vectoriels ReportLab)
+- Répartition des entreprises, des solutions et des critères d'évaluation
 
-Version : 1.1 - 2025.01.16
+matplotlib, seaborn et ReportLab ne sont importés qu'au premier graphique
+produit : importer ce module ne coûte presque rien au démarrage.
+
+Version : 1.4 - 2025.01.16
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import seaborn as sns
-import pandas as pd
-import numpy as np
-from io import BytesIO
-import base64
-import tempfile
+import functools
+import hashlib
 import os
-
-from reportlab.platypus import Image, Spacer, Paragraph, PageBreak
-from reportlab.lib.units import inch
+import threading
+from collections import OrderedDict
+from io import BytesIO
 
 # =================== VARIABLES D'ÉTAT ET MESSAGES ===================
-MSG_NO_COMPANY_DATA = "Aucune donnée d'entreprise disponible."
-MSG_NO_SOLUTION_DATA = "Aucune donnée de solution disponible."
-MSG_NO_COMPARATIVE_DATA = "Aucune donnée d'analyse comparative disponible."
-TITLE_COMPANIES_ANALYSIS = "2. Analyse des entreprises"
-TITLE_SOLUTIONS_ANALYSIS = "3. Analyse des solutions"
-TITLE_COMPARATIVE_ANALYSIS = "4. Analyse comparative"
 CAPTION_COMPANIES_CHART = "Graphique 1: Répartition des entreprises par secteur"
 CAPTION_SOLUTIONS_CHART = "Graphique 2: Répartition des solutions par catégorie"
 CAPTION_COMPARATIVE_CHART = "Graphique 3: Critères d'évaluation par catégorie"
@@ -38,20 +28,107 @@ ERR_COMPANIES_CHART = "Erreur lors de la création du graphique entreprises: {}"
 ERR_SOLUTIONS_CHART = "Erreur lors de la création du graphique solutions: {}"
 ERR_COMPARATIVE_CHART = "Erreur lors de la création du graphique comparatif: {}"
 
-# Configuration matplotlib pour de meilleurs graphiques
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+# =================== CONFIGURATION ===================
+CHART_DPI = int(os.getenv("IVEO_CHART_DPI", "300"))
+POINTS_PER_INCH = 72  # reportlab.lib.units.inch, sans importer ReportLab
+CHART_WIDTH = 6 * POINTS_PER_INCH
+CHART_HEIGHT = 3.6 * POINTS_PER_INCH
+CHART_CACHE_MAX = 64  # Graphiques PNG mémorisés par processus
+_CHART_CACHE = OrderedDict()
+_CHART_CACHE_LOCK = threading.Lock()
+
+# Moteurs de graphiques : images matplotlib (PNG) ou dessins vectoriels ReportLab
+CHART_BACKEND_RASTER = "matplotlib"
+CHART_BACKEND_VECTOR = "reportlab"
+VECTOR_TITLE_FONT = ("Helvetica-Bold", 11)
+VECTOR_LABEL_FONT = ("Helvetica", 7)
+VECTOR_LABEL_MAX_CHARS = 25
+# Équivalent de la palette matplotlib « Set3 » utilisée par le camembert matriciel
+VECTOR_PIE_COLORS = [
+    "#8dd3c7", "#ffffb3", "#bebada", "#fb8072", "#80b1d3", "#fdb462",
+    "#b3de69", "#fccde5", "#d9d9d9", "#bc80bd", "#ccebc5", "#ffed6f"
+]
+
+
+@functools.lru_cache(maxsize=1)
+def _pyplot():
+    """
+    Importe et configure matplotlib au premier graphique matriciel.
+    
+    Returns:
+        module: matplotlib.pyplot, sur le backend Agg
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # Rendu hors écran : aucun backend interactif dans le serveur
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    # Configuration matplotlib pour de meilleurs graphiques
+    plt.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+    plt.rcParams['figure.facecolor'] = 'white'
+    plt.rcParams['axes.facecolor'] = 'white'
+    return plt
+
 
 class PDFChartGenerator:
     """
     Générateur de graphiques pour les rapports PDF.
     """
     
-    def __init__(self, theme_color="#0072B2"):
+    def __init__(self, theme_color="#0072B2", dpi=CHART_DPI):
         self.theme_color = theme_color
         self.fig_size = (10, 6)
-        plt.rcParams['figure.facecolor'] = 'white'
-        plt.rcParams['axes.facecolor'] = 'white'
+        self.dpi = dpi
+
+    def _chart_key(self, kind, counts):
+        """
+        Construit la clé de cache d'un graphique à partir des effectifs tracés.
+        
+        Args:
+            kind (str): Type de graphique
+            counts (pd.Series): Effectifs (value_counts) représentés
+            
+        Returns:
+            str: Empreinte SHA-256 des effectifs et du rendu demandé
+        """
+        payload = repr((kind, list(counts.items()), self.theme_color, self.fig_size, self.dpi))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _render_chart(self, kind, counts, draw):
+        """
+        Rend un graphique en PNG en mémoire, ou le reprend du cache.
+        
+        Args:
+            kind (str): Type de graphique
+            counts (pd.Series): Effectifs à représenter
+            draw (callable): Fonction (ax, counts) qui trace le graphique
+            
+        Returns:
+            Image: Objet Image ReportLab
+        """
+        from reportlab.platypus import Image
+        key = self._chart_key(kind, counts)
+        with _CHART_CACHE_LOCK:
+            png = _CHART_CACHE.get(key)
+            if png is not None:
+                _CHART_CACHE.move_to_end(key)
+        if png is None:
+            plt = _pyplot()
+            fig, ax = plt.subplots(figsize=self.fig_size)
+            try:
+                draw(ax, counts)
+                fig.tight_layout()
+                buffer = BytesIO()
+                fig.savefig(buffer, format='png', dpi=self.dpi, bbox_inches='tight')
+            finally:
+                plt.close(fig)
+            png = buffer.getvalue()
+            with _CHART_CACHE_LOCK:
+                _CHART_CACHE[key] = png
+                while len(_CHART_CACHE) > CHART_CACHE_MAX:
+                    _CHART_CACHE.popitem(last=False)
+        # Un flowable ne sert qu'une fois : nouvel objet Image à chaque appel, PNG partagé
+        return Image(BytesIO(png), width=CHART_WIDTH, height=CHART_HEIGHT)
         
     def create_companies_chart(self, df_ent, selected_companies=None):
         """
@@ -80,34 +157,24 @@ class PDFChartGenerator:
                 df_filtered = df_ent
             # Compter les entreprises par secteur
             sector_counts = df_filtered[sector_column].value_counts()
-            # Créer le graphique
-            fig, ax = plt.subplots(figsize=self.fig_size)
-            # Graphique en barres
-            bars = ax.bar(range(len(sector_counts)), sector_counts.values, color=self.theme_color, alpha=0.8)
-            # Personnalisation
-            ax.set_title(CAPTION_COMPANIES_CHART, fontsize=16, fontweight='bold', pad=20)
-            ax.set_xlabel("Secteurs d'activité", fontsize=12)
-            ax.set_ylabel("Nombre d'entreprises", fontsize=12)
-            ax.set_xticks(range(len(sector_counts)))
-            ax.set_xticklabels(sector_counts.index, rotation=45, ha='right')
-            # Ajouter les valeurs sur les barres
-            for bar, value in zip(bars, sector_counts.values):
-                ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, str(value), ha='center', va='bottom', fontweight='bold')
-            plt.tight_layout()
-            # Sauvegarder en tant qu'image temporaire
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                plt.savefig(tmp.name, format='png', dpi=300, bbox_inches='tight')
-                tmp_path = tmp.name
-            plt.close()
-            # Créer l'objet Image ReportLab
-            img = Image(tmp_path, width=6*inch, height=3.6*inch)
-            # Nettoyer le fichier temporaire
-            os.unlink(tmp_path)
-            return img
+            return self._render_chart("companies", sector_counts, self._draw_companies_chart)
         except Exception as e:
             print(ERR_COMPANIES_CHART.format(e))
             return None
     
+    def _draw_companies_chart(self, ax, sector_counts):
+        """Trace les entreprises par secteur en barres verticales."""
+        bars = ax.bar(range(len(sector_counts)), sector_counts.values, color=self.theme_color, alpha=0.8)
+        # Personnalisation
+        ax.set_title(CAPTION_COMPANIES_CHART, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel("Secteurs d'activité", fontsize=12)
+        ax.set_ylabel("Nombre d'entreprises", fontsize=12)
+        ax.set_xticks(range(len(sector_counts)))
+        ax.set_xticklabels(sector_counts.index, rotation=45, ha='right')
+        # Ajouter les valeurs sur les barres
+        for bar, value in zip(bars, sector_counts.values):
+            ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, str(value), ha='center', va='bottom', fontweight='bold')
+    
     def create_solutions_chart(self, df_sol):
         """
         Crée un graphique des solutions par catégorie.
@@ -129,40 +196,31 @@ class PDFChartGenerator:
                 return None
             # Compter les solutions par catégorie
             category_counts = df_sol[category_column].value_counts()
-            # Créer le graphique en camembert
-            fig, ax = plt.subplots(figsize=self.fig_size)
-            # Palette de couleurs
-            cmap = cm.get_cmap('Set3')
-            colors = [cmap(i) for i in range(len(category_counts))]
-            wedges, texts, autotexts = ax.pie(
-                category_counts.values,
-                labels=category_counts.index,
-                autopct='%1.1f%%',
-                colors=colors,
-                startangle=90,
-                textprops={'fontsize': 10}
-            )
-            # Personnalisation
-            ax.set_title(CAPTION_SOLUTIONS_CHART, fontsize=16, fontweight='bold', pad=20)
-            # Améliorer la lisibilité
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-            plt.tight_layout()
-            # Sauvegarder en tant qu'image temporaire
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                plt.savefig(tmp.name, format='png', dpi=300, bbox_inches='tight')
-                tmp_path = tmp.name
-            plt.close()
-            # Créer l'objet Image ReportLab
-            img = Image(tmp_path, width=6*inch, height=3.6*inch)
-            # Nettoyer le fichier temporaire
-            os.unlink(tmp_path)
-            return img
+            return self._render_chart("solutions", category_counts, self._draw_solutions_chart)
         except Exception as e:
             print(ERR_SOLUTIONS_CHART.format(e))
             return None
     
+    def _draw_solutions_chart(self, ax, category_counts):
+        """Trace les solutions par catégorie en camembert."""
+        # Palette de couleurs
+        cmap = _pyplot().get_cmap('Set3')
+        colors = [cmap(i) for i in range(len(category_counts))]
+        wedges, texts, autotexts = ax.pie(
+            category_counts.values,
+            labels=category_counts.index,
+            autopct='%1.1f%%',
+            colors=colors,
+            startangle=90,
+            textprops={'fontsize': 10}
+        )
+        # Personnalisation
+        ax.set_title(CAPTION_SOLUTIONS_CHART, fontsize=16, fontweight='bold', pad=20)
+        # Améliorer la lisibilité
+        for autotext in autotexts:
+            autotext.set_color('white')
+            autotext.set_fontweight('bold')
+    
     def create_comparative_chart(self, df_comp):
         """
         Crée un graphique d'analyse comparative.
@@ -184,104 +242,118 @@ class PDFChartGenerator:
                 return None
             # Compter les critères par catégorie
             category_counts = df_comp[category_column].value_counts()
-            # Créer le graphique
-            fig, ax = plt.subplots(figsize=self.fig_size)
-            # Graphique en barres horizontales
-            bars = ax.barh(range(len(category_counts)), category_counts.values, color=self.theme_color, alpha=0.8)
-            # Personnalisation
-            ax.set_title(CAPTION_COMPARATIVE_CHART, fontsize=16, fontweight='bold', pad=20)
-            ax.set_xlabel("Nombre de critères", fontsize=12)
-            ax.set_ylabel("Catégories", fontsize=12)
-            ax.set_yticks(range(len(category_counts)))
-            ax.set_yticklabels(category_counts.index)
-            # Ajouter les valeurs
-            for i, (bar, value) in enumerate(zip(bars, category_counts.values)):
-                ax.text(bar.get_width() + 0.3, bar.get_y() + bar.get_height()/2, str(value), ha='left', va='center', fontweight='bold')
-            plt.tight_layout()
-            # Sauvegarder en tant qu'image temporaire
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                plt.savefig(tmp.name, format='png', dpi=300, bbox_inches='tight')
-                tmp_path = tmp.name
-            plt.close()
-            # Créer l'objet Image ReportLab
-            img = Image(tmp_path, width=6*inch, height=3.6*inch)
-            # Nettoyer le fichier temporaire
-            os.unlink(tmp_path)
-            return img
+            return self._render_chart("comparative", category_counts, self._draw_comparative_chart)
         except Exception as e:
             print(ERR_COMPARATIVE_CHART.format(e))
             return None
 
-def add_charts_to_pdf_generator(generator_class):
+    def _draw_comparative_chart(self, ax, category_counts):
+        """Trace les critères par catégorie en barres horizontales."""
+        bars = ax.barh(range(len(category_counts)), category_counts.values, color=self.theme_color, alpha=0.8)
+        # Personnalisation
+        ax.set_title(CAPTION_COMPARATIVE_CHART, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel("Nombre de critères", fontsize=12)
+        ax.set_ylabel("Catégories", fontsize=12)
+        ax.set_yticks(range(len(category_counts)))
+        ax.set_yticklabels(category_counts.index)
+        # Ajouter les valeurs
+        for bar, value in zip(bars, category_counts.values):
+            ax.text(bar.get_width() + 0.3, bar.get_y() + bar.get_height()/2, str(value), ha='left', va='center', fontweight='bold')
+
+class VectorChartGenerator(PDFChartGenerator):
     """
-    Ajoute les fonctionnalités graphiques au générateur PDF.
+    Générateur de graphiques vectoriels (reportlab.graphics).
+    
+    Mêmes graphiques et mêmes données que PDFChartGenerator, mais dessinés
+    directement dans le PDF : aucun rendu matplotlib, un fichier bien plus
+    léger et un tracé net à tous les niveaux de zoom.
     """
 
-    def _handle_empty_df(self, title):
-        if "entreprise" in title.lower():
-            self.story.append(Paragraph(MSG_NO_COMPANY_DATA, self.styles['IVEONormal']))
-        elif "solution" in title.lower():
-            self.story.append(Paragraph(MSG_NO_SOLUTION_DATA, self.styles['IVEONormal']))
-        else:
-            self.story.append(Paragraph(MSG_NO_COMPARATIVE_DATA, self.styles['IVEONormal']))
-
-    def _add_chart_and_table(self, chart, caption, table_func, df, selected):
-        if chart:
-            self.story.append(chart)
-            self.story.append(Spacer(1, 12))
-            self.story.append(Paragraph(caption, self.styles['IVEOCaption']))
-            self.story.append(Spacer(1, 20))
-        if table_func and selected:
-            table = table_func(df, selected)
-            self.story.append(table)
+    def _render_chart(self, kind, counts, draw):
+        """
+        Construit le dessin ReportLab correspondant au type de graphique.
+        
+        Args:
+            kind (str): Type de graphique
+            counts (pd.Series): Effectifs à représenter
+            draw (callable): Tracé matplotlib (ignoré par ce moteur)
+            
+        Returns:
+            Drawing: Dessin vectoriel ReportLab
+        """
+        labels = [str(label)[:VECTOR_LABEL_MAX_CHARS] for label in counts.index]
+        values = [int(value) for value in counts.values]
+        if kind == "solutions":
+            return self._vector_pie(CAPTION_SOLUTIONS_CHART, labels, values)
+        if kind == "comparative":
+            return self._vector_bars(CAPTION_COMPARATIVE_CHART, labels, values, horizontal=True)
+        return self._vector_bars(CAPTION_COMPANIES_CHART, labels, values, horizontal=False)
 
-    def _add_chart_section(self, title, df, chart_func, caption, table_func=None, get_selected_func=None):
-        self.story.append(Paragraph(title, self.styles['IVEOSubtitle']))
-        if df is None or df.empty:
-            self._handle_empty_df(title)
-            return
-        chart_generator = PDFChartGenerator()
-        selected = get_selected_func(df) if get_selected_func else None
-        chart = chart_func(chart_generator, df, selected) if selected is not None else chart_func(chart_generator, df)
-        self._add_chart_and_table(chart, caption, table_func, df, selected)
-        self.story.append(PageBreak())
+    def _new_drawing(self, title):
+        from reportlab.graphics.shapes import Drawing, String
+        drawing = Drawing(CHART_WIDTH, CHART_HEIGHT)
+        drawing.add(String(
+            CHART_WIDTH / 2, CHART_HEIGHT - VECTOR_TITLE_FONT[1], title,
+            fontName=VECTOR_TITLE_FONT[0], fontSize=VECTOR_TITLE_FONT[1], textAnchor="middle"
+        ))
+        return drawing
 
-    def _add_charts_to_companies_analysis(self, df_ent):
-        """Version améliorée avec graphiques."""
-        self._add_chart_section(
-            TITLE_COMPANIES_ANALYSIS,
-            df_ent,
-            lambda gen, df, sel: gen.create_companies_chart(df, sel),
-            CAPTION_COMPANIES_CHART,
-            table_func=self._create_companies_table,
-            get_selected_func=self._get_selected_companies
-        )
+    def _vector_bars(self, title, labels, values, horizontal):
+        """Barres verticales (secteurs) ou horizontales (catégories de critères), valeurs affichées."""
+        from reportlab.lib.colors import HexColor
+        from reportlab.graphics.charts.barcharts import VerticalBarChart, HorizontalBarChart
+        drawing = self._new_drawing(title)
+        chart = HorizontalBarChart() if horizontal else VerticalBarChart()
+        # Marges réservées aux libellés de catégories (obliques sous l'axe ou à gauche)
+        chart.x = 0.3 * CHART_WIDTH if horizontal else 40
+        chart.y = 20 if horizontal else 0.3 * CHART_HEIGHT
+        chart.width = CHART_WIDTH - chart.x - 30
+        chart.height = CHART_HEIGHT - chart.y - 2 * VECTOR_TITLE_FONT[1]
+        chart.data = [values]
+        chart.bars[0].fillColor = HexColor(self.theme_color)
+        chart.bars[0].strokeColor = None
+        chart.valueAxis.valueMin = 0
+        chart.valueAxis.labels.fontName, chart.valueAxis.labels.fontSize = VECTOR_LABEL_FONT
+        chart.categoryAxis.categoryNames = labels
+        chart.categoryAxis.labels.fontName, chart.categoryAxis.labels.fontSize = VECTOR_LABEL_FONT
+        if horizontal:
+            chart.categoryAxis.labels.boxAnchor = "e"
+            chart.categoryAxis.labels.dx = -4
+        else:
+            chart.categoryAxis.labels.boxAnchor = "ne"
+            chart.categoryAxis.labels.angle = 45
+        chart.barLabelFormat = "%d"
+        chart.barLabels.fontName = "Helvetica-Bold"
+        chart.barLabels.fontSize = VECTOR_LABEL_FONT[1]
+        chart.barLabels.nudge = 6
+        drawing.add(chart)
+        return drawing
 
-    def _add_charts_to_solutions_analysis(self, df_sol):
-        """Version améliorée avec graphiques."""
-        self._add_chart_section(
-            TITLE_SOLUTIONS_ANALYSIS,
-            df_sol,
-            lambda gen, df: gen.create_solutions_chart(df),
-            CAPTION_SOLUTIONS_CHART
-        )
-        # Tableau des solutions (code existant)
-        # ... (garder le code existant)
-        self.story.append(PageBreak())
+    def _vector_pie(self, title, labels, values):
+        """Camembert avec pourcentages dans les libellés."""
+        from reportlab.lib.colors import HexColor
+        from reportlab.graphics.charts.piecharts import Pie
+        drawing = self._new_drawing(title)
+        pie = Pie()
+        size = CHART_HEIGHT - 4 * VECTOR_TITLE_FONT[1]
+        pie.width = pie.height = size
+        pie.x = (CHART_WIDTH - size) / 2
+        pie.y = VECTOR_TITLE_FONT[1]
+        pie.data = values
+        total = sum(values) or 1
+        pie.labels = [f"{label} ({value / total:.1%})" for label, value in zip(labels, values)]
+        pie.startAngle = 90
+        pie.sideLabels = True
+        pie.slices.strokeColor = HexColor("#ffffff")
+        pie.slices.fontName, pie.slices.fontSize = VECTOR_LABEL_FONT
+        for index in range(len(values)):
+            pie.slices[index].fillColor = HexColor(VECTOR_PIE_COLORS[index % len(VECTOR_PIE_COLORS)])
+        drawing.add(pie)
+        return drawing
 
-    def _add_charts_to_comparative_analysis(self, df_comp):
-        """Version améliorée avec graphiques."""
-        self._add_chart_section(
-            TITLE_COMPARATIVE_ANALYSIS,
-            df_comp,
-            lambda gen, df: gen.create_comparative_chart(df),
-            CAPTION_COMPARATIVE_CHART
-        )
-        self.story.append(PageBreak())
 
-    # Remplacer les méthodes existantes
-    generator_class._add_companies_analysis = _add_charts_to_companies_analysis
-    generator_class._add_solutions_analysis = _add_charts_to_solutions_analysis
-    generator_class._add_comparative_analysis = _add_charts_to_comparative_analysis
+CHART_GENERATORS = {
+    CHART_BACKEND_RASTER: PDFChartGenerator,
+    CHART_BACKEND_VECTOR: VectorChartGenerator,
+}
 
-    return generator_class
@@ -16,18 +16,25 @@ Auteur : Équipe IVÉO
 Version : 1.0 - 2025.01.16
 """
 
+import os
 import streamlit as st
-import pandas as pd
+import numpy as np
 from io import BytesIO
 import base64
 from datetime import datetime
-import json
-from sidebar import cookies
-from reportlab.lib.pagesizes import A4
+from xml.sax.saxutils import escape
+from app.utils import ANSWER_LOOKUP, ANSWER_YES, ANSWER_NO, ANSWER_PARTIAL
+from app.pdf_charts import (
+    CHART_GENERATORS, CAPTION_COMPANIES_CHART, CAPTION_SOLUTIONS_CHART, CAPTION_COMPARATIVE_CHART
+)
+from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.platypus import (
+    BaseDocTemplate, PageTemplate, Frame, NextPageTemplate,
+    Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak
+)
 
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 from reportlab.lib import colors
@@ -61,7 +68,6 @@ TABLE_COMPANY_HEADER = ["Entreprise", "Secteur", "Localisation", "Statut"]
 COMPANY_COL_SECTOR = "Secteur d'activité"
 COMPANY_COL_LOCATION = "Localisation"
 COMPANY_COL_STATUS = "Statut"
-COMPANY_MAX = 10
 TITLE_SOLUTIONS = "3. Analyse des solutions"
 LABEL_NO_SOLUTION_DATA = "Aucune donnée de solution disponible."
 TABLE_SOLUTION_HEADER = ["Solution", "Catégorie", "Fournisseur", "Statut"]
@@ -74,12 +80,36 @@ LABEL_NO_COMP_DATA = "Aucune donnée d'analyse comparative disponible."
 LABEL_FILTERS_APPLIED = "Filtres appliqués:"
 LABEL_CATEGORIES = "Catégories: {categories}"
 LABEL_COMPANIES = "Entreprises: {companies}"
-TABLE_COMPARISON_HEADER = ["Type d'exigence", "Domaine", "Exigence différenciateur", "Exigence"]
+TABLE_COMPARISON_HEADER = ["Exigence", "Domaine", "Différenciateur"]
 COMPARISON_COL_TYPE = "Type d'exigence"
 COMPARISON_COL_DOMAIN = "Domaine"
 COMPARISON_COL_DIFF = "Exigence différenciateur"
 COMPARISON_COL_REQ = "Exigence"
-COMPARISON_MAX = 15
+COMPARISON_BASE_COLUMNS = [
+    COMPARISON_COL_TYPE, COMPARISON_COL_DOMAIN, COMPARISON_COL_DIFF, COMPARISON_COL_REQ, "Description", "Catégorie"
+]
+COMPARISON_INFO_MARKER = "Information complémentaire"
+# Largeurs de la matrice (points) : colonnes de base fixes, le reste partagé entre les entreprises ;
+# le tout est réduit proportionnellement s'il dépasse la largeur de la page paysage
+COMPARISON_BASE_WIDTHS = [2.2 * inch, 1 * inch, 0.8 * inch]
+COMPARISON_MIN_COMPANY_WIDTH = 0.45 * inch
+COMPARISON_FONT_SIZE = 7
+COMPARISON_LEADING = COMPARISON_FONT_SIZE + 1.5
+# Largeur moyenne d'un caractère Helvetica (en em, avec marge) : repli des exigences sans Paragraph
+COMPARISON_CHAR_EM = 0.55
+COMPARISON_CELL_PADDING = 6  # marges gauche et droite par défaut d'une cellule de Table
+# Gabarits de page : la matrice comparative est mise en page en paysage
+PAGE_TEMPLATE_PORTRAIT = "portrait"
+PAGE_TEMPLATE_LANDSCAPE = "paysage"
+FRAME_PADDING = 6
+COMPARISON_REQ_MAX_CHARS = 60
+COMPARISON_SHORT_MAX_CHARS = 18
+COMPANY_HEADER_MAX_CHARS = 12
+LABEL_SCORE_YES = "Oui"
+LABEL_SCORE_NO = "Non"
+LABEL_SCORE_PARTIAL = "Partiel"
+LABEL_SCORE_NA = "N/A"
+SCORE_LABELS = {ANSWER_YES: LABEL_SCORE_YES, ANSWER_NO: LABEL_SCORE_NO, ANSWER_PARTIAL: LABEL_SCORE_PARTIAL}
 TITLE_RECOMMENDATIONS = "5. Recommandations"
 RECOMMENDATIONS_TEXT = (
     "Basé sur l'analyse comparative réalisée, voici les principales recommandations :\n\n"
@@ -109,6 +139,9 @@ DOWNLOAD_STYLE = (
     "font-weight: bold; padding: 12px 24px; border-radius: 8px; margin: 10px 0;"
 )
 ERROR_PDF_GEN = "Erreur lors de la génération du PDF : {error}"
+ERROR_CHART_BACKEND = "Moteur de graphiques inconnu : {backend} (attendu : {expected})"
+# Graphiques du rapport : "matplotlib" (images), "reportlab" (vectoriels) ou vide (aucun graphique)
+PDF_CHART_BACKEND = os.getenv("IVEO_PDF_CHARTS") or None
 
 
 # Couleurs IVÉO
@@ -116,18 +149,99 @@ IVEO_BLUE = HexColor("#0072B2")
 IVEO_LIGHT_BLUE = HexColor("#e3f0fa")
 IVEO_GRAY = HexColor("#666666")
 
+
+def _text_column(df, column, max_len, default="N/A"):
+    """
+    Extrait une colonne sous forme de tableau de chaînes tronquées.
+    
+    Args:
+        df (pd.DataFrame): Données source
+        column (str): Nom de la colonne
+        max_len (int): Longueur maximale d'une cellule
+        default (str): Valeur des cellules vides ou d'une colonne absente
+        
+    Returns:
+        np.ndarray: Chaînes, une par ligne de df
+    """
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    values = df[column].fillna(default).astype(str).str.strip().str.slice(0, max_len)
+    return values.mask(values == "", default).to_numpy(dtype=object)
+
+
+def _wrapped_column(df, column, max_len, width):
+    """
+    Extrait une colonne de texte repliée sur plusieurs lignes pour une largeur de cellule.
+    
+    Le repli est fait en une opération vectorielle (Series.str.wrap) sur un
+    nombre de caractères estimé à partir de la largeur : les cellules restent
+    du texte brut, bien moins coûteux à construire qu'un Paragraph par ligne.
+    
+    Args:
+        df (pd.DataFrame): Données source
+        column (str): Nom de la colonne
+        max_len (int): Longueur maximale d'une cellule
+        width (float): Largeur de la colonne en points
+        
+    Returns:
+        np.ndarray: Chaînes (lignes séparées par « \\n »), une par ligne de df
+    """
+    if column not in df.columns:
+        return _text_column(df, column, max_len)
+    chars = max(1, int((width - 2 * COMPARISON_CELL_PADDING) / (COMPARISON_FONT_SIZE * COMPARISON_CHAR_EM)))
+    values = df[column].fillna("N/A").astype(str).str.strip().str.slice(0, max_len)
+    return values.mask(values == "", "N/A").str.wrap(chars).to_numpy(dtype=object)
+
+
+def _score_column(df, column):
+    """Interprète les réponses d'une entreprise (Oui / Non / Partiel / N/A), sans tenir compte de la casse."""
+    values = df[column].fillna("").astype(str).str.strip().str.lower()
+    return values.map(ANSWER_LOOKUP).map(SCORE_LABELS).fillna(LABEL_SCORE_NA).to_numpy(dtype=object)
+
+
 class IVEOPDFGenerator:
     """
     Générateur de rapport PDF pour l'application IVÉO BI.
     """
     
-    def __init__(self):
+    def __init__(self, chart_backend=PDF_CHART_BACKEND, preferences=None):
+        """
+        Args:
+            chart_backend (str): Moteur des graphiques (clé de CHART_GENERATORS), None pour un rapport sans graphiques
+            preferences (dict): Sélections de l'utilisateur (selected_companies, solution_selected,
+                selected_categories), lues par l'appelant ; aucune sélection si None
+            
+        Raises:
+            ValueError: Moteur de graphiques inconnu
+        """
+        if chart_backend is not None and chart_backend not in CHART_GENERATORS:
+            raise ValueError(ERROR_CHART_BACKEND.format(backend=chart_backend, expected=", ".join(CHART_GENERATORS)))
+        self.charts = CHART_GENERATORS[chart_backend]() if chart_backend else None
+        self.preferences = preferences or {}
         self.buffer = BytesIO()
-        self.doc = SimpleDocTemplate(self.buffer, pagesize=A4)
+        self.doc = BaseDocTemplate(self.buffer, pagesize=A4)
+        self.doc.addPageTemplates([
+            self._page_template(PAGE_TEMPLATE_PORTRAIT, A4),
+            self._page_template(PAGE_TEMPLATE_LANDSCAPE, landscape(A4)),
+        ])
+        # Largeur utile de la page paysage (cadre moins ses marges internes)
+        self.landscape_width = landscape(A4)[0] - self.doc.leftMargin - self.doc.rightMargin - 2 * FRAME_PADDING
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
         self.story = []
         
+    def _page_template(self, template_id, pagesize):
+        """Gabarit de page à un cadre, avec les marges du document."""
+        frame = Frame(
+            self.doc.leftMargin, self.doc.bottomMargin,
+            pagesize[0] - self.doc.leftMargin - self.doc.rightMargin,
+            pagesize[1] - self.doc.topMargin - self.doc.bottomMargin,
+            leftPadding=FRAME_PADDING, rightPadding=FRAME_PADDING,
+            topPadding=FRAME_PADDING, bottomPadding=FRAME_PADDING,
+            id=template_id
+        )
+        return PageTemplate(id=template_id, frames=[frame], pagesize=pagesize)
+        
     def _setup_custom_styles(self):
         """Configuration des styles personnalisés IVÉO."""
         # Style pour les titres principaux
@@ -182,6 +296,39 @@ class IVEOPDFGenerator:
             alignment=TA_CENTER,
             fontName='Helvetica-Oblique'
         ))
+        
+        # Styles des cellules de la matrice comparative (texte replié dans la colonne)
+        self.styles.add(ParagraphStyle(
+            name='IVEOMatrixCell',
+            parent=self.styles['Normal'],
+            fontSize=COMPARISON_FONT_SIZE,
+            leading=COMPARISON_LEADING,
+            fontName='Helvetica'
+        ))
+        self.styles.add(ParagraphStyle(
+            name='IVEOMatrixHeader',
+            parent=self.styles['IVEOMatrixCell'],
+            textColor=colors.whitesmoke,
+            fontName='Helvetica-Bold'
+        ))
+    
+    def _add_chart(self, create_chart, caption):
+        """
+        Ajoute un graphique et sa légende à la section en cours.
+        
+        Args:
+            create_chart (callable): create_chart(charts) -> graphique ReportLab ou None
+            caption (str): Légende du graphique
+        """
+        if self.charts is None:
+            return
+        chart = create_chart(self.charts)
+        if chart is None:
+            return
+        self.story.append(chart)
+        self.story.append(Spacer(1, 12))
+        self.story.append(Paragraph(caption, self.styles['IVEOCaption']))
+        self.story.append(Spacer(1, 20))
     
     def _add_header(self):
         """Ajoute l'en-tête du rapport avec le logo IVÉO."""
@@ -234,19 +381,15 @@ class IVEOPDFGenerator:
             self.story.append(Paragraph(LABEL_NO_COMPANY_DATA, self.styles['IVEONormal']))
             return
         selected_companies = self._get_selected_companies(df_ent)
+        self._add_chart(lambda charts: charts.create_companies_chart(df_ent, selected_companies), CAPTION_COMPANIES_CHART)
         if selected_companies:
             company_table = self._create_companies_table(df_ent, selected_companies)
             self.story.append(company_table)
         self.story.append(PageBreak())
     
     def _get_selected_companies(self, df_ent):
-        """Récupère les entreprises sélectionnées depuis les cookies."""
-        selected_companies = []
-        try:
-            selected_companies_json = cookies.get("selected_companies", "[]")
-            selected_companies = json.loads(selected_companies_json)
-        except (json.JSONDecodeError, TypeError):
-            pass
+        """Récupère les entreprises sélectionnées depuis les préférences."""
+        selected_companies = self.preferences.get("selected_companies", [])
         
         # Si aucune sélection, prendre toutes les entreprises
         if not selected_companies:
@@ -264,22 +407,19 @@ class IVEOPDFGenerator:
         return None
     
     def _create_companies_table(self, df_ent, selected_companies):
-        """Crée le tableau des entreprises pour le PDF."""
-        company_data = [TABLE_COMPANY_HEADER]
-        for company in selected_companies[:COMPANY_MAX]:
-            company_info = df_ent[df_ent.iloc[:, 0] == company]
-            if not company_info.empty:
-                info = company_info.iloc[0]
-                sector = info.get(COMPANY_COL_SECTOR, "N/A")
-                location = info.get(COMPANY_COL_LOCATION, "N/A")
-                status = info.get(COMPANY_COL_STATUS, "N/A")
-                company_data.append([
-                    str(company)[:30],
-                    str(sector)[:20],
-                    str(location)[:20],
-                    str(status)[:15]
-                ])
-        company_table = Table(company_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1*inch])
+        """Crée le tableau des entreprises pour le PDF (toutes les entreprises sélectionnées)."""
+        # Index unique sur la première colonne : une recherche par entreprise au lieu d'un parcours complet
+        company_column = df_ent.columns[0]
+        indexed = df_ent.drop_duplicates(subset=company_column).set_index(company_column, drop=False)
+        rows = indexed.loc[[company for company in dict.fromkeys(selected_companies) if company in indexed.index]]
+        columns = [
+            _text_column(rows, company_column, 30),
+            _text_column(rows, COMPANY_COL_SECTOR, 20),
+            _text_column(rows, COMPANY_COL_LOCATION, 20),
+            _text_column(rows, COMPANY_COL_STATUS, 15)
+        ]
+        company_data = [TABLE_COMPANY_HEADER] + (np.column_stack(columns).tolist() if len(rows) else [])
+        company_table = LongTable(company_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1*inch], repeatRows=1)
         company_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), IVEO_BLUE),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -300,13 +440,13 @@ class IVEOPDFGenerator:
         if df_sol is None or df_sol.empty:
             self.story.append(Paragraph(LABEL_NO_SOLUTION_DATA, self.styles['IVEONormal']))
             return
+        self._add_chart(lambda charts: charts.create_solutions_chart(df_sol), CAPTION_SOLUTIONS_CHART)
         selected_solution = ""
         try:
-            selected_solution_json = cookies.get("solution_selected", "[]")
-            selected_solutions = json.loads(selected_solution_json)
+            selected_solutions = self.preferences.get("solution_selected", [])
             if selected_solutions:
                 selected_solution = selected_solutions[0]
-        except (json.JSONDecodeError, TypeError):
+        except (IndexError, KeyError, TypeError):
             pass
         solution_column = next((col for col in df_sol.columns if 'solution' in col.lower()), None)
         if solution_column:
@@ -347,12 +487,8 @@ class IVEOPDFGenerator:
         if df_comp is None or df_comp.empty:
             self.story.append(Paragraph(LABEL_NO_COMP_DATA, self.styles['IVEONormal']))
             return
-        try:
-            selected_categories = json.loads(cookies.get("selected_categories", "[]"))
-            selected_companies = json.loads(cookies.get("selected_companies", "[]"))
-        except (json.JSONDecodeError, TypeError):
-            selected_categories = []
-            selected_companies = []
+        selected_categories = self.preferences.get("selected_categories", [])
+        selected_companies = self.preferences.get("selected_companies", [])
         if selected_categories or selected_companies:
             self.story.append(Paragraph(LABEL_FILTERS_APPLIED, self.styles['IVEOSection']))
             if selected_categories:
@@ -361,29 +497,87 @@ class IVEOPDFGenerator:
             if selected_companies:
                 comp_text = LABEL_COMPANIES.format(companies=", ".join(selected_companies))
                 self.story.append(Paragraph(comp_text, self.styles['IVEONormal']))
+        # Répartition des critères sur la page portrait, juste avant la matrice
+        self._add_chart(lambda charts: charts.create_comparative_chart(df_comp), CAPTION_COMPARATIVE_CHART)
         if len(df_comp) > 0:
-            comparison_data = [TABLE_COMPARISON_HEADER]
-            for _, row in df_comp.head(COMPARISON_MAX).iterrows():
-                type_exigence = str(row.get(COMPARISON_COL_TYPE, "N/A"))[:30]
-                domaine = str(row.get(COMPARISON_COL_DOMAIN, "N/A"))[:30]
-                exigence_diff = str(row.get(COMPARISON_COL_DIFF, "N/A"))[:20]
-                exigence = str(row.get(COMPARISON_COL_REQ, "N/A"))[:40]
-                comparison_data.append([type_exigence, domaine, exigence_diff, exigence])
-            comparison_table = Table(comparison_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-            comparison_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), IVEO_BLUE),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8)
-            ]))
-            self.story.append(comparison_table)
+            # Matrice sur des pages paysage, puis retour au portrait pour la suite du rapport
+            self.story.append(NextPageTemplate(PAGE_TEMPLATE_LANDSCAPE))
+            self.story.append(PageBreak())
+            self.story.append(self._create_comparison_matrix(df_comp))
+            self.story.append(NextPageTemplate(PAGE_TEMPLATE_PORTRAIT))
         self.story.append(PageBreak())
+
+    def _create_comparison_matrix(self, df_comp):
+        """
+        Crée la matrice complète exigences × entreprises.
+        
+        Les cellules sont construites colonne par colonne (une opération
+        vectorielle par entreprise) et le style tient en quelques commandes
+        de plage : le coût de mise en page reste linéaire même pour des
+        milliers d'exigences. Le tableau est découpé ligne à ligne entre les
+        pages (paysage), l'en-tête étant répété sur chacune ; les largeurs
+        sont réduites proportionnellement pour ne jamais dépasser la page.
+        Les exigences sont repliées en une passe (texte multiligne, sans
+        Paragraph par ligne) ; seuls les en-têtes sont des Paragraph.
+        
+        Args:
+            df_comp (pd.DataFrame): Données d'analyse comparative
+            
+        Returns:
+            LongTable: Tableau ReportLab
+        """
+        company_columns = [
+            col for col in df_comp.columns
+            if col not in COMPARISON_BASE_COLUMNS and COMPARISON_INFO_MARKER not in col
+        ]
+        header_style = self.styles['IVEOMatrixHeader']
+        col_widths = self._comparison_widths(len(company_columns))
+        columns = [
+            _wrapped_column(df_comp, COMPARISON_COL_REQ, COMPARISON_REQ_MAX_CHARS, col_widths[0]),
+            _text_column(df_comp, COMPARISON_COL_DOMAIN, COMPARISON_SHORT_MAX_CHARS),
+            _text_column(df_comp, COMPARISON_COL_DIFF, COMPARISON_SHORT_MAX_CHARS)
+        ]
+        columns.extend(_score_column(df_comp, company) for company in company_columns)
+        header = [
+            Paragraph(escape(label), header_style)
+            for label in TABLE_COMPARISON_HEADER + [str(company)[:COMPANY_HEADER_MAX_CHARS] for company in company_columns]
+        ]
+        matrix_data = [header] + np.column_stack(columns).tolist()
+        
+        matrix_table = LongTable(matrix_data, colWidths=col_widths, repeatRows=1, splitByRow=1)
+        matrix_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), IVEO_BLUE),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), COMPARISON_FONT_SIZE),
+            ('LEADING', (0, 1), (-1, -1), COMPARISON_LEADING),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (len(COMPARISON_BASE_WIDTHS), 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, IVEO_LIGHT_BLUE]),
+            ('GRID', (0, 0), (-1, -1), 0.25, IVEO_GRAY),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2)
+        ]))
+        return matrix_table
+    
+    def _comparison_widths(self, company_count):
+        """
+        Largeurs des colonnes de la matrice, ramenées à la largeur utile de la page paysage.
+        
+        Args:
+            company_count (int): Nombre de colonnes d'entreprises
+            
+        Returns:
+            list: Largeurs en points, de somme au plus égale à self.landscape_width
+        """
+        base_width = sum(COMPARISON_BASE_WIDTHS)
+        company_width = 0
+        if company_count:
+            company_width = max(COMPARISON_MIN_COMPANY_WIDTH, (self.landscape_width - base_width) / company_count)
+        widths = COMPARISON_BASE_WIDTHS + [company_width] * company_count
+        scale = min(1.0, self.landscape_width / sum(widths))
+        return [width * scale for width in widths]
     
     def _add_recommendations(self):
         """Ajoute les recommandations."""
@@ -439,7 +633,7 @@ def create_download_link(buffer, filename):
     href = f'<a href="data:application/pdf;base64,{b64}" download="{filename}" style="{DOWNLOAD_STYLE}">{DOWNLOAD_LABEL}</a>'
     return href
 
-def generate_report_pdf(df_ent, df_sol, df_comp, df_align=None):
+def generate_report_pdf(df_ent, df_sol, df_comp, df_align=None, chart_backend=PDF_CHART_BACKEND, preferences=None):
     """
     Fonction principale pour générer le rapport PDF.
     Args:
@@ -447,11 +641,13 @@ def generate_report_pdf(df_ent, df_sol, df_comp, df_align=None):
         df_sol (pd.DataFrame): Données des solutions
         df_comp (pd.DataFrame): Données d'analyse comparative
         df_align (pd.DataFrame): Données d'alignement (optionnel)
+        chart_backend (str): Moteur des graphiques ("matplotlib", "reportlab") ou None sans graphiques
+        preferences (dict): Sélections de l'utilisateur (voir IVEOPDFGenerator)
     Returns:
         BytesIO: Buffer contenant le PDF généré
     """
     try:
-        generator = IVEOPDFGenerator()
+        generator = IVEOPDFGenerator(chart_backend, preferences)
         buffer = generator.generate_pdf(df_ent, df_sol, df_comp, df_align)
         return buffer
     except Exception as e:
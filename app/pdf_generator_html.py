@@ -8,30 +8,25 @@ Il utilise une approche HTML vers PDF plus robuste.
 Version : 1.1 - 2025.01.16
 """
 
-import streamlit as st
 import pandas as pd
-from io import BytesIO
-import base64
+import numpy as np
 from datetime import datetime
 import json
-from sidebar import cookies
-from weasyprint import HTML
-
+import functools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from app.utils import (
+    dataframe_fingerprint, NA_STRINGS,
+    ANSWER_YES, ANSWER_NO, ANSWER_PARTIAL, ANSWER_NA, ANSWER_LOOKUP
+)
+from app.pdf_render import html_to_pdf, module_available, SYSTEM_LIB_ERRORS
+from app.report_templates import render, render_each, stylesheet_html, CSS_INLINE, CSS_NONE, REPORT_CSS_FILENAME
 
-# Imports pour l'export PDF avec gestion d'erreurs
-try:
-    import pdfkit
-    PDFKIT_AVAILABLE = True
-except ImportError:
-    PDFKIT_AVAILABLE = False
 
-try:
-    WEASYPRINT_AVAILABLE = True
-except ImportError:
-    WEASYPRINT_AVAILABLE = False
-except Exception:
-    # Gestion d'erreur étendue pour les problèmes de bibliothèques système
-    WEASYPRINT_AVAILABLE = False
+# Moteurs PDF : présence vérifiée sans import (chargés par app.pdf_render au premier rendu)
+PDFKIT_AVAILABLE = module_available("pdfkit")
+WEASYPRINT_AVAILABLE = module_available("weasyprint")
 
 # Détection de l'environnement cloud au niveau module
 import os
@@ -45,12 +40,6 @@ IS_CLOUD_ENV = (
 
 
 # =================== VARIABLES D'ÉTAT ET MESSAGES ===================
-MSG_MISSING_LIBS = "Bibliothèques système manquantes pour WeasyPrint (libpango, libcairo). Tentative avec pdfkit..."
-MSG_MISSING_FONTCONFIG = "Configuration des polices manquante. Tentative avec pdfkit..."
-MSG_WEASYPRINT_ERROR = "Erreur WeasyPrint: {}"
-MSG_PDFKIT_MISSING = "wkhtmltopdf non installé sur cette plateforme."
-MSG_PDFKIT_NOT_FOUND = "Exécutable wkhtmltopdf introuvable."
-MSG_PDFKIT_ERROR = "Erreur pdfkit: {}"
 MSG_PDF_EXPORT_UNAVAILABLE = "L'export PDF n'est pas disponible sur cette plateforme."
 MSG_PDF_EXPORT_FATAL = "Erreur fatale lors de l'export PDF (bibliothèques système manquantes)."
 MSG_PDF_EXPORT_ERROR = "Erreur lors de la génération PDF: {}"
@@ -92,7 +81,6 @@ LABEL_CRITERIA = "Critères évalués"
 LABEL_DOMAINS = "Domaines"
 LABEL_COMPANIES = "Entreprises"
 LABEL_FILTERS = "Filtres appliqués"
-LABEL_NO_COMPANY = "Aucune entreprise à afficher."
 LABEL_NO_SOLUTION_COLUMN = "Aucune colonne de solutions trouvée."
 LABEL_SELECTED_SOLUTION = "Solution sélectionnée :"
 LABEL_NO_SELECTION = "Aucune sélection spécifique"
@@ -100,8 +88,25 @@ LABEL_TABLE_COMPANY = ["Entreprise", "Secteur", "Localisation", "Statut", "Site
 LABEL_TABLE_SOLUTION = ["Solution", "Catégorie", "Fournisseur", "Statut", "Site web"]
 LABEL_YES = "✓ Oui"
 LABEL_NO = "✗ Non"
+LABEL_PARTIAL = "◐ Partiel"
 LABEL_NA = "-"
 
+# Sections du rapport (découpage pour le rendu PDF parallèle)
+SECTION_HEAD = "head"
+SECTION_COVER = "couverture"
+SECTION_COMPANIES = "entreprises"
+SECTION_SOLUTIONS = "solutions"
+SECTION_COMPARATIVE = "comparative"
+SECTION_ANNEXES = "annexes"
+SECTION_TAIL = "tail"
+PAGE_BREAK_HTML = '<div class="page-break"></div>'
+COMPARATIVE_PAGES_PER_CHUNK = 10
+COMPARATIVE_ROWS_PER_PAGE = 20
+COMPARATIVE_ROWS_PER_PAGE_LANDSCAPE = 15
+SECTION_CACHE_MAX = 32
+_SECTION_CACHE = OrderedDict()
+_SECTION_CACHE_LOCK = threading.Lock()
+
 
 def _clean_na_value(value):
     """
@@ -113,7 +118,7 @@ def _clean_na_value(value):
     Returns:
         str: Valeur nettoyée
     """
-    if pd.isna(value) or str(value).strip().lower() in ['n/a', 'nan', '-', '']:
+    if pd.isna(value) or str(value).strip().lower() in NA_STRINGS:
         return ""
     return str(value).strip()
 
@@ -133,105 +138,344 @@ def _get_clean_value(info, key, default=""):
     cleaned = _clean_na_value(value)
     return cleaned if cleaned else default
 
-def generate_html_report(df_ent, df_sol, df_comp, df_align=None):
+def _clean_na_series(df, column, default=""):
+    """
+    Version vectorisée de _get_clean_value pour une colonne entière.
+    
+    Args:
+        df (pd.DataFrame): Données source
+        column (str): Nom de la colonne
+        default: Valeur par défaut pour les cellules vides ou N/A
+        
+    Returns:
+        pd.Series: Valeurs nettoyées (chaînes), alignées sur l'index de df
+    """
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[column]
+    text = values.astype(str).str.strip()
+    empty = values.isna() | text.str.lower().isin(NA_STRINGS)
+    return text.mask(empty, default)
+
+def _truncate_series(values, max_len):
+    """Tronque une série de chaînes à max_len caractères (points de suspension inclus)."""
+    too_long = values.str.len() > max_len
+    return values.where(~too_long, values.str.slice(stop=max_len - 3) + "...")
+
+def _classify_answers(values):
+    """
+    Classe une colonne de réponses en catégories oui / non / partiel / non renseigné.
+    
+    Args:
+        values (pd.Series): Réponses nettoyées (voir _clean_na_series)
+        
+    Returns:
+        pd.Series: Catégories ANSWER_*, alignées sur l'index de values
+    """
+    return values.str.lower().map(ANSWER_LOOKUP).fillna(ANSWER_NA)
+
+def _paginate_rows(rows, max_rows_per_page):
+    """
+    Découpe les lignes d'un tableau en pages de max_rows_per_page lignes au plus.
+    
+    Args:
+        rows (pd.Series): Lignes HTML du tableau
+        max_rows_per_page (int): Nombre maximal de lignes par page
+        
+    Returns:
+        list: Fragments HTML, un par page (vide si aucune ligne)
+    """
+    if rows.empty:
+        return []
+    page_count = -(-len(rows) // max_rows_per_page)
+    return ["".join(page) for page in np.array_split(rows.to_numpy(), page_count)]
+
+@dataclass
+class ReportRequest:
+    """
+    Entrées complètes d'un rapport : données, filtres et images associées.
+    
+    La génération ne lit ni cookies ni session state : tout passe par cette
+    requête, construite par la sidebar dans l'application ou par la ligne de
+    commande (app.report) hors de Streamlit.
+    """
+    df_ent: pd.DataFrame = None
+    df_sol: pd.DataFrame = None
+    df_comp: pd.DataFrame = None
+    df_align: pd.DataFrame = None
+    selected_companies: list = field(default_factory=list)
+    selected_solution: str = ""
+    selected_categories: list = field(default_factory=list)
+    # Paires (clé selected_criteria_*, valeur) des filtres de critères actifs
+    criteria_filters: list = field(default_factory=list)
+    # Images persistées pour la solution sélectionnée (URLs et fichiers téléversés)
+    solution_image_urls: list = field(default_factory=list)
+    solution_image_files: list = field(default_factory=list)
+
+    @property
+    def solution_images(self):
+        """list: Images de la solution sélectionnée (les fichiers ne sont que dénombrés)."""
+        images = list(self.solution_image_urls)
+        if self.solution_image_files:
+            images.append(f"Images sauvegardées: {len(self.solution_image_files)} fichier(s)")
+        return images
+
+    @functools.cached_property
+    def fingerprints(self):
+        """tuple: Empreintes de df_ent, df_sol, df_comp et df_align."""
+        return tuple(dataframe_fingerprint(df) for df in (self.df_ent, self.df_sol, self.df_comp, self.df_align))
+
+    def filters_key(self):
+        """str: Filtres sérialisés (JSON trié), pour les clés de cache."""
+        return json.dumps({
+            "companies": self.selected_companies,
+            "solution": self.selected_solution,
+            "categories": self.selected_categories,
+            "criteria": self.criteria_filters,
+            "solution_images": [self.solution_image_urls, self.solution_image_files],
+        }, sort_keys=True, default=str)
+
+    @property
+    def key(self):
+        """tuple: Clé de cache du rapport (empreintes des données, filtres)."""
+        return self.fingerprints, self.filters_key()
+
+def generate_html_report(request, css_mode=CSS_INLINE, css_href=REPORT_CSS_FILENAME):
     """
     Génère un rapport HTML complet qui peut être converti en PDF.
     
     Args:
-        df_ent (pd.DataFrame): Données des entreprises
-        df_sol (pd.DataFrame): Données des solutions
-        df_comp (pd.DataFrame): Données d'analyse comparative
-        df_align (pd.DataFrame): Données d'alignement (optionnel)
+        request (ReportRequest): Données et filtres du rapport
+        css_mode (str): CSS_INLINE (rapport autonome) ou CSS_LINK (feuille report.css liée)
+        css_href (str): Adresse de la feuille liée (mode CSS_LINK)
         
     Returns:
         str: HTML du rapport complet
     """
+    return "".join(iter_html_report(request, css_mode, css_href))
+
+def write_html_report(stream, request, css_mode=CSS_INLINE, css_href=REPORT_CSS_FILENAME):
+    """
+    Écrit le rapport HTML fragment par fragment dans un flux texte.
+    
+    Le rapport n'est jamais matérialisé en une seule chaîne : utile pour écrire
+    directement dans un fichier ou une réponse HTTP.
     
-    # CSS pour le rapport professionnel - Version optimisée pour la lisibilité
-    css = """
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-        * {margin: 0; padding: 0; box-sizing: border-box;}
-    </style>
+    Args:
+        stream: Objet fichier texte (méthode write)
+        request (ReportRequest): Données et filtres du rapport
+        css_mode (str): CSS_INLINE ou CSS_LINK (voir generate_html_report)
+        css_href (str): Adresse de la feuille liée (mode CSS_LINK)
+        
+    Returns:
+        int: Nombre de caractères écrits
     """
-    # Récupérer les données des cookies
-    selected_companies = []
-    selected_solution = ""
-    selected_categories = []
-    selected_solution = ""
-    selected_categories = []
+    written = 0
+    for fragment in iter_html_report(request, css_mode, css_href):
+        stream.write(fragment)
+        written += len(fragment)
+    return written
+
+def _cached_section(name, inputs_key, build):
+    """
+    Retourne une section du rapport mémorisée selon ses entrées réelles.
     
-    try:
-        selected_companies = json.loads(cookies.get("selected_companies", "[]"))
-        selected_solution_json = cookies.get("solution_selected", "[]")
-        selected_solutions = json.loads(selected_solution_json)
-        if selected_solutions:
-            selected_solution = selected_solutions[0]
-        selected_categories = json.loads(cookies.get("selected_categories", "[]"))
-    except (json.JSONDecodeError, TypeError):
-        pass
+    Le cache est partagé par le processus : la clé contient l'empreinte des
+    données et les filtres qui influencent la section, jamais l'identité de
+    l'utilisateur. Modifier un filtre ne reconstruit donc que les sections
+    qui en dépendent.
     
-    # Générer le HTML avec une structure améliorée
-    html = f"""
-    <!DOCTYPE html>
-    <html lang=\"fr\">
-    <head>
-        <meta charset=\"UTF-8\">
-        <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
-        <title>{TITLE_REPORT}</title>
-        <meta name=\"description\" content=\"{META_DESCRIPTION}\">
-        <meta name=\"author\" content=\"{META_AUTHOR}\">
-        <meta name=\"generator\" content=\"{META_GENERATOR}\">
-        {css}
-    </head>
-    <body>
-        <div class=\"report-container\">
-            {_generate_header()}
-            {_generate_table_of_contents()}
-            {_generate_executive_summary(df_ent, df_sol, df_comp)}
-            {_generate_companies_section(df_ent, selected_companies)}
-            {_generate_solutions_section(df_sol, selected_solution)}
-            {_generate_comparative_section(df_comp, selected_categories, selected_companies)}
-            {_generate_recommendations()}
-            {_generate_methodology_section()}
-            {_generate_annexes()}
-            {_generate_footer()}
-        </div>
-    </body>
-    </html>
+    Args:
+        name (str): Nom de la section
+        inputs_key: Clé hachable décrivant les entrées de la section
+        build (callable): Construit la section si elle est absente du cache
+        
+    Returns:
+        Section construite (chaîne ou liste de fragments)
     """
+    key = (name, inputs_key)
+    with _SECTION_CACHE_LOCK:
+        if key in _SECTION_CACHE:
+            _SECTION_CACHE.move_to_end(key)
+            return _SECTION_CACHE[key]
+    value = build()
+    with _SECTION_CACHE_LOCK:
+        _SECTION_CACHE[key] = value
+        while len(_SECTION_CACHE) > SECTION_CACHE_MAX:
+            _SECTION_CACHE.popitem(last=False)
+    return value
+
+def iter_html_report(request, css_mode=CSS_INLINE, css_href=REPORT_CSS_FILENAME):
+    """
+    Produit le rapport HTML sous forme de fragments successifs.
+    
+    Chaque section est générée à la demande ; le tableau comparatif est lui-même
+    émis page par page, ce qui évite de concaténer une chaîne géante.
     
-    return html
+    Args:
+        request (ReportRequest): Données et filtres du rapport
+        css_mode (str): CSS_INLINE ou CSS_LINK (voir generate_html_report)
+        css_href (str): Adresse de la feuille liée (mode CSS_LINK)
+        
+    Yields:
+        str: Fragments HTML dans l'ordre du document
+    """
+    for _, fragment in iter_report_parts(request, css_mode, css_href):
+        yield fragment
+
+def iter_report_parts(request, css_mode=CSS_INLINE, css_href=REPORT_CSS_FILENAME):
+    """
+    Produit les fragments du rapport, chacun étiqueté par sa section.
+    
+    Les étiquettes permettent de découper le document en sous-documents
+    indépendants (voir split_report_documents).
+    
+    Args:
+        request (ReportRequest): Données et filtres du rapport
+        css_mode (str): CSS_INLINE ou CSS_LINK (voir generate_html_report)
+        css_href (str): Adresse de la feuille liée (mode CSS_LINK)
+        
+    Yields:
+        tuple: (nom de section, fragment HTML)
+    """
+    df_ent, df_sol, df_comp = request.df_ent, request.df_sol, request.df_comp
+    selected_companies = request.selected_companies
+    selected_solution = request.selected_solution
+    selected_categories = request.selected_categories
+    fp_ent, fp_sol, fp_comp, _ = request.fingerprints
+    companies_key = json.dumps(selected_companies, default=str)
+    solution_images = request.solution_images if selected_solution else []
+    comparative_key = (
+        fp_comp,
+        json.dumps(selected_categories, default=str),
+        companies_key,
+        json.dumps(request.criteria_filters, default=str),
+    )
+    
+    yield SECTION_HEAD, _document_head(css_mode, css_href)
+    yield SECTION_COVER, _generate_header()
+    yield SECTION_COVER, _generate_table_of_contents()
+    yield SECTION_COVER, _cached_section(
+        SECTION_COVER, (fp_ent, fp_sol, fp_comp),
+        lambda: _generate_executive_summary(df_ent, df_sol, df_comp)
+    )
+    yield SECTION_COMPANIES, _cached_section(
+        SECTION_COMPANIES, (fp_ent, companies_key),
+        lambda: _generate_companies_section(df_ent, selected_companies)
+    )
+    yield SECTION_SOLUTIONS, _cached_section(
+        SECTION_SOLUTIONS, (fp_sol, selected_solution, json.dumps(solution_images)),
+        lambda: _generate_solutions_section(df_sol, selected_solution, solution_images)
+    )
+    comparative_fragments = _cached_section(
+        SECTION_COMPARATIVE, comparative_key,
+        lambda: list(_iter_comparative_section(df_comp, selected_categories, selected_companies, request.criteria_filters))
+    )
+    for fragment in comparative_fragments:
+        yield SECTION_COMPARATIVE, fragment
+    yield SECTION_ANNEXES, _generate_recommendations()
+    yield SECTION_ANNEXES, _generate_methodology_section()
+    yield SECTION_ANNEXES, _generate_annexes()
+    yield SECTION_ANNEXES, _generate_footer()
+    yield SECTION_TAIL, render("document_tail")
+
+def _document_head(css_mode=CSS_INLINE, css_href=REPORT_CSS_FILENAME):
+    """Ouverture du document ; feuille commune (app/assets/report.css) intégrée, liée ou absente (PDF)."""
+    return render(
+        "document_head",
+        title=TITLE_REPORT,
+        description=META_DESCRIPTION,
+        author=META_AUTHOR,
+        generator=META_GENERATOR,
+        stylesheet=stylesheet_html(css_mode, css_href)
+    )
+
+def pdf_report_parts(parts):
+    """
+    Fragments du rapport destinés au moteur PDF : l'en-tête n'intègre pas report.css.
+    
+    Les sections sont reprises telles quelles ; seul l'en-tête du document
+    change, la feuille de style étant appliquée par le moteur (html_to_pdf
+    avec report_css=True).
+    
+    Args:
+        parts (list): Paires (section, fragment) issues de iter_report_parts
+        
+    Returns:
+        list: Paires (section, fragment) avec l'en-tête sans feuille de style
+    """
+    head = _document_head(CSS_NONE)
+    return [(section, head if section == SECTION_HEAD else fragment) for section, fragment in parts]
+
+def split_report_documents(parts, pages_per_chunk=COMPARATIVE_PAGES_PER_CHUNK):
+    """
+    Découpe un rapport en documents HTML autonomes, rendables séparément.
+    
+    Chaque section devient un document (en-tête HTML et fermeture répétés) ;
+    le tableau comparatif est en plus coupé tous les pages_per_chunk sauts de page.
+    Chaque morceau du tableau referme ses conteneurs, et le suivant les rouvre
+    (classe du mode paysage et styles compris). Les documents étant rendus
+    séparément, les ancres ne franchissent pas leurs frontières : la table
+    des matières y est donc rendue sans liens.
+    
+    Args:
+        parts (list): Paires (section, fragment) issues de iter_report_parts
+        pages_per_chunk (int): Pages de tableau comparatif par document
+        
+    Returns:
+        list: Paires (nom du document, HTML complet) dans l'ordre du rapport
+    """
+    head = "".join(fragment for section, fragment in parts if section == SECTION_HEAD)
+    tail = "".join(fragment for section, fragment in parts if section == SECTION_TAIL)
+    documents = []
+    table_wrappers = (_comparative_table_wrapper(True), _comparative_table_wrapper(False))
+    current_section, current_parts, table_pages, table_wrapper = None, [], 0, ""
+    
+    def flush():
+        if current_parts:
+            documents.append((current_section, head + "".join(current_parts) + tail))
+    
+    for section, fragment in parts:
+        if section in (SECTION_HEAD, SECTION_TAIL):
+            continue
+        if fragment == _generate_table_of_contents():
+            fragment = _generate_table_of_contents(links=False)
+        if section == SECTION_COMPARATIVE and fragment in table_wrappers:
+            table_wrapper = fragment
+        if section == SECTION_COMPARATIVE and fragment == PAGE_BREAK_HTML:
+            table_pages += 1
+            if table_pages % pages_per_chunk == 0:
+                # Le saut de page devient la frontière entre deux documents
+                current_parts.append(render("comparative_chunk_close"))
+                flush()
+                current_parts = [render("comparative_continued"), table_wrapper]
+                continue
+        if section != current_section:
+            flush()
+            current_section, current_parts = section, []
+        current_parts.append(fragment)
+    flush()
+    return documents
 
 def _generate_header():
     """Génère l'en-tête du rapport avec un design professionnel."""
     date_str = datetime.now().strftime("%d/%m/%Y à %H:%M")
-    return f"""
-    <div class=\"header\">
-        <div class=\"header-content\">
-            <h1>{META_AUTHOR}</h1>
-            <h2>{TITLE_HEADER}</h2>
-            <div class=\"meta\">
-                <p>{LABEL_META}</p>
-                <p>{LABEL_GENERATED_ON.format(date_str)}</p>
-            </div>
-        </div>
-    </div>
-    """
+    return render(
+        "header",
+        author=META_AUTHOR,
+        title=TITLE_HEADER,
+        meta=LABEL_META,
+        generated_on=LABEL_GENERATED_ON.format(date_str)
+    )
 
-def _generate_table_of_contents():
-    """Génère une table des matières professionnelle."""
-    toc_items_html = ''.join([f'<li><a href="#{anchor}">{label}</a></li>' for anchor, label in TOC_ITEMS])
-    return f"""
-    <div class=\"section\">
-        <div class=\"toc\">
-            <h2>{TITLE_TOC}</h2>
-            <ol>
-                {toc_items_html}
-            </ol>
-        </div>
-    </div>
-    """
+@functools.lru_cache(maxsize=2)
+def _generate_table_of_contents(links=True):
+    """Génère une table des matières professionnelle (sans liens pour un rapport rendu en plusieurs documents)."""
+    items = render_each(
+        "toc_item" if links else "toc_item_plain",
+        ({"anchor": anchor, "label": label} for anchor, label in TOC_ITEMS)
+    )
+    return render("toc", title=TITLE_TOC, items=items)
 
 def _generate_executive_summary(df_ent, df_sol, df_comp):
     """Génère un résumé exécutif professionnel avec statistiques et insights."""
@@ -241,41 +485,22 @@ def _generate_executive_summary(df_ent, df_sol, df_comp):
 
 def _build_executive_summary_html(stats_html, insights_html):
     """Construit le HTML du résumé exécutif à partir des sous-parties."""
-    return f"""
-    <div class=\"section page-break\" id=\"resume\">
-        <h2>{TITLE_EXEC_SUMMARY}</h2>
-        <div class=\"executive-summary\">
-            <div class=\"stats-grid\">{stats_html}</div>
-            <div class=\"highlight\">
-                <h3>Contexte et objectifs</h3>
-                <p>Ce rapport présente une analyse comparative approfondie des solutions et entreprises évaluées selon une méthodologie rigoureuse. L'objectif est de fournir une base décisionnelle solide pour orienter les choix stratégiques de l'organisation.</p>
-                <p>{insights_html}</p>
-            </div>
-            <h3>Points clés de l'analyse</h3>
-            <ul>
-                <li>Évaluation multi-critères basée sur des indicateurs quantitatifs et qualitatifs</li>
-                <li>Analyse comparative structurée permettant l'identification des solutions optimales</li>
-                <li>Recommandations stratégiques alignées sur les objectifs organisationnels</li>
-                <li>Méthodologie transparente et reproductible</li>
-            </ul>
-        </div>
-    </div>
-    """
+    return render("executive_summary", title=TITLE_EXEC_SUMMARY, stats=stats_html, insights=insights_html)
 
 def _generate_executive_stats_html(df_ent, df_sol, df_comp):
     """Génère le HTML des statistiques pour le résumé exécutif."""
     stats = []
     if df_ent is not None and not df_ent.empty:
-        stats.append(f'<div class="stat-card"><p class="stat-number">{len(df_ent)}</p><p class="stat-label">Entreprises analysées</p></div>')
+        stats.append({"number": len(df_ent), "label": "Entreprises analysées"})
     if df_sol is not None and not df_sol.empty:
-        stats.append(f'<div class="stat-card"><p class="stat-number">{len(df_sol)}</p><p class="stat-label">Solutions évaluées</p></div>')
+        stats.append({"number": len(df_sol), "label": "Solutions évaluées"})
     if df_comp is not None and not df_comp.empty:
-        stats.append(f'<div class="stat-card"><p class="stat-number">{len(df_comp)}</p><p class="stat-label">Critères d\'évaluation</p></div>')
+        stats.append({"number": len(df_comp), "label": "Critères d'évaluation"})
     if df_ent is not None and not df_ent.empty:
         secteurs = df_ent.get("Secteur d'activité", pd.Series()).dropna().nunique()
         if secteurs > 0:
-            stats.append(f'<div class="stat-card"><p class="stat-number">{secteurs}</p><p class="stat-label">Secteurs représentés</p></div>')
-    return ''.join(stats)
+            stats.append({"number": secteurs, "label": "Secteurs représentés"})
+    return render_each("stat_card", stats)
 
 def _generate_executive_insights_html(df_ent, df_sol, df_comp):
     """Génère le HTML des insights automatiques pour le résumé exécutif."""
@@ -291,8 +516,7 @@ def _generate_executive_insights_html(df_ent, df_sol, df_comp):
 def _generate_companies_section(df_ent, selected_companies):
     """Génère la section des entreprises avec toutes les informations."""
     if df_ent is None or df_ent.empty:
-        return f"""
-        <div class=\"section page-break\" id=\"entreprises\">\n            <h2>{TITLE_COMPANIES}</h2>\n            <p>{LABEL_NO_COMPANY_DATA}</p>\n        </div>\n        """
+        return render("section_empty", anchor="entreprises", title=TITLE_COMPANIES, message=LABEL_NO_COMPANY_DATA)
     
     if not selected_companies:
         company_column = df_ent.columns[0]
@@ -303,29 +527,42 @@ def _generate_companies_section(df_ent, selected_companies):
 
     companies_html = ''.join([_generate_company_html(company) for company in companies_info])
     
-    # Générer les lignes du tableau récapitulatif
-    table_rows = []
-    for comp in companies_info:
-        # Gestion du site web avec logique simplifiée
-        site_web_cell = "Non spécifié"
-        if comp["site_web"]:
-            if comp["site_web"].startswith('http'):
-                site_web_cell = f'<a href="{comp["site_web"]}" target="_blank">Lien</a>'
-            else:
-                site_web_cell = comp["site_web"]
-        
-        table_rows.append(f"""
-        <tr>
-            <td><strong>{comp["nom"]}</strong></td>
-            <td>{comp["secteur"]}</td>
-            <td>{comp["localisation"]}</td>
-            <td>{comp["statut"]}</td>
-            <td>{site_web_cell}</td>
-        </tr>
-        """)
-
-    return f"""
-    <div class=\"section page-break\" id=\"entreprises\">\n        <h2>{TITLE_COMPANIES}</h2>\n        <div class=\"stats-grid\">\n            <div class=\"stat-card\">\n                <p class=\"stat-number\">{len(selected_companies)}</p>\n                <p class=\"stat-label\">{LABEL_COMPANIES_ANALYSED}</p>\n            </div>\n            <div class=\"stat-card\">\n                <p class=\"stat-number\">{len(set(comp['secteur'] for comp in companies_info))}</p>\n                <p class=\"stat-label\">{LABEL_SECTORS}</p>\n            </div>\n        </div>\n        <h3>Profils détaillés des entreprises</h3>\n        {companies_html}\n        <h3>Tableau récapitulatif des entreprises</h3>\n        <div class=\"table-container\">\n            <table>\n                <thead>\n                    <tr>\n                        <th style=\"width: 25%;\">{LABEL_TABLE_COMPANY[0]}</th>\n                        <th style=\"width: 20%;\">{LABEL_TABLE_COMPANY[1]}</th>\n                        <th style=\"width: 20%;\">{LABEL_TABLE_COMPANY[2]}</th>\n                        <th style=\"width: 15%;\">{LABEL_TABLE_COMPANY[3]}</th>\n                        <th style=\"width: 20%;\">{LABEL_TABLE_COMPANY[4]}</th>\n                    </tr>\n                </thead>\n                <tbody>\n                    {''.join(table_rows)}\n                </tbody>\n            </table>\n        </div>\n    </div>\n    """
+    # Lignes du tableau récapitulatif, rendues en boucle sur le gabarit de ligne
+    table_rows = _company_rows(companies_info)
+    
+    headers = {f"header_{index}": label for index, label in enumerate(LABEL_TABLE_COMPANY)}
+    return render(
+        "companies_section",
+        title=TITLE_COMPANIES,
+        company_count=len(selected_companies),
+        company_count_label=LABEL_COMPANIES_ANALYSED,
+        sector_count=len(set(comp['secteur'] for comp in companies_info)),
+        sector_count_label=LABEL_SECTORS,
+        cards=companies_html,
+        rows=table_rows,
+        **headers
+    )
+
+def _company_rows(companies_info):
+    """Rend les lignes du tableau récapitulatif des entreprises."""
+    return render_each("company_row", (
+        {
+            "name": comp["nom"],
+            "sector": comp["secteur"],
+            "location": comp["localisation"],
+            "status": comp["statut"],
+            "website": _website_cell(comp["site_web"]),
+        }
+        for comp in companies_info
+    ))
+
+def _website_cell(site_web):
+    """Cellule « Site web » : lien si l'adresse est une URL, texte sinon, « Non spécifié » si vide."""
+    if not site_web:
+        return "Non spécifié"
+    if site_web.startswith('http'):
+        return f'<a href="{site_web}" target="_blank">Lien</a>'
+    return site_web
 
 def _extract_company_details(df_ent, company):
     company_info = df_ent[df_ent.iloc[:, 0] == company]
@@ -361,85 +598,31 @@ def _generate_company_html(company):
     
     autres_infos_html = ""
     if company['autres_infos']:
-        autres_infos_html = "<h3>Informations complémentaires</h3><div class=\"company-details\">"
-        for key, value in company['autres_infos'].items():
-            autres_infos_html += f'<div class="detail-item"><strong>{key}:</strong> {value}</div>'
-        autres_infos_html += "</div>"
+        autres_infos_html = "<h3>Informations complémentaires</h3><div class=\"company-details\">" + "".join(
+            f'<div class="detail-item"><strong>{key}:</strong> {value}</div>'
+            for key, value in company['autres_infos'].items()
+        ) + "</div>"
     
     description_html = ""
     if company['description']:
         description_html = f'<div class="highlight"><strong>Description:</strong> {company["description"]}</div>'
     
-    return f"""
-    <div class="company-card">
-        <div class="company-header">
-            {logo_html}
-            <div class="company-title">
-                <h3>{company['nom']}</h3>
-                <div class="sector">{company['secteur']}</div>
-            </div>
-        </div>
-        
-        <div class="company-details">
-            <div class="detail-item"><strong>Localisation:</strong> {company['localisation']}</div>
-            <div class="detail-item"><strong>Statut:</strong> {company['statut']}</div>
-            {site_web_html}
-        </div>
-        
-        {description_html}
-        {autres_infos_html}
-    </div>
-    """
+    return render(
+        "company_card",
+        logo=logo_html,
+        name=company['nom'],
+        sector=company['secteur'],
+        location=company['localisation'],
+        status=company['statut'],
+        website=site_web_html,
+        description=description_html,
+        details=autres_infos_html
+    )
 
-def _generate_companies_summary_table(companies_info):
-    """Génère un tableau récapitulatif des entreprises avec design professionnel."""
-    if not companies_info:
-        return "<p>Aucune entreprise à afficher.</p>"
-    
-    rows = []
-    for comp in companies_info:
-        # Gestion du site web avec logique simplifiée
-        site_web_cell = "Non spécifié"
-        if comp["site_web"]:
-            if comp["site_web"].startswith('http'):
-                site_web_cell = f'<a href="{comp["site_web"]}" target="_blank">Lien</a>'
-            else:
-                site_web_cell = comp["site_web"]
-        
-        rows.append(f"""
-        <tr>
-            <td><strong>{comp["nom"]}</strong></td>
-            <td>{comp["secteur"]}</td>
-            <td>{comp["localisation"]}</td>
-            <td>{comp["statut"]}</td>
-            <td>{site_web_cell}</td>
-        </tr>
-        """)
-    
-    return f"""
-    <div class="table-container">
-        <table>
-            <thead>
-                <tr>
-                    <th>Entreprise</th>
-                    <th>Secteur d'activité</th>
-                    <th>Localisation</th>
-                    <th>Statut</th>
-                    <th>Site web</th>
-                </tr>
-            </thead>
-            <tbody>
-                {''.join(rows)}
-            </tbody>
-        </table>
-    </div>
-    """
-
-def _generate_solutions_section(df_sol, selected_solution):
+def _generate_solutions_section(df_sol, selected_solution, solution_images=None):
     """Génère la section des solutions avec toutes les informations et images."""
     if df_sol is None or df_sol.empty:
-        return f"""
-        <div class=\"section page-break\" id=\"solutions\">\n            <h2>{TITLE_SOLUTIONS}</h2>\n            <p>{LABEL_NO_SOLUTION_DATA}</p>\n        </div>\n        """
+        return render("section_empty", anchor="solutions", title=TITLE_SOLUTIONS, message=LABEL_NO_SOLUTION_DATA)
     
     # Trouver la colonne des solutions
     solution_column = None
@@ -449,8 +632,7 @@ def _generate_solutions_section(df_sol, selected_solution):
             break
     
     if solution_column is None:
-        return f"""
-        <div class=\"section page-break\" id=\"solutions\">\n            <h2>{TITLE_SOLUTIONS}</h2>\n            <p>{LABEL_NO_SOLUTION_COLUMN}</p>\n        </div>\n        """
+        return render("section_empty", anchor="solutions", title=TITLE_SOLUTIONS, message=LABEL_NO_SOLUTION_COLUMN)
     
     # Récupérer les solutions à afficher - TOUTES les solutions disponibles
     solutions_to_show = []
@@ -462,36 +644,18 @@ def _generate_solutions_section(df_sol, selected_solution):
         solutions_to_show.remove(selected_solution)
         solutions_to_show.insert(0, selected_solution)
     
-    # Récupérer les images persistantes pour la solution sélectionnée
-    solution_images = []
-    if selected_solution:
-        try:
-            import json
-            from sidebar import cookies
-            
-            # Images URL
-            cookie_key_urls = f"solution_images_urls_{selected_solution}"
-            saved_urls_raw = cookies.get(cookie_key_urls)
-            if saved_urls_raw:
-                saved_urls = json.loads(saved_urls_raw)
-                solution_images.extend(saved_urls)
-            
-            # Images fichiers (on ne peut pas les afficher dans le rapport HTML)
-            cookie_key_files = f"solution_images_files_{selected_solution}"
-            saved_files_raw = cookies.get(cookie_key_files)
-            if saved_files_raw:
-                saved_files = json.loads(saved_files_raw)
-                if saved_files:
-                    solution_images.append(f"Images sauvegardées: {len(saved_files)} fichier(s)")
-        except:
-            pass
+    # Images persistantes de la solution sélectionnée (fournies par la requête)
+    solution_images = list(solution_images or []) if selected_solution else []
+    
+    # Première ligne de chaque solution, indexée une seule fois (évite un filtrage du DataFrame par solution)
+    solution_rows = df_sol.dropna(subset=[solution_column]).drop_duplicates(subset=[solution_column]).set_index(solution_column, drop=False)
+    image_columns = [col for col in df_sol.columns if 'image' in col.lower() or 'photo' in col.lower() or 'screenshot' in col.lower()]
     
     # Générer les détails des solutions
-    solutions_html = ""
+    solutions_parts = []
     for solution in solutions_to_show:
-        solution_info = df_sol[df_sol[solution_column] == solution]
-        if not solution_info.empty:
-            info = solution_info.iloc[0]
+        if solution in solution_rows.index:
+            info = solution_rows.loc[solution]
             
             # Récupérer toutes les informations avec nettoyage
             solution_details = {
@@ -508,11 +672,10 @@ def _generate_solutions_section(df_sol, selected_solution):
             
             # Récupérer les images depuis les colonnes
             images_colonnes = []
-            for col in df_sol.columns:
-                if 'image' in col.lower() or 'photo' in col.lower() or 'screenshot' in col.lower():
-                    img_url = info.get(col, '')
-                    if isinstance(img_url, str) and img_url.strip() and img_url.startswith('http'):
-                        images_colonnes.append(img_url.strip())
+            for col in image_columns:
+                img_url = info.get(col, '')
+                if isinstance(img_url, str) and img_url.strip() and img_url.startswith('http'):
+                    images_colonnes.append(img_url.strip())
             
             # Récupérer toutes les autres colonnes avec nettoyage
             for col in df_sol.columns:
@@ -524,7 +687,7 @@ def _generate_solutions_section(df_sol, selected_solution):
             # Logo si disponible
             logo_html = ""
             if solution_details['logo'] and solution_details['logo'].startswith('http'):
-                logo_html = f'<img src="{solution_details["logo"]}" alt="Logo {solution_details["nom"]}" style="max-width: 100px; max-height: 60px; margin: 10px 0;" onerror="this.style.display=\'none\'">'
+                logo_html = f'<img src="{solution_details["logo"]}" alt="Logo {solution_details["nom"]}" class="solution-logo" onerror="this.style.display=\'none\'">'
             
             # Site web si disponible
             site_web_html = ""
@@ -540,90 +703,98 @@ def _generate_solutions_section(df_sol, selected_solution):
             images_html = ""
             all_images = images_colonnes + (solution_images if solution == selected_solution else [])
             if all_images:
-                images_html = "<h4>Images</h4><div style='display: flex; flex-wrap: wrap; gap: 10px; margin: 15px 0;'>"
+                images_parts = ['<h4>Images</h4><div class="solution-gallery">']
                 for img_url in all_images:
                     if isinstance(img_url, str) and img_url.startswith('http'):
-                        images_html += f'<img src="{img_url}" alt="Image solution" style="max-width: 200px; max-height: 150px; border: 1px solid #ddd; border-radius: 4px;" onerror="this.style.display=\'none\'">'
+                        images_parts.append(f'<img src="{img_url}" alt="Image solution" class="solution-image" onerror="this.style.display=\'none\'">')
                     else:
-                        images_html += f'<p style="font-size: 0.9em; color: #666;">{img_url}</p>'
-                images_html += "</div>"
+                        images_parts.append(f'<p class="image-caption">{img_url}</p>')
+                images_parts.append("</div>")
+                images_html = "".join(images_parts)
             
             # Informations supplémentaires
             autres_infos_html = ""
             if solution_details['autres_infos']:
-                autres_infos_html = "<h4>Informations détaillées</h4><ul>"
-                for key, value in solution_details['autres_infos'].items():
-                    autres_infos_html += f"<li><strong>{key}:</strong> {value}</li>"
-                autres_infos_html += "</ul>"
+                autres_infos_html = "<h4>Informations détaillées</h4><ul>" + "".join(
+                    f"<li><strong>{key}:</strong> {value}</li>"
+                    for key, value in solution_details['autres_infos'].items()
+                ) + "</ul>"
             
-            solutions_html += f"""
-            <div style="background: white; padding: 20px; margin: 20px 0; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); border-left: 4px solid #0072B2;">
-                <div style="display: flex; align-items: center; gap: 20px; margin-bottom: 15px;">
-                    {logo_html}
-                    <div>
-                        <h3 style="margin: 0; color: #0072B2;">{solution_details['nom']}</h3>
-                        <p style="margin: 5px 0; color: #666;">{solution_details['categorie']}</p>
-                    </div>
-                </div>
-                
-                <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 15px; margin: 15px 0;">
-                    <div><strong>Fournisseur:</strong> {solution_details['fournisseur']}</div>
-                    <div><strong>Statut:</strong> {solution_details['statut']}</div>
-                </div>
-                
-                {f'<p><strong>Description:</strong> {solution_details["description"]}</p>' if solution_details['description'] else ''}
-                {site_web_html}
-                {video_html}
-                {images_html}
-                {autres_infos_html}
-            </div>
-            """
-    
-    # Tableau récapitulatif
-    table_rows = []
-    for solution in solutions_to_show:
-        solution_info = df_sol[df_sol[solution_column] == solution]
-        if not solution_info.empty:
-            info = solution_info.iloc[0]
-            category = _get_clean_value(info, "Catégorie", "Non spécifiée")
-            provider = _get_clean_value(info, "Fournisseur", "Non spécifié")
-            status = _get_clean_value(info, "Statut", "Non spécifié")
-            site_web = _get_clean_value(info, "Site web", "")
+            description_html = ""
+            if solution_details['description']:
+                description_html = f'<p><strong>Description:</strong> {solution_details["description"]}</p>'
             
-            table_rows.append(f"""
-            <tr>
-                <td>{str(solution)[:40]}</td>
-                <td>{category[:30]}</td>
-                <td>{provider[:30]}</td>
-                <td>{status[:20]}</td>
-                <td>{'<a href="' + site_web + '" target="_blank">Lien</a>' if site_web and site_web.startswith('http') else (site_web if site_web else 'Non spécifié')}</td>
-            </tr>
-            """)
+            solutions_parts.append(render(
+                "solution_card",
+                logo=logo_html,
+                name=solution_details['nom'],
+                category=solution_details['categorie'],
+                provider=solution_details['fournisseur'],
+                status=solution_details['statut'],
+                description=description_html,
+                website=site_web_html,
+                video=video_html,
+                images=images_html,
+                details=autres_infos_html
+            ))
+    solutions_html = "".join(solutions_parts)
     
-    table_html = f"""
-    <table>\n        <thead>\n            <tr>\n                <th>{LABEL_TABLE_SOLUTION[0]}</th>\n                <th>{LABEL_TABLE_SOLUTION[1]}</th>\n                <th>{LABEL_TABLE_SOLUTION[2]}</th>\n                <th>{LABEL_TABLE_SOLUTION[3]}</th>\n                <th>{LABEL_TABLE_SOLUTION[4]}</th>\n            </tr>\n        </thead>\n        <tbody>\n            {''.join(table_rows)}\n        </tbody>\n    </table>\n    """
+    # Tableau récapitulatif, rendu en boucle sur le gabarit de ligne
+    table_rows = render_each("solution_row", (
+        _solution_row(solution, solution_rows.loc[solution])
+        for solution in solutions_to_show
+        if solution in solution_rows.index
+    ))
     
-    return f"""
-    <div class=\"section page-break\" id=\"solutions\">\n        <h2>{TITLE_SOLUTIONS}</h2>\n        <div class=\"stats-grid\">\n            <div class=\"stat-card\">\n                <p class=\"stat-number\">{len(solutions_to_show)}</p>\n                <p class=\"stat-label\">{LABEL_SOLUTIONS_ANALYSED}</p>\n            </div>\n            <div class=\"stat-card\">\n                <p class=\"stat-number\">{len(solution_images) if solution_images else 0}</p>\n                <p class=\"stat-label\">{LABEL_IMAGES_ASSOCIATED}</p>\n            </div>\n        </div>\n        <h3>Détails des solutions</h3>\n        {solutions_html}\n        <h3>Tableau récapitulatif</h3>\n        {table_html}\n        <p>\n            <strong>{LABEL_SELECTED_SOLUTION}</strong> {selected_solution if selected_solution else LABEL_NO_SELECTION}\n        </p>\n    </div>\n    """
+    stats = render_each("stat_card", [
+        {"number": len(solutions_to_show), "label": LABEL_SOLUTIONS_ANALYSED},
+        {"number": len(solution_images), "label": LABEL_IMAGES_ASSOCIATED},
+    ])
+    headers = {f"header_{index}": label for index, label in enumerate(LABEL_TABLE_SOLUTION)}
+    return render(
+        "solutions_section",
+        title=TITLE_SOLUTIONS,
+        stats=stats,
+        cards=solutions_html,
+        rows=table_rows,
+        selected_label=LABEL_SELECTED_SOLUTION,
+        selected=selected_solution if selected_solution else LABEL_NO_SELECTION,
+        **headers
+    )
+
+def _solution_row(solution, info):
+    """Valeurs d'une ligne du tableau récapitulatif des solutions."""
+    return {
+        "name": str(solution)[:40],
+        "category": _get_clean_value(info, "Catégorie", "Non spécifiée")[:30],
+        "provider": _get_clean_value(info, "Fournisseur", "Non spécifié")[:30],
+        "status": _get_clean_value(info, "Statut", "Non spécifié")[:20],
+        "website": _website_cell(_get_clean_value(info, "Site web", "")),
+    }
+
+@functools.lru_cache(maxsize=2)
+def _comparative_table_wrapper(landscape_mode):
+    """Ouverture du conteneur du tableau comparatif, avec les styles du mode paysage s'il est actif."""
+    return render(
+        "comparative_table_wrapper",
+        landscape_style=render("comparative_landscape_style") if landscape_mode else "",
+        wrapper_class="landscape-table" if landscape_mode else "responsive-table",
+        landscape_notice=render("comparative_landscape_notice") if landscape_mode else ""
+    )
 
-def _generate_comparative_section(df_comp=None, selected_categories=None, selected_companies=None):
+def _generate_comparative_section(df_comp=None, selected_categories=None, selected_companies=None, criteria_filters=None):
     """Génère la section d'analyse comparative avec filtres appliqués."""
+    return "".join(_iter_comparative_section(df_comp, selected_categories, selected_companies, criteria_filters))
+
+def _iter_comparative_section(df_comp=None, selected_categories=None, selected_companies=None, criteria_filters=None):
+    """Produit la section d'analyse comparative fragment par fragment (une page de tableau à la fois)."""
     # Analyser les filtres appliqués
     filters_applied = {}
     
-    # Examiner les sessions state pour récupérer les filtres
-    try:
-        import streamlit as st
-        if hasattr(st, 'session_state'):
-            for key, value in st.session_state.items():
-                if isinstance(key, str) and key.startswith('selected_criteria_') and value:
-                    try:
-                        criteria_name = key.replace('selected_criteria_', '').replace('_', ' ').title()
-                        filters_applied[f"Critère {criteria_name}"] = value
-                    except Exception:
-                        pass
-    except Exception:
-        pass
+    # Filtres de critères (clés selected_criteria_* de la session, transmises par la requête)
+    for key, value in criteria_filters or []:
+        criteria_name = key.replace('selected_criteria_', '').replace('_', ' ').title()
+        filters_applied[f"Critère {criteria_name}"] = value
     
     # Ajouter les filtres passés en paramètres
     if selected_categories:
@@ -634,19 +805,27 @@ def _generate_comparative_section(df_comp=None, selected_categories=None, select
     # Générer le HTML des filtres appliqués
     filters_html = ""
     if filters_applied:
-        filters_html = "<h3>Filtres et critères appliqués</h3><div style='background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;'>"
-        for filter_name, filter_value in filters_applied.items():
-            if isinstance(filter_value, list):
-                value_str = ", ".join(str(v) for v in filter_value)
-            else:
-                value_str = str(filter_value)
-            filters_html += f"<p><strong>{filter_name}:</strong> {value_str}</p>"
-        filters_html += "</div>"
+        filters_html = render("filters_box", items=render_each("filter_item", (
+            {
+                "name": filter_name,
+                "value": ", ".join(str(v) for v in filter_value) if isinstance(filter_value, list) else str(filter_value),
+            }
+            for filter_name, filter_value in filters_applied.items()
+        )))
     
     # Section par défaut si pas de données
     if df_comp is None or df_comp.empty:
-        return f"""
-        <div class=\"section page-break\" id=\"comparative\">\n            <h2>{TITLE_COMPARATIVE}</h2>\n            <div class=\"stats-grid\">\n                <div class=\"stat-card\">\n                    <p class=\"stat-number\">{len(filters_applied)}</p>\n                    <p class=\"stat-label\">{LABEL_FILTERS}</p>\n                </div>\n                <div class=\"stat-card\">\n                    <p class=\"stat-number\">0</p>\n                    <p class=\"stat-label\">{LABEL_CRITERIA}</p>\n                </div>\n            </div>\n            {filters_html}\n            <p>{LABEL_NO_COMPARATIVE_DATA}</p>\n        </div>\n        """
+        yield render(
+            "comparative_empty",
+            title=TITLE_COMPARATIVE,
+            stats=render_each("stat_card", [
+                {"number": len(filters_applied), "label": LABEL_FILTERS},
+                {"number": 0, "label": LABEL_CRITERIA},
+            ]),
+            filters=filters_html,
+            message=LABEL_NO_COMPARATIVE_DATA
+        )
+        return
     
     # Analyser les données disponibles
     total_criteria = len(df_comp)
@@ -660,400 +839,214 @@ def _generate_comparative_section(df_comp=None, selected_categories=None, select
     total_columns = len(base_columns) + len(company_columns)
     landscape_mode = total_columns > 6  # Mode paysage si plus de 6 colonnes
     
-    # Styles CSS pour le mode paysage
-    landscape_css = ""
-    if landscape_mode:
-        landscape_css = """
-        <style>
-        @media print {
-            .comparative-table-container {
-                transform: rotate(90deg);
-                transform-origin: center;
-                position: relative;
-                width: 297mm;
-                height: 210mm;
-                margin: 0 auto;
-                page-break-inside: avoid;
-            }
-            .comparative-table-container table {
-                font-size: 0.7em;
-            }
-            .comparative-table-container th, 
-            .comparative-table-container td {
-                padding: 4px;
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-                max-width: 80px;
-            }
-        }
-        </style>
-        """
+    # Ouverture de la section : les statistiques et filtres précèdent le tableau
+    yield render(
+        "comparative_open",
+        title=TITLE_COMPARATIVE,
+        stats=render_each("stat_card", [
+            {"number": total_criteria, "label": LABEL_CRITERIA},
+            {"number": len(unique_categories), "label": LABEL_DOMAINS},
+            {"number": len(company_columns), "label": LABEL_COMPANIES},
+            {"number": len(filters_applied), "label": LABEL_FILTERS},
+        ]),
+        filters=filters_html
+    )
+    # Conteneur du tableau (styles du mode paysage compris), rouvert à chaque document en rendu découpé
+    yield _comparative_table_wrapper(landscape_mode)
     
-    # Statistiques
-    stats_html = f"""
-    <div class="stats-grid">
-        <div class="stat-card">
-            <p class="stat-number">{total_criteria}</p>
-            <p class="stat-label">Critères évalués</p>
-        </div>
-        <div class="stat-card">
-            <p class="stat-number">{len(unique_categories)}</p>
-            <p class="stat-label">Domaines</p>
-        </div>
-        <div class="stat-card">
-            <p class="stat-number">{len(company_columns)}</p>
-            <p class="stat-label">Entreprises</p>
-        </div>
-        <div class="stat-card">
-            <p class="stat-number">{len(filters_applied)}</p>
-            <p class="stat-label">Filtres appliqués</p>
-        </div>
-    </div>
-    """
+    # En-tête du tableau (colonnes d'entreprises avec largeur dynamique), identique sur chaque page
+    company_width = f"{35 / len(company_columns)}%" if company_columns else "10%"
+    table_open = render("comparative_table_open", company_headers=render_each(
+        "comparative_company_header",
+        ({"width": company_width, "company": company} for company in company_columns)
+    ))
+    table_close = render("comparative_table_close")
     
-    # Générer le tableau avec les colonnes d'entreprises
-    table_html = f"""
-    {landscape_css}
-    <div class="{'landscape-table' if landscape_mode else 'responsive-table'}">
-        <h3>Tableau d'analyse comparative avec réponses par entreprise</h3>
-        {"<p><strong>Mode paysage activé</strong> - Tableau optimisé pour l'impression landscape</p>" if landscape_mode else ""}
-        <div class="table-container">
-            <table>
-                <thead>
-                    <tr>
-                        <th style="width: 35%;">Critère</th>
-                        <th style="width: 15%;">Domaine</th>
-                        <th style="width: 15%;">Différenciateur</th>
-    """
+    # Nettoyage et troncature des colonnes de base, colonne par colonne
+    criteres = _truncate_series(_clean_na_series(df_comp, "Exigence", "Non spécifié"), 150)
+    domaines = _truncate_series(_clean_na_series(df_comp, "Domaine", "Non spécifié"), 30)
+    differenciateurs = _truncate_series(_clean_na_series(df_comp, "Exigence différenciateur", "Non spécifié"), 30)
     
-    # Ajouter les colonnes d'entreprises avec largeur dynamique
-    company_width = f"{35 / len(company_columns)}%" if company_columns else "10%"
+    # Classement des réponses des entreprises : un map par colonne, puis une cellule HTML par catégorie
+    # (espacements et bordures portés par la classe comparative-table, pas par chaque cellule)
+    answer_cells = {
+        answer: render("answer_cell", css_class=css_class, label=label).strip()
+        for answer, css_class, label in [
+            (ANSWER_YES, "cell-yes", LABEL_YES),
+            (ANSWER_NO, "cell-no", LABEL_NO),
+            (ANSWER_PARTIAL, "cell-partial", LABEL_PARTIAL),
+            (ANSWER_NA, "cell-na", LABEL_NA),
+        ]
+    }
+    row_cells = pd.Series("", index=df_comp.index, dtype=object)
     for company in company_columns:
-        table_html += f'<th style="width: {company_width}; text-align: center;">{company}</th>'
+        row_cells = row_cells + _classify_answers(_clean_na_series(df_comp, company, "")).map(answer_cells)
     
-    table_html += """
-                    </tr>
-                </thead>
-                <tbody>
-    """
-    
-    # Générer les lignes du tableau avec pagination
-    max_rows_per_page = 15 if landscape_mode else 20
-    current_row = 0
+    # Lignes assemblées par concaténation de colonnes (pas de boucle par cellule)
+    rows = (
+        "<tr><td><strong>" + criteres + "</strong></td>"
+        + "<td>" + domaines + "</td>"
+        + "<td>" + differenciateurs + "</td>"
+        + row_cells + "</tr>"
+    )
     
-    for idx, row in df_comp.iterrows():
-        if current_row >= max_rows_per_page:
-            # Nouvelle page/section
-            table_html += """
-                </tbody>
-            </table>
-        </div>
-        <div class="page-break"></div>
-        <div class="table-container">
-            <table>
-                <thead>
-                    <tr>
-                        <th style="width: 35%;">Critère</th>
-                        <th style="width: 15%;">Domaine</th>
-                        <th style="width: 15%;">Différenciateur</th>
-            """
-            
-            # Ajouter les colonnes d'entreprises avec largeur dynamique
-            for company in company_columns:
-                table_html += f'<th style="width: {company_width}; text-align: center;">{company}</th>'
-            
-            table_html += """
-                    </tr>
-                </thead>
-                <tbody>
-            """
-            current_row = 0
-        
-        # Nettoyer les valeurs des colonnes de base
-        critere = _get_clean_value(row, "Exigence", "Non spécifié")
-        if len(critere) > 150:
-            critere = critere[:147] + "..."
-        
-        domaine = _get_clean_value(row, "Domaine", "Non spécifié")
-        if len(domaine) > 30:
-            domaine = domaine[:27] + "..."
-        
-        differenciatrice = _get_clean_value(row, "Exigence différenciateur", "Non spécifié")
-        if len(differenciatrice) > 30:
-            differenciatrice = differenciatrice[:27] + "..."
-        
-        table_html += f"""
-        <tr>
-            <td style="padding: 8px; border-right: 1px solid #ddd;"><strong>{critere}</strong></td>
-            <td style="padding: 8px; border-right: 1px solid #ddd;">{domaine}</td>
-            <td style="padding: 8px; border-right: 1px solid #ddd;">{differenciatrice}</td>
-        """
-        
-        # Ajouter les réponses des entreprises
-        for company in company_columns:
-            company_value = _get_clean_value(row, company, "")
-            
-            # Interpréter la valeur comme oui/non avec classes CSS
-            if str(company_value).strip() in ['1', '1.0', 'Oui', 'oui', 'OUI', 'Yes', 'yes', 'TRUE', 'True', 'true']:
-                cell_content = '<span>✓ Oui</span>'
-                cell_class = "cell-yes"
-            elif str(company_value).strip() in ['0', '0.0', 'Non', 'non', 'NON', 'No', 'no', 'FALSE', 'False', 'false']:
-                cell_content = '<span>✗ Non</span>'
-                cell_class = "cell-no"
-            else:
-                cell_content = '<span>-</span>'
-                cell_class = "cell-na"
-            
-            table_html += f'<td class="{cell_class}" style="padding: 8px; border-right: 1px solid #ddd;">{cell_content}</td>'
-        
-        table_html += "</tr>"
-        current_row += 1
+    # Émettre le tableau page par page (pages découpées d'avance)
+    max_rows_per_page = COMPARATIVE_ROWS_PER_PAGE_LANDSCAPE if landscape_mode else COMPARATIVE_ROWS_PER_PAGE
+    for page_index, page_rows in enumerate(_paginate_rows(rows, max_rows_per_page)):
+        if page_index:
+            yield PAGE_BREAK_HTML
+        yield table_open
+        yield page_rows
+        yield table_close
     
-    table_html += """
-                </tbody>
-            </table>
-        </div>
-    </div>
-    """
     # Sections supprimées : Analyse par domaine et Tableau de synthèse des scores par entreprise
-    category_analysis = ""
-    
-    return f"""
-    <div class="section page-break" id="comparative">
-        <h2>4. Analyse comparative</h2>
-        
-        {stats_html}
-        
-        {filters_html}
-        
-        {table_html}
-        
-        {category_analysis}
-        
-        <div style="margin-top: 30px;">
-            <h3>Méthodologie d'évaluation</h3>
-            <p>Cette analyse comparative est basée sur les critères sélectionnés et les filtres appliqués. 
-            Les données sont extraites de la base de données IVÉO et reflètent l'état actuel des informations disponibles.</p>
-            <p>Les priorités sont classées selon l'importance stratégique de chaque critère pour l'organisation.</p>
-        </div>
-    </div>
-    """
+    yield render("comparative_close")
 
+@functools.lru_cache(maxsize=1)
 def _generate_recommendations():
     """Génère la section des recommandations stratégiques."""
-    return """
-    <div class="section page-break" id="recommandations">
-        <h2>5. Recommandations stratégiques</h2>
-        
-        <div class="recommendations">
-            <h3>Recommandations prioritaires</h3>
-            <ul>
-                <li><strong>Évaluation approfondie des solutions leaders</strong> : Procéder à une analyse détaillée des solutions ayant obtenu les meilleures notes dans l'évaluation comparative</li>
-                <li><strong>Validation des critères critiques</strong> : Confirmer que les critères les plus importants pour l'organisation sont correctement pondérés dans l'analyse</li>
-                <li><strong>Pilote d'implémentation</strong> : Planifier une phase pilote avec les solutions sélectionnées pour valider leur adéquation opérationnelle</li>
-                <li><strong>Analyse coût-bénéfice approfondie</strong> : Compléter l'évaluation technique par une analyse financière détaillée</li>
-            </ul>
-        </div>
-        
-        <div class="recommendations">
-            <h3>Considérations stratégiques</h3>
-            <ul>
-                <li><strong>Alignement organisationnel</strong> : S'assurer que la solution choisie s'intègre dans l'écosystème technologique existant</li>
-                <li><strong>Capacité d'évolution</strong> : Privilégier les solutions offrant une roadmap claire et des possibilités d'évolution</li>
-                <li><strong>Support et maintenance</strong> : Évaluer la qualité du support technique et la stabilité financière des fournisseurs</li>
-                <li><strong>Formation et adoption</strong> : Prévoir un plan de formation pour maximiser l'adoption utilisateur</li>
-            </ul>
-        </div>
-        
-        <div class="highlight">
-            <h3>Prochaines étapes recommandées</h3>
-            <p>
-                1. <strong>Validation des résultats</strong> avec les parties prenantes clés<br>
-                2. <strong>Démonstrations techniques</strong> avec les fournisseurs finalistes<br>
-                3. <strong>Évaluation des références clients</strong> et retours d'expérience<br>
-                4. <strong>Négociation commerciale</strong> et finalisation des conditions contractuelles<br>
-                5. <strong>Planification de l'implémentation</strong> et définition des jalons
-            </p>
-        </div>
-    </div>
-    """
+    return render("recommendations")
 
+@functools.lru_cache(maxsize=1)
 def _generate_methodology_section():
     """Génère la section méthodologie."""
-    return f"""
-    <div class=\"section page-break\" id=\"methodologie\">\n        <h2>{TITLE_METHODOLOGY}</h2>\n        <div class=\"highlight\">\n            <h3>Approche méthodologique</h3>\n            <p>L'analyse comparative a été menée selon une méthodologie structurée et objective, garantissant la fiabilité et la reproductibilité des résultats.</p>\n        </div>\n        <h3>Étapes de l'analyse</h3>\n        <div class=\"company-details\">\n            <div class=\"detail-item\"><strong>1. Collecte des données</strong><br>Recueil systématique des informations sur les entreprises et solutions évaluées</div>\n            <div class=\"detail-item\"><strong>2. Définition des critères</strong><br>Établissement d'une grille d'évaluation basée sur les besoins organisationnels</div>\n            <div class=\"detail-item\"><strong>3. Évaluation comparative</strong><br>Notation objective selon les critères définis avec vérification croisée</div>\n            <div class=\"detail-item\"><strong>4. Analyse des résultats</strong><br>Synthèse des évaluations et identification des patterns significatifs</div>\n        </div>\n        <h3>Critères d'évaluation</h3>\n        <div class=\"table-container\">\n            <table>\n                <thead>\n                    <tr>\n                        <th>{LABEL_TABLE_SOLUTION[1]}</th>\n                        <th>Description</th>\n                        <th>Pondération</th>\n                    </tr>\n                </thead>\n                <tbody>\n                    <tr>\n                        <td><strong>Fonctionnalités techniques</strong></td>\n                        <td>Évaluation des capacités techniques et fonctionnelles</td>\n                        <td>Élevée</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Facilité d'utilisation</strong></td>\n                        <td>Ergonomie et facilité d'adoption par les utilisateurs</td>\n                        <td>Moyenne</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Support et maintenance</strong></td>\n                        <td>Qualité du support technique et de la maintenance</td>\n                        <td>Élevée</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Coût total de possession</strong></td>\n                        <td>Analyse des coûts d'acquisition et d'exploitation</td>\n                        <td>Très élevée</td>\n                    </tr>\n                </tbody>\n            </table>\n        </div>\n        <h3>Limites et considérations</h3>\n        <p>Cette analyse se base sur les informations disponibles au moment de l'évaluation. Les évolutions technologiques et les changements organisationnels peuvent influencer la pertinence des recommandations. Il est recommandé de procéder à des réévaluations périodiques pour maintenir la pertinence de l'analyse.</p>\n    </div>\n    """
+    return render("methodology", title=TITLE_METHODOLOGY, category_label=LABEL_TABLE_SOLUTION[1])
 
+@functools.lru_cache(maxsize=1)
 def _generate_annexes():
     """Génère les annexes avec informations détaillées."""
-    return f"""
-    <div class=\"section page-break\" id=\"annexes\">\n        <h2>{TITLE_ANNEXES}</h2>\n        <h3>Méthodologie d'évaluation détaillée</h3>\n        <div class=\"table-container\">\n            <table>\n                <thead>\n                    <tr>\n                        <th>Aspect</th>\n                        <th>Description</th>\n                        <th>Méthode</th>\n                    </tr>\n                </thead>\n                <tbody>\n                    <tr>\n                        <td><strong>Critères d'évaluation</strong></td>\n                        <td>Évaluation binaire ({LABEL_YES}/{LABEL_NO}) ou numérique selon le critère</td>\n                        <td>Notation standardisée</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Pondération</strong></td>\n                        <td>Importance relative selon les besoins organisationnels</td>\n                        <td>Consultation des parties prenantes</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Validation</strong></td>\n                        <td>Vérification croisée des évaluations</td>\n                        <td>Revue par les experts métier</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Mise à jour</strong></td>\n                        <td>Actualisation périodique des données</td>\n                        <td>Cycle de révision trimestriel</td>\n                    </tr>\n                </tbody>\n            </table>\n        </div>\n        <h3>Sources des données</h3>\n        <div class=\"company-details\">\n            <div class=\"detail-item\"><strong>Documentation officielle</strong><br>Fiches techniques et spécifications fournisseurs</div>\n            <div class=\"detail-item\"><strong>Démonstrations techniques</strong><br>Évaluations en conditions réelles d'utilisation</div>\n            <div class=\"detail-item\"><strong>Retours d'expérience</strong><br>Témoignages clients et études de cas</div>\n            <div class=\"detail-item\"><strong>Analyses tierces</strong><br>Rapports d'analystes et comparatifs sectoriels</div>\n        </div>\n        <h3>Glossaire</h3>\n        <div class=\"table-container\">\n            <table>\n                <thead>\n                    <tr>\n                        <th>Terme</th>\n                        <th>Définition</th>\n                    </tr>\n                </thead>\n                <tbody>\n                    <tr>\n                        <td><strong>Analyse comparative</strong></td>\n                        <td>Évaluation systématique de solutions selon des critères prédéfinis</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Critère différenciateur</strong></td>\n                        <td>Élément d'évaluation permettant de distinguer les solutions</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Pondération</strong></td>\n                        <td>Coefficient d'importance attribué à chaque critère d'évaluation</td>\n                    </tr>\n                    <tr>\n                        <td><strong>Score normalisé</strong></td>\n                        <td>Notation standardisée permettant la comparaison entre solutions</td>\n                    </tr>\n                </tbody>\n            </table>\n        </div>\n        <h3>Informations techniques</h3>\n        <div class=\"highlight\">\n            <p><strong>Plateforme d'analyse :</strong> {META_GENERATOR}</p>\n            <p><strong>Version du rapport :</strong> 1.0</p>\n            <p><strong>Format de données :</strong> Excel (.xlsx)</p>\n            <p><strong>Méthode d'export :</strong> HTML vers PDF</p>\n        </div>\n    </div>\n    """
+    return render("annexes", title=TITLE_ANNEXES, label_yes=LABEL_YES, label_no=LABEL_NO, generator=META_GENERATOR)
 
+@functools.lru_cache(maxsize=1)
 def _generate_footer():
     """Génère le pied de page professionnel."""
-    return """
-    <div class="footer">
-        <p><strong>IVÉO - Intelligence d'Affaires</strong></p>
-        <p>Rapport généré automatiquement • Toute reproduction interdite sans autorisation</p>
-        <p>Pour toute question, contactez l'équipe IVÉO</p>
-    </div>
-    """
+    return render("footer")
 
-def create_html_download_link(html_content, filename):
-    """
-    Crée un lien de téléchargement pour le rapport HTML.
-    
-    Args:
-        html_content (str): Contenu HTML du rapport
-        filename (str): Nom du fichier
-        
-    Returns:
-        str: HTML du lien de téléchargement
-    """
-    b64 = base64.b64encode(html_content.encode()).decode()
-    href = f'<a href="data:text/html;base64,{b64}" download="{filename}" style="display: inline-block; color: #fff; background-color: #0072B2; text-decoration: none; font-weight: bold; padding: 12px 24px; border-radius: 8px; margin: 10px 0;">📄 Télécharger le rapport HTML</a>'
-    return href
-
-def create_pdf_download_link(pdf_content, filename):
-    """
-    Crée un lien de téléchargement pour le rapport PDF.
-    
-    Args:
-        pdf_content (bytes): Contenu PDF du rapport
-        filename (str): Nom du fichier
-        
-    Returns:
-        str: HTML du lien de téléchargement
-    """
-    b64 = base64.b64encode(pdf_content).decode()
-    href = f'<a href="data:application/pdf;base64,{b64}" download="{filename}" style="display: inline-block; color: #fff; background-color: #dc3545; text-decoration: none; font-weight: bold; padding: 12px 24px; border-radius: 8px; margin: 10px 0;">📄 Télécharger le rapport PDF</a>'
-    return href
-
-def generate_pdf_from_html(html_content):
+def generate_pdf_from_html(html_content, report_css=False):
     """
     Génère un PDF à partir du contenu HTML.
     
+    Les avertissements et erreurs sont retournés, pas affichés : c'est à la
+    page Streamlit (ou à la ligne de commande) de les présenter.
+    
     Args:
         html_content (str): Contenu HTML du rapport
+        report_css (bool): Appliquer report.css (HTML généré en mode CSS_NONE)
         
     Returns:
-        bytes: Contenu PDF ou None si erreur
+        tuple: (contenu PDF ou None si erreur, liste des messages)
     """
     try:
-        # Essayer avec WeasyPrint d'abord
-        if WEASYPRINT_AVAILABLE:
-            try:
-                from weasyprint import HTML as WeasyHTML
-                pdf_bytes = WeasyHTML(string=html_content).write_pdf()
-                return pdf_bytes
-            except Exception as e:
-                error_msg = str(e).lower()
-                if any(lib in error_msg for lib in ["libpango", "libcairo", "libffi", "shared object", "ctypes"]):
-                    st.warning(MSG_MISSING_LIBS)
-                elif "fontconfig" in error_msg:
-                    st.warning(MSG_MISSING_FONTCONFIG)
-                else:
-                    st.warning(MSG_WEASYPRINT_ERROR.format(error_msg))
-        # Fallback avec pdfkit
-        if PDFKIT_AVAILABLE:
-            try:
-                MARGIN = '0.75in'
-                options = {
-                    'page-size': 'A4',
-                    'margin-top': MARGIN,
-                    'margin-right': MARGIN,
-                    'margin-bottom': MARGIN,
-                    'margin-left': MARGIN,
-                    'encoding': "UTF-8",
-                    'no-outline': None,
-                    'enable-local-file-access': None,
-                    'quiet': ''
-                }
-                pdf_bytes = pdfkit.from_string(html_content, False, options=options)
-                return pdf_bytes
-            except Exception as e:
-                error_msg = str(e)
-                if "wkhtmltopdf" in error_msg:
-                    st.warning(MSG_PDFKIT_MISSING)
-                elif "No such file or directory" in error_msg:
-                    st.warning(MSG_PDFKIT_NOT_FOUND)
-                else:
-                    st.warning(MSG_PDFKIT_ERROR.format(error_msg))
+        pdf_bytes, warnings = html_to_pdf(html_content, report_css=report_css)
+        if pdf_bytes:
+            return pdf_bytes, warnings
         # Si aucune bibliothèque n'est disponible ou si toutes ont échoué
-        st.info(MSG_PDF_EXPORT_UNAVAILABLE)
-        return None
+        return None, warnings + [MSG_PDF_EXPORT_UNAVAILABLE]
     except Exception as e:
         error_msg = str(e).lower()
-        if any(lib in error_msg for lib in ["libpango", "libcairo", "libffi", "shared object", "ctypes"]):
-            st.error(MSG_PDF_EXPORT_FATAL)
-        else:
-            st.error(MSG_PDF_EXPORT_ERROR.format(error_msg))
-        return None
+        if any(lib in error_msg for lib in SYSTEM_LIB_ERRORS):
+            return None, [MSG_PDF_EXPORT_FATAL]
+        return None, [MSG_PDF_EXPORT_ERROR.format(error_msg)]
 
-def generate_report_pdf(df_ent, df_sol, df_comp, df_align=None):
+def generate_report_pdf(request):
     """
     Fonction principale pour générer le rapport (version HTML).
     Compatible avec l'ancienne interface.
     
     Args:
-        df_ent (pd.DataFrame): Données des entreprises
-        df_sol (pd.DataFrame): Données des solutions
-        df_comp (pd.DataFrame): Données d'analyse comparative
-        df_align (pd.DataFrame): Données d'alignement (optionnel)
+        request (ReportRequest): Données et filtres du rapport
         
     Returns:
         str: Contenu HTML du rapport
     """
     try:
-        html_content = generate_html_report(df_ent, df_sol, df_comp, df_align)
+        html_content = generate_html_report(request)
         return html_content
     except Exception as e:
-        st.error(MSG_REPORT_GEN_ERROR.format(str(e)))
+        print(MSG_REPORT_GEN_ERROR.format(str(e)))
         return None
 
-def create_download_link(content, filename):
+
+# =================== CACHE DES RAPPORTS ===================
+_NOT_RENDERED = object()
+
+
+class ReportArtifact:
     """
-    Crée un lien de téléchargement pour le rapport.
+    Rapport généré une seule fois pour un jeu de données et un état de filtres donnés.
     
-    Args:
-        content: Contenu du rapport (HTML string ou PDF bytes)
-        filename (str): Nom du fichier
-        
-    Returns:
-        str: HTML du lien de téléchargement
+    Le HTML est construit au premier accès ; la conversion PDF n'est lancée que
+    si le PDF est demandé, puis conservée (y compris un échec, pour ne pas
+    relancer une conversion vouée à échouer à chaque clic). Les erreurs et
+    avertissements sont rassemblés dans messages, que la page affiche.
     """
-    if isinstance(content, str):
-        # C'est du HTML
-        return create_html_download_link(content, filename.replace('.pdf', '.html'))
-    elif isinstance(content, bytes):
-        # C'est du PDF
-        return create_pdf_download_link(content, filename.replace('.html', '.pdf'))
-    return None
-
-def generate_report_with_export_options(df_ent, df_sol, df_comp, df_align=None):
-    """
-    Génère un rapport avec options d'export HTML et PDF.
-    
-    Args:
-        df_ent (pd.DataFrame): Données des entreprises
-        df_sol (pd.DataFrame): Données des solutions
-        df_comp (pd.DataFrame): Données d'analyse comparative
-        df_align (pd.DataFrame): Données d'alignement (optionnel)
+
+    def __init__(self, request):
+        self.key = request.key
+        self.request = request
+        self._parts = _NOT_RENDERED
+        self._html = _NOT_RENDERED
+        self._pdf_html = _NOT_RENDERED
+        self._pdf = _NOT_RENDERED
+        self._exports = {}
+        self.messages = []
+
+    @property
+    def parts(self):
+        """list: Fragments (section, HTML) du rapport (None si la génération a échoué)."""
+        if self._parts is _NOT_RENDERED:
+            try:
+                self._parts = list(iter_report_parts(self.request))
+            except Exception as e:
+                self.messages.append(MSG_REPORT_GEN_ERROR.format(str(e)))
+                self._parts = None
+        return self._parts
+
+    @property
+    def html(self):
+        """str: HTML du rapport (None si la génération a échoué)."""
+        if self._html is _NOT_RENDERED:
+            parts = self.parts
+            self._html = "".join(fragment for _, fragment in parts) if parts else None
+        return self._html
+
+    @property
+    def pdf_html(self):
+        """str: HTML destiné au moteur PDF, sans report.css intégrée (None si la génération a échoué)."""
+        if self._pdf_html is _NOT_RENDERED:
+            parts = self.parts
+            self._pdf_html = "".join(fragment for _, fragment in pdf_report_parts(parts)) if parts else None
+        return self._pdf_html
+
+    @property
+    def sections(self):
+        """list: Documents (nom, HTML sans report.css intégrée) rendables séparément, pour le rendu PDF parallèle."""
+        parts = self.parts
+        return split_report_documents(pdf_report_parts(parts)) if parts else []
+
+    @property
+    def pdf(self):
+        """bytes: PDF du rapport (None si la conversion est indisponible ou a échoué)."""
+        if self._pdf is _NOT_RENDERED:
+            html_content = self.pdf_html
+            self._pdf = None
+            if html_content:
+                self._pdf, warnings = generate_pdf_from_html(html_content, report_css=True)
+                self.messages.extend(warnings)
+        return self._pdf
+
+    def export(self, profile):
+        """
+        HTML du rapport transformé par un profil d'export (calculé une fois par profil).
         
-    Returns:
-        dict: {"html": html_content, "pdf": pdf_content}
-    """
-    try:
-        # Générer le contenu HTML
-        html_content = generate_html_report(df_ent, df_sol, df_comp, df_align)
-        if not html_content:
-            return {"html": None, "pdf": None}
-        # Générer le PDF à partir du HTML
-        pdf_content = generate_pdf_from_html(html_content)
-        return {
-            "html": html_content,
-            "pdf": pdf_content
-        }
-    except Exception as e:
-        st.error(MSG_REPORT_GEN_ERROR.format(str(e)))
-        return {"html": None, "pdf": None}
+        Args:
+            profile (ExportProfile): Profil d'export (voir app.report_export)
+            
+        Returns:
+            str | bytes: HTML exporté (bytes si compressé), None si la génération a échoué
+        """
+        if profile.name not in self._exports:
+            from app.report_export import apply_export_profile
+            html_content = self.html
+            self._exports[profile.name] = apply_export_profile(html_content, profile) if html_content else None
+        return self._exports[profile.name]
@@ -0,0 +1,305 @@
+"""
+Conversion HTML → PDF indépendante de Streamlit
+===============================================
+
+Ce module ne dépend ni de Streamlit ni des cookies : il peut être exécuté
+dans un processus de travail (file de rapports) comme dans l'application.
+Les problèmes rencontrés sont renvoyés sous forme de messages plutôt
+qu'affichés, l'appelant décide comment les présenter.
+
+La feuille de style des rapports (report.css) est compilée une seule fois
+par processus et passée au moteur : les documents générés pour le PDF ne
+l'intègrent pas (mode CSS_NONE de app.report_templates).
+
+Version : 1.1 - 2025.01.16
+"""
+
+import functools
+import importlib.util
+import threading
+from pathlib import Path
+
+from app.report_assets import localize_images
+from app.report_templates import REPORT_CSS_PATH
+
+
+def module_available(name):
+    """
+    Indique si un module est installé, sans l'importer.
+    
+    Les moteurs PDF (WeasyPrint, pdfkit, pypdf, ReportLab) sont lourds à
+    charger : leur présence est vérifiée au démarrage, leur import est
+    différé au premier rendu.
+    
+    Args:
+        name (str): Nom du module
+        
+    Returns:
+        bool: True si le module peut être importé
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+SECTIONED_RENDER_AVAILABLE = module_available("pypdf")
+
+# =================== MESSAGES ===================
+MSG_MISSING_LIBS = "Bibliothèques système manquantes pour WeasyPrint (libpango, libcairo). Tentative avec pdfkit..."
+MSG_MISSING_FONTCONFIG = "Configuration des polices manquante. Tentative avec pdfkit..."
+MSG_WEASYPRINT_ERROR = "Erreur WeasyPrint: {}"
+MSG_PDFKIT_MISSING = "wkhtmltopdf non installé sur cette plateforme."
+MSG_PDFKIT_NOT_FOUND = "Exécutable wkhtmltopdf introuvable."
+MSG_PDFKIT_ERROR = "Erreur pdfkit: {}"
+MSG_ASSETS_ERROR = "Images non mises en cache: {}"
+
+SYSTEM_LIB_ERRORS = ["libpango", "libcairo", "libffi", "shared object", "ctypes"]
+
+# Polices embarquées : fichiers Inter-<Graisse>.woff2/.ttf/.otf déposés dans app/assets/fonts
+FONTS_DIR = Path(__file__).parent / "assets" / "fonts"
+FONT_FAMILY = "Inter"
+FONT_WEIGHTS = {"Light": 300, "Regular": 400, "Medium": 500, "SemiBold": 600, "Bold": 700}
+FONT_EXTENSIONS = [".woff2", ".woff", ".ttf", ".otf"]
+# Feuille de style commune aux PDF, compilée une seule fois par processus
+PDF_BASE_CSS = """
+@page { size: A4; margin: 0.75in; }
+body { font-family: 'Inter', 'Helvetica Neue', Arial, sans-serif; }
+"""
+# Numérotation en rendu d'un seul tenant ; en rendu par sections elle est apposée après fusion
+PAGE_NUMBER_CSS = """
+@page { @bottom-center { content: "Page " counter(page) " / " counter(pages); font-size: 8pt; color: #666; } }
+"""
+PAGE_NUMBER_LABEL = "Page {page} / {pages}"
+PAGE_NUMBER_FONT = ("Helvetica", 8)
+PAGE_NUMBER_MARGIN = 20  # points depuis le bas de page
+
+FETCH_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Ressources distantes (images, logos) gardées en mémoire
+
+PDFKIT_MARGIN = '0.75in'
+PDFKIT_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': PDFKIT_MARGIN,
+    'margin-right': PDFKIT_MARGIN,
+    'margin-bottom': PDFKIT_MARGIN,
+    'margin-left': PDFKIT_MARGIN,
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'enable-local-file-access': None,
+    'quiet': ''
+}
+
+
+def _font_face_css(fonts_dir):
+    """
+    Construit les règles @font-face pour les fichiers Inter présents localement.
+    
+    Args:
+        fonts_dir (Path): Dossier des polices
+        
+    Returns:
+        str: Règles CSS (vide si aucun fichier : la police système de repli est utilisée)
+    """
+    rules = []
+    for style, weight in FONT_WEIGHTS.items():
+        for extension in FONT_EXTENSIONS:
+            font_file = fonts_dir / f"{FONT_FAMILY}-{style}{extension}"
+            if font_file.exists():
+                rules.append(
+                    f"@font-face {{ font-family: '{FONT_FAMILY}'; font-weight: {weight}; "
+                    f"src: url('{font_file.as_uri()}'); }}"
+                )
+                break
+    return "\n".join(rules)
+
+
+class PDFRenderer:
+    """
+    Moteur WeasyPrint réutilisable pour la durée du processus.
+    
+    Les feuilles de style (polices locales comprises, et report.css des
+    rapports) sont analysées une seule fois à la création ; la configuration
+    des polices et les ressources distantes déjà téléchargées sont partagées
+    entre les rendus.
+    """
+
+    def __init__(self, fonts_dir=FONTS_DIR):
+        from weasyprint import CSS, default_url_fetcher
+        try:
+            from weasyprint.text.fonts import FontConfiguration
+        except ImportError:
+            # WeasyPrint < 53
+            from weasyprint.fonts import FontConfiguration
+        self._default_url_fetcher = default_url_fetcher
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(
+            string=_font_face_css(Path(fonts_dir)) + PDF_BASE_CSS,
+            font_config=self.font_config
+        )
+        self.report_stylesheet = CSS(filename=str(REPORT_CSS_PATH), font_config=self.font_config)
+        self.page_number_stylesheet = CSS(string=PAGE_NUMBER_CSS, font_config=self.font_config)
+        self._fetch_cache = {}
+        self._fetch_cache_bytes = 0
+        self._fetch_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+
+    def url_fetcher(self, url, *args, **kwargs):
+        """
+        Récupère une ressource via le fetcher WeasyPrint, avec mise en cache du contenu.
+        
+        Args:
+            url (str): URL de la ressource
+            
+        Returns:
+            dict: Résultat au format attendu par WeasyPrint
+        """
+        with self._fetch_lock:
+            cached = self._fetch_cache.get(url)
+        if cached is not None:
+            return dict(cached)
+        result = self._default_url_fetcher(url, *args, **kwargs)
+        if "file_obj" in result:
+            file_obj = result.pop("file_obj")
+            try:
+                result["string"] = file_obj.read()
+            finally:
+                file_obj.close()
+        size = len(result.get("string") or b"")
+        with self._fetch_lock:
+            if url not in self._fetch_cache and size <= FETCH_CACHE_MAX_BYTES:
+                self._fetch_cache[url] = result
+                self._fetch_cache_bytes += size
+                # Éviction des ressources les plus anciennes au-delà du budget mémoire
+                while self._fetch_cache_bytes > FETCH_CACHE_MAX_BYTES:
+                    oldest = next(iter(self._fetch_cache))
+                    self._fetch_cache_bytes -= len(self._fetch_cache.pop(oldest).get("string") or b"")
+        return dict(result)
+
+    def render(self, html_content, base_url=None, page_numbers=True, report_css=False):
+        """
+        Convertit un document HTML en PDF.
+        
+        Args:
+            html_content (str): Document HTML complet
+            base_url (str): Base pour les chemins relatifs (optionnel)
+            page_numbers (bool): Numéroter les pages en pied de page
+            report_css (bool): Appliquer report.css (document généré sans feuille de style)
+            
+        Returns:
+            bytes: Contenu PDF
+        """
+        from weasyprint import HTML
+        document = HTML(string=html_content, base_url=base_url, url_fetcher=self.url_fetcher)
+        # report.css en premier : la feuille commune (format de page, police) garde la priorité
+        stylesheets = [self.report_stylesheet, self.stylesheet] if report_css else [self.stylesheet]
+        if page_numbers:
+            stylesheets.append(self.page_number_stylesheet)
+        # La configuration des polices n'est pas prévue pour des rendus simultanés
+        with self._render_lock:
+            return document.write_pdf(stylesheets=stylesheets, font_config=self.font_config)
+
+
+@functools.lru_cache(maxsize=1)
+def get_renderer():
+    """Retourne le moteur PDF du processus (créé au premier appel)."""
+    return PDFRenderer()
+
+
+def html_to_pdf(html_content, localize_assets=True, page_numbers=True, report_css=False):
+    """
+    Convertit un document HTML en PDF avec WeasyPrint, puis pdfkit en repli.
+
+    Args:
+        html_content (str): Document HTML complet
+        localize_assets (bool): Pré-télécharger les images distantes dans le cache local
+        page_numbers (bool): Numéroter les pages (False pour une section destinée à être fusionnée)
+        report_css (bool): Appliquer report.css (document généré en mode CSS_NONE)
+
+    Returns:
+        tuple: (pdf_bytes ou None, liste des avertissements rencontrés)
+    """
+    warnings = []
+    if localize_assets:
+        try:
+            html_content = localize_images(html_content)
+        except Exception as e:
+            # Cache inaccessible : le moteur PDF téléchargera lui-même les images
+            warnings.append(MSG_ASSETS_ERROR.format(e))
+    try:
+        return get_renderer().render(html_content, page_numbers=page_numbers, report_css=report_css), warnings
+    except Exception as e:
+        error_msg = str(e).lower()
+        if any(lib in error_msg for lib in SYSTEM_LIB_ERRORS):
+            warnings.append(MSG_MISSING_LIBS)
+        elif "fontconfig" in error_msg:
+            warnings.append(MSG_MISSING_FONTCONFIG)
+        else:
+            warnings.append(MSG_WEASYPRINT_ERROR.format(error_msg))
+    # Fallback avec pdfkit
+    try:
+        import pdfkit
+    except ImportError:
+        return None, warnings
+    try:
+        css = str(REPORT_CSS_PATH) if report_css else None
+        return pdfkit.from_string(html_content, False, options=PDFKIT_OPTIONS, css=css), warnings
+    except Exception as e:
+        error_msg = str(e)
+        if "wkhtmltopdf" in error_msg:
+            warnings.append(MSG_PDFKIT_MISSING)
+        elif "No such file or directory" in error_msg:
+            warnings.append(MSG_PDFKIT_NOT_FOUND)
+        else:
+            warnings.append(MSG_PDFKIT_ERROR.format(error_msg))
+    return None, warnings
+
+
+def _page_number_overlay(page_sizes):
+    """
+    Génère un PDF transparent portant « Page x / n » sur chaque page.
+    
+    Args:
+        page_sizes (list): Dimensions (largeur, hauteur) en points de chaque page
+        
+    Returns:
+        pypdf.PdfReader: Calque à superposer page à page
+    """
+    from io import BytesIO
+    import pypdf
+    from reportlab.pdfgen import canvas
+    buffer = BytesIO()
+    overlay = canvas.Canvas(buffer)
+    total = len(page_sizes)
+    for number, (width, height) in enumerate(page_sizes, start=1):
+        overlay.setPageSize((width, height))
+        overlay.setFont(*PAGE_NUMBER_FONT)
+        overlay.setFillGray(0.4)
+        overlay.drawCentredString(width / 2, PAGE_NUMBER_MARGIN, PAGE_NUMBER_LABEL.format(page=number, pages=total))
+        overlay.showPage()
+    overlay.save()
+    buffer.seek(0)
+    return pypdf.PdfReader(buffer)
+
+
+def merge_pdf_sections(section_pdfs):
+    """
+    Assemble des PDF rendus séparément et renumérote l'ensemble des pages.
+    
+    Args:
+        section_pdfs (list): Contenus PDF (bytes) dans l'ordre du rapport
+        
+    Returns:
+        tuple: (pdf_bytes, liste des avertissements rencontrés)
+    """
+    from io import BytesIO
+    import pypdf
+    writer = pypdf.PdfWriter()
+    for section_pdf in section_pdfs:
+        writer.append(pypdf.PdfReader(BytesIO(section_pdf)))
+    page_sizes = [(float(page.mediabox.width), float(page.mediabox.height)) for page in writer.pages]
+    overlay = _page_number_overlay(page_sizes)
+    for page, overlay_page in zip(writer.pages, overlay.pages):
+        page.merge_page(overlay_page)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue(), []
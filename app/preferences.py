@@ -0,0 +1,195 @@
+"""
+Préférences utilisateur persistées dans un seul cookie
+======================================================
+
+Les sélections des barres latérales (entreprises, couleurs, type
+d'exigence, solution, chemin du classeur) sont conservées dans un
+dictionnaire sérialisé en un JSON compact, stocké dans un unique cookie
+chiffré. Les pages lisent et modifient ce dictionnaire en mémoire ; une
+seule écriture chiffrée a lieu en fin d'exécution (flush), et seulement si
+le JSON diffère de la dernière version persistée.
+
+Les listes d'images des solutions, seules préférences à croître sans
+borne, sont rangées dans un second cookie : elles ne peuvent pas faire
+dépasser la taille maximale au cookie des sélections. Aucune préférence
+n'est jamais retirée pour tenir dans un cookie : si l'un des deux dépasse
+la limite, son écriture est refusée (il garde sa dernière version) et un
+avertissement est renvoyé à l'appelant.
+
+Les anciens cookies (un par clé, dont un par couleur d'entreprise) sont
+lus une fois en repli, repris dans le dictionnaire, puis supprimés lors de
+la même écriture.
+
+Ce module n'importe pas Streamlit : le magasin reçoit le gestionnaire de
+cookies (EncryptedCookieManager ou tout mapping disposant de save()).
+
+Version : 1.0 - 2025.01.16
+"""
+
+import copy
+import json
+
+# =================== CONFIGURATION ===================
+PREFERENCES_COOKIE = "prefs"
+PREFERENCES_IMAGES_COOKIE = "prefs_images"
+PREFERENCES_MAX_BYTES = 2800   # JSON avant chiffrement : le cookie chiffré reste sous la limite de 4 Ko
+PREFERENCES_IMAGE_PREFIXES = ("solution_images_",)   # listes d'images, rangées dans PREFERENCES_IMAGES_COOKIE
+
+# =================== MESSAGES ===================
+LABEL_PREFERENCES = "les sélections"
+LABEL_PREFERENCES_IMAGES = "les listes d'images des solutions"
+MSG_PREFERENCES_TOO_LARGE = (
+    "Préférences non enregistrées : {label} dépassent la taille maximale d'un cookie "
+    "({size} / {max_bytes} octets). Elles restent actives pour cette session ; "
+    "retirez-en pour qu'elles soient conservées."
+)
+
+
+def _decode_blob(raw):
+    """Dictionnaire des préférences depuis le JSON du cookie (vide si absent ou invalide)."""
+    try:
+        values = json.loads(raw) if raw else {}
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return values if isinstance(values, dict) else {}
+
+
+def _decode_legacy(raw):
+    """Valeur d'un ancien cookie : JSON pour les listes, texte brut pour les couleurs et libellés."""
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return raw
+
+
+def encode_preferences(values):
+    """JSON compact et stable (clés triées) : deux états identiques donnent le même texte."""
+    return json.dumps(values, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def _is_image_key(key):
+    """Préférence rangée dans le cookie des listes d'images."""
+    return key.startswith(PREFERENCES_IMAGE_PREFIXES)
+
+
+class PreferenceStore:
+    """Préférences d'une session, écrites dans les cookies en une fois et seulement si elles ont changé."""
+
+    def __init__(self, cookies, cookie_key=PREFERENCES_COOKIE, images_cookie_key=PREFERENCES_IMAGES_COOKIE,
+                 max_bytes=PREFERENCES_MAX_BYTES):
+        self.cookies = cookies
+        self.cookie_key = cookie_key
+        self.images_cookie_key = images_cookie_key
+        self.max_bytes = max_bytes
+        self._persisted = {key: cookies.get(key) or "" for key in (cookie_key, images_cookie_key)}
+        self.values = {}
+        for raw in self._persisted.values():
+            self.values.update(_decode_blob(raw))
+        self.warnings = []
+        self._refused = {}
+        self._legacy_checked = set()
+        self._legacy_to_delete = set()
+        self._scanned_prefixes = set()
+
+    def get(self, key, default=None, legacy_key=None):
+        """
+        Valeur d'une préférence, avec repli sur l'ancien cookie de même nom.
+
+        Args:
+            key (str): Clé de la préférence
+            default: Valeur retournée si elle n'existe nulle part
+            legacy_key (str): Nom de l'ancien cookie s'il diffère de key
+
+        Returns:
+            Copie de la valeur (les modifications passent par set)
+        """
+        if key not in self.values:
+            legacy = self.pop_legacy(key if legacy_key is None else legacy_key)
+            if legacy is None:
+                return default
+            self.values[key] = legacy
+        return copy.deepcopy(self.values[key])
+
+    def set(self, key, value):
+        """Modifie une préférence en mémoire (écrite au prochain flush si elle a changé)."""
+        self.values[key] = value
+
+    def delete(self, key):
+        """Supprime une préférence."""
+        self.values.pop(key, None)
+
+    def pop_legacy(self, legacy_key):
+        """
+        Lit un ancien cookie une seule fois par session et programme sa suppression.
+
+        Args:
+            legacy_key (str): Nom de l'ancien cookie
+
+        Returns:
+            Valeur décodée, ou None si le cookie n'existe pas
+        """
+        if legacy_key in self._legacy_checked:
+            return None
+        self._legacy_checked.add(legacy_key)
+        raw = self.cookies.get(legacy_key)
+        if raw in (None, ""):
+            return None
+        self._legacy_to_delete.add(legacy_key)
+        return _decode_legacy(raw)
+
+    def discard_legacy(self, prefix):
+        """Programme la suppression de tous les anciens cookies d'un préfixe (une énumération par session)."""
+        if prefix in self._scanned_prefixes:
+            return
+        self._scanned_prefixes.add(prefix)
+        self._legacy_to_delete.update(key for key in list(self.cookies.keys()) if key.startswith(prefix))
+
+    def _blobs(self):
+        """JSON de chaque cookie (vide si aucune préférence), avec le libellé de son contenu."""
+        images = {key: value for key, value in self.values.items() if _is_image_key(key)}
+        selections = {key: value for key, value in self.values.items() if not _is_image_key(key)}
+        return {
+            self.cookie_key: (LABEL_PREFERENCES, encode_preferences(selections) if selections else ""),
+            self.images_cookie_key: (LABEL_PREFERENCES_IMAGES, encode_preferences(images) if images else ""),
+        }
+
+    def flush(self):
+        """
+        Écrit les préférences dans les cookies si elles ont changé depuis la dernière écriture.
+
+        À appeler une fois, en fin d'exécution : une seule sérialisation, un
+        seul chiffrement et un seul envoi au navigateur, anciens cookies
+        supprimés compris. Un cookie qui dépasserait max_bytes n'est pas
+        écrit (il garde sa dernière version) ; l'avertissement correspondant
+        est placé dans self.warnings, une fois par contenu refusé.
+
+        Returns:
+            bool: True si une écriture a eu lieu
+        """
+        self.warnings = []
+        pending = {}
+        for cookie_key, (label, blob) in self._blobs().items():
+            if blob == self._persisted[cookie_key]:
+                continue
+            size = len(blob.encode("utf-8"))
+            if size > self.max_bytes:
+                if self._refused.get(cookie_key) != blob:
+                    self._refused[cookie_key] = blob
+                    self.warnings.append(MSG_PREFERENCES_TOO_LARGE.format(label=label, size=size, max_bytes=self.max_bytes))
+                continue
+            self._refused.pop(cookie_key, None)
+            pending[cookie_key] = blob
+        if not pending and not self._legacy_to_delete:
+            return False
+        for cookie_key, blob in pending.items():
+            if blob:
+                self.cookies[cookie_key] = blob
+            elif cookie_key in self.cookies:
+                del self.cookies[cookie_key]
+        for legacy_key in self._legacy_to_delete:
+            if legacy_key in self.cookies:
+                del self.cookies[legacy_key]
+        self.cookies.save()
+        self._persisted.update(pending)
+        self._legacy_to_delete.clear()
+        return True
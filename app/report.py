@@ -0,0 +1,438 @@
+"""
+Génération de rapports IVÉO en ligne de commande
+================================================
+
+Produit le rapport HTML ou PDF d'un classeur Excel sans session Streamlit,
+par exemple depuis une tâche planifiée :
+
+    python -m app.report build classeur.xlsx -o rapport.pdf
+    python -m app.report build classeur.xlsx -o rapport.html --entreprises "A,B" --solution "X"
+
+Le format de sortie est déduit de l'extension du fichier (.pdf, .html ou
+.html.gz). Le profil d'export compact allège le HTML pour l'envoi par e-mail
+(miniatures, styles regroupés, minification) :
+
+    python -m app.report build classeur.xlsx -o rapport.html.gz --profile compact
+
+Le profil texte fait de même en supprimant les images.
+
+La sous-commande batch traite un lot de classeurs (motifs glob) sur un pool
+de processus et écrit, à côté des rapports, un manifeste JSON avec la durée
+de chaque étape. Les classeurs dont le contenu n'a pas changé depuis le
+dernier lot sont ignorés :
+
+    python -m app.report batch "clients/**/*.xlsx" -o rapports/
+    python -m app.report batch "clients/*.xlsx" -o rapports/ --formats pdf --workers 4 --force
+
+Avec --css link, les rapports HTML référencent une feuille report.css unique,
+copiée dans le dossier de sortie, au lieu d'embarquer chacun leur propre copie
+(le PDF reste autonome) :
+
+    python -m app.report batch "clients/*.xlsx" -o rapports/ --formats html --css link
+
+Version : 1.2 - 2025.01.16
+"""
+
+import argparse
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from app.utils import load_data, read_workbook, sanitize_data
+from app.pdf_generator_html import ReportRequest, generate_html_report, write_html_report
+from app.pdf_render import html_to_pdf
+from app.report_templates import CSS_INLINE, CSS_LINK, CSS_MODES, CSS_NONE, write_stylesheet
+from app.report_export import EXPORT_PROFILES, EXPORT_PROFILE_STANDARD, GZIP_SUFFIX, apply_export_profile, get_export_profile
+
+# =================== MESSAGES ===================
+MSG_BUILD_DONE = "Rapport écrit : {path}"
+MSG_BUILD_ERROR = "Erreur lors de la génération du rapport : {error}"
+MSG_PDF_FAILED = "La conversion PDF a échoué (WeasyPrint et pdfkit indisponibles)."
+MSG_UNSUPPORTED_FORMAT = "Format de sortie non pris en charge : {suffix} (attendu : .pdf, .html ou .html.gz)"
+MSG_BATCH_EMPTY = "Aucun classeur ne correspond aux motifs : {patterns}"
+MSG_BATCH_ITEM = "[{index}/{total}] {status:<9} {workbook} ({seconds:.1f} s)"
+MSG_BATCH_DONE = "{built} rapport(s) produit(s), {skipped} inchangé(s), {failed} échec(s) — manifeste : {manifest}"
+OUTPUT_FORMATS = [".pdf", ".html", ".html.gz"]
+
+# =================== TRAITEMENT PAR LOTS ===================
+BATCH_FORMATS = ["html", "pdf"]
+BATCH_WORKERS = int(os.getenv("IVEO_REPORT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+BATCH_MANIFEST = "manifest.json"
+HASH_CHUNK_BYTES = 1024 * 1024
+
+STAGE_LOAD = "chargement"
+STAGE_SANITIZE = "nettoyage"
+STAGE_HTML = "html"
+STAGE_PDF = "pdf"
+
+BATCH_STATUS_BUILT = "produit"
+BATCH_STATUS_SKIPPED = "inchangé"
+BATCH_STATUS_FAILED = "échec"
+
+
+class ReportBuildError(Exception):
+    """Le rapport n'a pas pu être produit."""
+
+
+def _split_list(value):
+    """Découpe une liste séparée par des virgules (« A, B » → ["A", "B"])."""
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def build_request(workbook, companies=None, solution="", categories=None, image_urls=None):
+    """
+    Charge un classeur et construit la requête de rapport correspondante.
+
+    Args:
+        workbook (str | Path | file): Classeur Excel IVÉO
+        companies (list): Entreprises sélectionnées (toutes si vide)
+        solution (str): Solution mise en avant (optionnel)
+        categories (list): Catégories sélectionnées (optionnel)
+        image_urls (list): Images supplémentaires de la solution mise en avant
+
+    Returns:
+        ReportRequest: Requête prête à être rendue
+    """
+    df_comp, df_ent, df_align, df_sol = load_data(workbook)
+    return ReportRequest(
+        df_ent=df_ent,
+        df_sol=df_sol,
+        df_comp=df_comp,
+        df_align=df_align,
+        selected_companies=list(companies or []),
+        selected_solution=solution or "",
+        selected_categories=list(categories or []),
+        solution_image_urls=list(image_urls or []),
+    )
+
+
+def _output_format(output):
+    """Format de sortie d'après l'extension (.html.gz compris), en minuscules."""
+    name = output.name.lower()
+    return ".html.gz" if name.endswith(".html" + GZIP_SUFFIX) else output.suffix.lower()
+
+
+def build_report(request, output, css_mode=CSS_INLINE, profile=EXPORT_PROFILE_STANDARD):
+    """
+    Écrit le rapport d'une requête au format déduit de l'extension du fichier.
+
+    Args:
+        request (ReportRequest): Données et filtres du rapport
+        output (str | Path): Fichier de sortie (.pdf, .html ou .html.gz)
+        css_mode (str): CSS_INLINE ou CSS_LINK (feuille report.css copiée à côté du HTML)
+        profile (str): Profil d'export du HTML (voir app.report_export) ; la
+            compression suit l'extension du fichier, quel que soit le profil
+
+    Returns:
+        list: Avertissements émis pendant la conversion PDF
+
+    Raises:
+        ReportBuildError: Format non pris en charge ou conversion PDF impossible
+    """
+    output = Path(output)
+    suffix = _output_format(output)
+    if suffix not in OUTPUT_FORMATS:
+        raise ReportBuildError(MSG_UNSUPPORTED_FORMAT.format(suffix=suffix or "(aucune)"))
+    export_profile = dataclasses.replace(get_export_profile(profile), gzip=suffix == ".html.gz")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if suffix != ".pdf":
+        if css_mode == CSS_LINK:
+            write_stylesheet(output.parent)
+        if export_profile == get_export_profile(EXPORT_PROFILE_STANDARD):
+            # Profil standard : écriture en flux, fragment par fragment
+            with open(output, "w", encoding="utf-8") as html_file:
+                write_html_report(html_file, request, css_mode)
+            return []
+        exported = apply_export_profile(generate_html_report(request, css_mode), export_profile)
+        if isinstance(exported, bytes):
+            output.write_bytes(exported)
+        else:
+            output.write_text(exported, encoding="utf-8")
+        return []
+    pdf_bytes, warnings = html_to_pdf(generate_html_report(request, CSS_NONE), report_css=True)
+    if not pdf_bytes:
+        raise ReportBuildError("; ".join(warnings) or MSG_PDF_FAILED)
+    output.write_bytes(pdf_bytes)
+    return warnings
+
+
+def file_sha256(path):
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _render_pdf(html_content):
+    """Convertit un rapport généré en mode CSS_NONE (report.css appliquée par le moteur PDF)."""
+    return html_to_pdf(html_content, report_css=True)
+
+
+def _batch_report(workbook, sha256, output_stem, formats, css_mode=CSS_INLINE):
+    """
+    Produit les rapports d'un classeur (exécuté dans un processus du pool).
+
+    Args:
+        workbook (str): Classeur Excel
+        sha256 (str): Empreinte du classeur, reportée dans le manifeste
+        output_stem (str): Chemin des sorties sans extension
+        formats (list): Formats à écrire (« html », « pdf »)
+        css_mode (str): Feuille de style du HTML (CSS_INLINE ou CSS_LINK)
+
+    Returns:
+        dict: Entrée du manifeste (statut, sorties, durées par étape, avertissements)
+    """
+    entry = {
+        "workbook": workbook, "sha256": sha256, "status": BATCH_STATUS_FAILED,
+        "formats": list(formats), "css": css_mode, "outputs": [], "timings": {}, "warnings": [], "error": None,
+    }
+    timings = entry["timings"]
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[stage] = round(time.perf_counter() - start, 3)
+
+    try:
+        frames = timed(STAGE_LOAD, read_workbook, workbook)
+        df_comp, df_ent, df_align, df_sol = timed(STAGE_SANITIZE, sanitize_data, *frames)
+        request = ReportRequest(df_ent=df_ent, df_sol=df_sol, df_comp=df_comp, df_align=df_align)
+        # Document sans feuille de style pour le PDF (report.css appliquée par le moteur) ;
+        # la page HTML reprend les sections du cache, seul l'en-tête du document change
+        html_content = timed(STAGE_HTML, generate_html_report, request, CSS_NONE)
+        if "html" in formats:
+            html_path = Path(f"{output_stem}.html")
+            html_path.write_text(generate_html_report(request, css_mode), encoding="utf-8")
+            entry["outputs"].append(str(html_path))
+        if "pdf" in formats:
+            pdf_bytes, warnings = timed(STAGE_PDF, _render_pdf, html_content)
+            entry["warnings"].extend(warnings)
+            if not pdf_bytes:
+                raise ReportBuildError("; ".join(warnings) or MSG_PDF_FAILED)
+            pdf_path = Path(f"{output_stem}.pdf")
+            pdf_path.write_bytes(pdf_bytes)
+            entry["outputs"].append(str(pdf_path))
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+        return entry
+    entry["status"] = BATCH_STATUS_BUILT
+    return entry
+
+
+def _load_manifest(path):
+    """Entrées du manifeste précédent, indexées par classeur (vide si absent ou illisible)."""
+    try:
+        with open(path, encoding="utf-8") as manifest_file:
+            return {entry["workbook"]: entry for entry in json.load(manifest_file).get("reports", [])}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def _is_unchanged(previous, sha256, formats, css_mode=CSS_INLINE):
+    """Le classeur a déjà été traité avec succès, à l'identique, et ses sorties existent encore."""
+    return (
+        previous is not None
+        and previous.get("status") in (BATCH_STATUS_BUILT, BATCH_STATUS_SKIPPED)
+        and previous.get("sha256") == sha256
+        and set(formats) <= set(previous.get("formats", []))
+        and previous.get("css", CSS_INLINE) == css_mode
+        and all(Path(output).exists() for output in previous.get("outputs", []))
+    )
+
+
+def _output_stems(workbooks, output_dir):
+    """Nom de sortie par classeur ; les homonymes sont départagés par l'empreinte de leur chemin."""
+    stems = [Path(workbook).stem for workbook in workbooks]
+    return {
+        workbook: str(output_dir / (
+            stem if stems.count(stem) == 1
+            else f"{stem}-{hashlib.sha256(workbook.encode('utf-8')).hexdigest()[:8]}"
+        ))
+        for workbook, stem in zip(workbooks, stems)
+    }
+
+
+def _write_json_atomic(path, data):
+    """Écrit un fichier JSON via un fichier temporaire renommé (pas de manifeste tronqué)."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+        json.dump(data, tmp_file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_batch(patterns, output_dir, formats=BATCH_FORMATS, workers=BATCH_WORKERS, force=False, progress=None,
+              css_mode=CSS_INLINE):
+    """
+    Produit les rapports d'un lot de classeurs sur un pool de processus.
+
+    Args:
+        patterns (list): Motifs glob des classeurs (« ** » accepté)
+        output_dir (str | Path): Dossier des rapports et du manifeste
+        formats (list): Formats à produire (« html », « pdf »)
+        workers (int): Processus simultanés
+        force (bool): Régénérer même les classeurs inchangés
+        progress (callable): Appelé avec (index, total, entrée) à chaque classeur terminé
+        css_mode (str): CSS_INLINE ou CSS_LINK (une feuille report.css pour tout le lot)
+
+    Returns:
+        dict: Manifeste écrit dans output_dir
+
+    Raises:
+        ReportBuildError: Aucun classeur ne correspond aux motifs
+    """
+    workbooks = sorted({
+        str(Path(match).resolve())
+        for pattern in patterns
+        for match in glob.glob(pattern, recursive=True)
+        if match.lower().endswith(".xlsx") and not Path(match).name.startswith("~$")
+    })
+    if not workbooks:
+        raise ReportBuildError(MSG_BATCH_EMPTY.format(patterns=", ".join(patterns)))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / BATCH_MANIFEST
+    if css_mode == CSS_LINK and "html" in formats:
+        write_stylesheet(output_dir)
+    previous = {} if force else _load_manifest(manifest_path)
+    stems = _output_stems(workbooks, output_dir)
+    started = time.perf_counter()
+    entries = {}
+    pending = []
+    for workbook in workbooks:
+        sha256 = file_sha256(workbook)
+        if _is_unchanged(previous.get(workbook), sha256, formats, css_mode):
+            entries[workbook] = dict(previous[workbook], status=BATCH_STATUS_SKIPPED)
+        else:
+            pending.append((workbook, sha256))
+    done = 0
+    for workbook in entries:
+        done += 1
+        if progress:
+            progress(done, len(workbooks), entries[workbook])
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            futures = {
+                executor.submit(_batch_report, workbook, sha256, stems[workbook], list(formats), css_mode): workbook
+                for workbook, sha256 in pending
+            }
+            for future in as_completed(futures):
+                workbook = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # Processus de travail mort (mémoire, signal) : le lot continue
+                    entry = {"workbook": workbook, "status": BATCH_STATUS_FAILED, "error": str(e), "timings": {}}
+                entries[workbook] = entry
+                done += 1
+                if progress:
+                    progress(done, len(workbooks), entry)
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "formats": list(formats),
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "reports": [entries[workbook] for workbook in workbooks],
+    }
+    _write_json_atomic(manifest_path, manifest)
+    return manifest
+
+
+def _cmd_build(args):
+    """Sous-commande build : un classeur → un rapport."""
+    try:
+        request = build_request(
+            args.workbook,
+            companies=_split_list(args.entreprises),
+            solution=args.solution,
+            categories=_split_list(args.categories),
+            image_urls=_split_list(args.images),
+        )
+        for warning in build_report(request, args.output, args.css, args.profile):
+            print(warning, file=sys.stderr)
+    except (ReportBuildError, ValueError, OSError) as e:
+        print(MSG_BUILD_ERROR.format(error=e), file=sys.stderr)
+        return 1
+    print(MSG_BUILD_DONE.format(path=args.output))
+    return 0
+
+
+def _cmd_batch(args):
+    """Sous-commande batch : un lot de classeurs → rapports et manifeste."""
+    formats = _split_list(args.formats)
+    unknown = [fmt for fmt in formats if fmt not in BATCH_FORMATS]
+    if unknown or not formats:
+        print(MSG_UNSUPPORTED_FORMAT.format(suffix=", ".join(unknown) or "(aucun)"), file=sys.stderr)
+        return 1
+
+    def report_progress(index, total, entry):
+        seconds = sum(entry.get("timings", {}).values())
+        print(MSG_BATCH_ITEM.format(index=index, total=total, status=entry["status"], workbook=entry["workbook"], seconds=seconds))
+        if entry.get("error"):
+            print(f"    {entry['error']}", file=sys.stderr)
+
+    try:
+        manifest = run_batch(
+            args.patterns, args.output_dir, formats, args.workers, args.force, report_progress, args.css
+        )
+    except (ReportBuildError, OSError) as e:
+        print(MSG_BUILD_ERROR.format(error=e), file=sys.stderr)
+        return 1
+    statuses = [entry["status"] for entry in manifest["reports"]]
+    print(MSG_BATCH_DONE.format(
+        built=statuses.count(BATCH_STATUS_BUILT),
+        skipped=statuses.count(BATCH_STATUS_SKIPPED),
+        failed=statuses.count(BATCH_STATUS_FAILED),
+        manifest=Path(args.output_dir) / BATCH_MANIFEST
+    ))
+    return 1 if BATCH_STATUS_FAILED in statuses else 0
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m app.report",
+        description="Génération des rapports IVÉO hors de l'application Streamlit."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Générer le rapport d'un classeur")
+    build.add_argument("workbook", help="Classeur Excel (.xlsx)")
+    build.add_argument("-o", "--output", required=True, help="Fichier de sortie (.pdf, .html ou .html.gz)")
+    build.add_argument("--entreprises", help="Entreprises à détailler, séparées par des virgules")
+    build.add_argument("--solution", default="", help="Solution à mettre en avant")
+    build.add_argument("--categories", help="Catégories sélectionnées, séparées par des virgules")
+    build.add_argument("--images", help="URLs d'images de la solution mise en avant, séparées par des virgules")
+    build.add_argument("--profile", choices=list(EXPORT_PROFILES), default=EXPORT_PROFILE_STANDARD, help="Profil d'export du HTML (compact : allégé pour l'e-mail ; texte : compact sans images)")
+    build.add_argument("--css", choices=CSS_MODES, default=CSS_INLINE, help="Feuille de style du HTML : intégrée ou liée (report.css)")
+    build.set_defaults(handler=_cmd_build)
+
+    batch = commands.add_parser("batch", help="Générer les rapports d'un lot de classeurs")
+    batch.add_argument("patterns", nargs="+", help="Motifs glob des classeurs (ex. \"clients/**/*.xlsx\")")
+    batch.add_argument("-o", "--output-dir", required=True, help="Dossier des rapports et du manifeste")
+    batch.add_argument("--formats", default=",".join(BATCH_FORMATS), help="Formats produits, séparés par des virgules (html,pdf)")
+    batch.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Processus simultanés")
+    batch.add_argument("--force", action="store_true", help="Régénérer aussi les classeurs inchangés")
+    batch.add_argument("--css", choices=CSS_MODES, default=CSS_INLINE, help="Feuille de style des HTML : intégrée ou liée (report.css)")
+    batch.set_defaults(handler=_cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    args = _build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
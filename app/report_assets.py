@@ -0,0 +1,227 @@
+"""
+Résolution locale des images distantes du rapport
+=================================================
+
+Avant la conversion PDF, les images référencées par le rapport (logos,
+captures des solutions) sont téléchargées en parallèle, réduites à la
+résolution d'impression et stockées dans un cache disque adressé par
+contenu. Les attributs src sont ensuite réécrits vers ces fichiers locaux
+(ou en data URI), si bien que le rendu ne dépend plus de la latence des CDN
+et fonctionne hors ligne une fois le cache rempli.
+
+Ce module n'importe pas Streamlit : il est utilisable dans les processus de
+travail de la file de rapports.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import base64
+import hashlib
+import html
+import io
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# =================== CONFIGURATION ===================
+ASSET_CACHE_DIR = Path(os.getenv("IVEO_ASSET_CACHE_DIR", Path(tempfile.gettempdir()) / "iveo_report_assets"))
+ASSET_CACHE_MAX_BYTES = 200 * 1024 * 1024
+ASSET_FETCH_TIMEOUT = 10        # secondes par image
+ASSET_FETCH_WORKERS = 8
+ASSET_MAX_BYTES = 15 * 1024 * 1024  # Au-delà, l'image est ignorée
+PRINT_MAX_PX = 1200             # ~200 px/po sur la largeur utile d'une page A4
+PRINT_JPEG_QUALITY = 85
+THUMBNAIL_JPEG_QUALITY = 70
+USER_AGENT = "IVEO-BI-Report/1.0"
+
+# Image transparente 1×1 substituée aux images introuvables : évite que le moteur PDF ne retente le téléchargement
+PLACEHOLDER_DATA_URI = (
+    "data:image/png;base64,"
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+IMG_SRC_PATTERN = re.compile(r'(<img\b[^>]*?\bsrc=)(["\'])(https?://[^"\']+)\2', re.IGNORECASE)
+MIME_BY_SUFFIX = {".png": "image/png", ".jpg": "image/jpeg", ".gif": "image/gif", ".svg": "image/svg+xml", ".webp": "image/webp"}
+
+
+def extract_image_urls(html_content):
+    """
+    Liste les URLs http(s) des balises <img> d'un document HTML.
+
+    Args:
+        html_content (str): Document HTML
+
+    Returns:
+        list: URLs distinctes, dans l'ordre d'apparition
+    """
+    return list(dict.fromkeys(match.group(3) for match in IMG_SRC_PATTERN.finditer(html_content)))
+
+
+def _url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _index_path(url, cache_dir):
+    """Fichier pointeur URL → fichier de contenu."""
+    return cache_dir / "index" / _url_key(url)
+
+
+def _lookup(url, cache_dir):
+    """Retourne le fichier en cache pour une URL, ou None."""
+    try:
+        target = cache_dir / _index_path(url, cache_dir).read_text().strip()
+    except OSError:
+        return None
+    if not target.exists():
+        return None
+    os.utime(target)  # Fraîcheur pour l'éviction LRU
+    return target
+
+
+def _atomic_write(path, data):
+    """Écrit un fichier via un fichier temporaire renommé (sûr entre processus)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(data)
+    os.replace(tmp_path, path)
+
+
+def _downsample(data, max_px=PRINT_MAX_PX, jpeg_quality=PRINT_JPEG_QUALITY):
+    """
+    Réduit une image matricielle à max_px de côté.
+
+    Args:
+        data (bytes): Image source
+        max_px (int): Plus grand côté autorisé, en pixels
+        jpeg_quality (int): Qualité des images réencodées en JPEG
+
+    Returns:
+        tuple: (octets, suffixe) — l'original si Pillow échoue ou si l'image est vectorielle
+    """
+    try:
+        from PIL import Image
+        image = Image.open(io.BytesIO(data))
+        image_format = (image.format or "").upper()
+        if image_format == "GIF" or max(image.size) <= max_px:
+            return data, "." + (image_format.lower().replace("jpeg", "jpg") or "png")
+        image.thumbnail((max_px, max_px))
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(output, format="PNG", optimize=True)
+            return output.getvalue(), ".png"
+        image.convert("RGB").save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+        return output.getvalue(), ".jpg"
+    except Exception:
+        suffix = ".svg" if data.lstrip()[:5] in (b"<?xml", b"<svg ") else ""
+        return data, suffix
+
+
+def _fetch(url, cache_dir, session):
+    """
+    Télécharge une image et la range dans le cache (nom = empreinte du contenu).
+
+    Returns:
+        Path: Fichier local, ou None si l'image est inaccessible
+    """
+    cached = _lookup(url, cache_dir)
+    if cached is not None:
+        return cached
+    try:
+        # L'URL provient d'un attribut HTML : les entités (&amp;) doivent être décodées
+        with session.get(html.unescape(url), timeout=ASSET_FETCH_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            data = response.raw.read(ASSET_MAX_BYTES + 1, decode_content=True)
+        if len(data) > ASSET_MAX_BYTES or not data:
+            return None
+    except (requests.RequestException, OSError):
+        return None
+    data, suffix = _downsample(data)
+    name = hashlib.sha256(data).hexdigest() + suffix
+    target = cache_dir / name
+    if not target.exists():
+        _atomic_write(target, data)
+    _atomic_write(_index_path(url, cache_dir), name.encode("utf-8"))
+    return target
+
+
+def prefetch_images(urls, cache_dir=ASSET_CACHE_DIR, max_workers=ASSET_FETCH_WORKERS):
+    """
+    Télécharge en parallèle les images absentes du cache.
+
+    Args:
+        urls (list): URLs à résoudre
+        cache_dir (Path): Dossier du cache
+        max_workers (int): Téléchargements simultanés
+
+    Returns:
+        dict: URL → fichier local (None pour les images inaccessibles)
+    """
+    cache_dir = Path(cache_dir)
+    if not urls:
+        return {}
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        session.headers["User-Agent"] = USER_AGENT
+        resolved = dict(zip(urls, executor.map(lambda url: _fetch(url, cache_dir, session), urls)))
+    evict_cache(cache_dir)
+    return resolved
+
+
+def evict_cache(cache_dir=ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES):
+    """Supprime les fichiers les moins récemment utilisés au-delà de max_bytes."""
+    cache_dir = Path(cache_dir)
+    try:
+        files = [(entry.stat(), entry) for entry in cache_dir.iterdir() if entry.is_file()]
+    except OSError:
+        return
+    total = sum(stat.st_size for stat, _ in files)
+    for stat, entry in sorted(files, key=lambda item: item[0].st_mtime):
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+            total -= stat.st_size
+        except OSError:
+            pass
+    # Les pointeurs orphelins sont ignorés par _lookup puis réécrits au prochain téléchargement
+
+
+def _data_uri(path, max_px=None):
+    """Data URI d'un fichier du cache, réduit à max_px de côté si demandé (miniature)."""
+    data, suffix = path.read_bytes(), path.suffix.lower()
+    if max_px:
+        data, suffix = _downsample(data, max_px, THUMBNAIL_JPEG_QUALITY)
+    mime = MIME_BY_SUFFIX.get(suffix or path.suffix.lower(), "application/octet-stream")
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def localize_images(html_content, inline=False, cache_dir=ASSET_CACHE_DIR, max_px=None):
+    """
+    Remplace les images distantes d'un document par leurs copies locales.
+
+    Args:
+        html_content (str): Document HTML
+        inline (bool): True pour des data URI (document autonome), False pour des URI file://
+        cache_dir (Path): Dossier du cache
+        max_px (int): Avec inline, réduit les images intégrées à ce côté (miniatures)
+
+    Returns:
+        str: Document HTML réécrit
+    """
+    resolved = prefetch_images(extract_image_urls(html_content), cache_dir)
+    if not resolved:
+        return html_content
+    replacements = {}
+    for url, path in resolved.items():
+        if path is None:
+            replacements[url] = PLACEHOLDER_DATA_URI
+        else:
+            replacements[url] = _data_uri(path, max_px) if inline else path.resolve().as_uri()
+    return IMG_SRC_PATTERN.sub(
+        lambda match: f"{match.group(1)}{match.group(2)}{replacements[match.group(3)]}{match.group(2)}",
+        html_content
+    )
@@ -0,0 +1,195 @@
+"""
+Profils d'export des rapports HTML IVÉO
+=======================================
+
+Le profil « standard » livre le rapport tel quel. Le profil « compact »
+vise les rapports envoyés par e-mail ou imprimés depuis le navigateur :
+
+- les attributs style="..." répétés sont regroupés en classes CSS ;
+- les images distantes sont remplacées par des miniatures intégrées ;
+- le balisage est minifié puis compressé en .html.gz.
+
+Le profil « texte » applique les mêmes transformations mais supprime les
+images : c'est la variante la plus légère, pour les messageries qui
+bloquent ou limitent les pièces jointes volumineuses.
+
+Ce module n'importe pas Streamlit : il sert aussi à la ligne de commande
+(app.report).
+
+Version : 1.0 - 2025.01.16
+"""
+
+import gzip
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from app.report_assets import localize_images
+
+# =================== CONFIGURATION ===================
+EXPORT_PROFILE_STANDARD = "standard"
+EXPORT_PROFILE_COMPACT = "compact"
+EXPORT_PROFILE_TEXT = "texte"
+
+IMAGES_KEEP = "conserver"
+IMAGES_THUMBNAIL = "miniatures"
+IMAGES_DROP = "supprimer"
+
+THUMBNAIL_MAX_PX = 240
+GZIP_LEVEL = 9
+GZIP_SUFFIX = ".gz"
+
+# Un style est regroupé en classe dès qu'il apparaît HOIST_MIN_COUNT fois
+HOIST_MIN_COUNT = 2
+HOISTED_CLASS_PREFIX = "st"
+
+TAG_WITH_STYLE_PATTERN = re.compile(r'<([a-zA-Z][\w-]*)([^<>]*?)\sstyle=(["\'])(.*?)\3([^<>]*)>', re.DOTALL)
+CLASS_ATTR_PATTERN = re.compile(r'\sclass=(["\'])(.*?)\1', re.DOTALL)
+IMG_TAG_PATTERN = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+STYLE_BLOCK_PATTERN = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)", re.IGNORECASE | re.DOTALL)
+CSS_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_SPACING_PATTERN = re.compile(r"\s*([{};,>])\s*")
+BETWEEN_TAGS_PATTERN = re.compile(r">\s+<")
+WHITESPACE_PATTERN = re.compile(r"\s{2,}")
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class ExportProfile:
+    """Transformations appliquées au HTML d'un rapport avant son téléchargement."""
+    name: str
+    hoist_styles: bool = False
+    images: str = IMAGES_KEEP
+    minify: bool = False
+    gzip: bool = False
+
+
+EXPORT_PROFILES = {
+    EXPORT_PROFILE_STANDARD: ExportProfile(EXPORT_PROFILE_STANDARD),
+    EXPORT_PROFILE_COMPACT: ExportProfile(
+        EXPORT_PROFILE_COMPACT, hoist_styles=True, images=IMAGES_THUMBNAIL, minify=True, gzip=True
+    ),
+    EXPORT_PROFILE_TEXT: ExportProfile(
+        EXPORT_PROFILE_TEXT, hoist_styles=True, images=IMAGES_DROP, minify=True, gzip=True
+    ),
+}
+
+
+def get_export_profile(name):
+    """
+    Retourne un profil d'export par son nom.
+
+    Args:
+        name (str): Nom du profil (EXPORT_PROFILE_*)
+
+    Returns:
+        ExportProfile: Profil correspondant
+
+    Raises:
+        ValueError: Profil inconnu
+    """
+    try:
+        return EXPORT_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Profil d'export inconnu : {name} (attendu : {', '.join(EXPORT_PROFILES)})") from None
+
+
+def hoist_inline_styles(html_content, min_count=HOIST_MIN_COUNT):
+    """
+    Regroupe les attributs style="..." répétés en classes CSS.
+
+    Les styles présents au moins min_count fois sont remplacés par une classe
+    générée (fusionnée avec l'attribut class existant) et déclarés une seule
+    fois dans un bloc <style> ajouté avant </head>.
+
+    Args:
+        html_content (str): Document HTML
+        min_count (int): Nombre d'occurrences à partir duquel un style est regroupé
+
+    Returns:
+        str: Document HTML réécrit
+    """
+    counts = Counter(match.group(4).strip() for match in TAG_WITH_STYLE_PATTERN.finditer(html_content))
+    repeated = [style for style, count in counts.most_common() if style and count >= min_count]
+    if not repeated:
+        return html_content
+    class_names = {style: f"{HOISTED_CLASS_PREFIX}{index}" for index, style in enumerate(repeated)}
+
+    def replace(match):
+        tag, before, _, style, after = match.groups()
+        class_name = class_names.get(style.strip())
+        if class_name is None:
+            return match.group(0)
+        attributes = before + after
+        if CLASS_ATTR_PATTERN.search(attributes):
+            attributes = CLASS_ATTR_PATTERN.sub(
+                lambda found: f' class={found.group(1)}{found.group(2)} {class_name}{found.group(1)}', attributes, count=1
+            )
+        else:
+            attributes += f' class="{class_name}"'
+        return f"<{tag}{attributes}>"
+
+    rules = "".join(f".{class_name}{{{style}}}" for style, class_name in class_names.items())
+    html_content = TAG_WITH_STYLE_PATTERN.sub(replace, html_content)
+    return html_content.replace("</head>", f"<style>{rules}</style></head>", 1)
+
+
+def drop_images(html_content):
+    """Supprime les balises <img> d'un document HTML."""
+    return IMG_TAG_PATTERN.sub("", html_content)
+
+
+def minify_html(html_content):
+    """
+    Minifie un document HTML : commentaires, blancs entre balises et dans les feuilles de style.
+
+    Le rapport ne contient ni <pre> ni <textarea> : les blancs multiples y sont
+    sans effet à l'affichage et peuvent être réduits partout.
+
+    Args:
+        html_content (str): Document HTML
+
+    Returns:
+        str: Document HTML minifié
+    """
+    html_content = HTML_COMMENT_PATTERN.sub("", html_content)
+    html_content = STYLE_BLOCK_PATTERN.sub(
+        lambda match: match.group(1)
+        + CSS_SPACING_PATTERN.sub(r"\1", CSS_COMMENT_PATTERN.sub("", match.group(2))).strip()
+        + match.group(3),
+        html_content
+    )
+    html_content = BETWEEN_TAGS_PATTERN.sub("><", html_content)
+    return WHITESPACE_PATTERN.sub(" ", html_content).strip()
+
+
+def apply_export_profile(html_content, profile):
+    """
+    Applique un profil d'export au HTML d'un rapport.
+
+    Args:
+        html_content (str): Document HTML complet
+        profile (ExportProfile): Profil à appliquer
+
+    Returns:
+        str | bytes: HTML transformé, compressé en gzip (bytes) si le profil le demande
+    """
+    if profile.images == IMAGES_DROP:
+        html_content = drop_images(html_content)
+    elif profile.images == IMAGES_THUMBNAIL:
+        html_content = localize_images(html_content, inline=True, max_px=THUMBNAIL_MAX_PX)
+    if profile.hoist_styles:
+        html_content = hoist_inline_styles(html_content)
+    if profile.minify:
+        html_content = minify_html(html_content)
+    if profile.gzip:
+        # mtime=0 : même rapport, mêmes octets (archives et déduplication)
+        return gzip.compress(html_content.encode("utf-8"), compresslevel=GZIP_LEVEL, mtime=0)
+    return html_content
+
+
+def export_filename(filename, profile):
+    """Nom de fichier du rapport exporté (suffixe .gz ajouté pour les profils compressés)."""
+    if profile.gzip and not filename.endswith(GZIP_SUFFIX):
+        return filename + GZIP_SUFFIX
+    return filename
@@ -0,0 +1,273 @@
+"""
+File de génération de rapports PDF en arrière-plan
+==================================================
+
+La conversion HTML → PDF est confiée à un pool de processus partagé par
+toutes les sessions : le script Streamlit soumet une tâche et rend la main,
+la barre latérale interroge ensuite l'état de la tâche jusqu'à ce que le PDF
+soit prêt. Deux demandes identiques (mêmes données, mêmes filtres) partagent
+la même tâche. Les très gros rapports sont rendus section par section sur
+plusieurs processus, puis fusionnés.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+
+from app.pdf_render import html_to_pdf, merge_pdf_sections, SECTIONED_RENDER_AVAILABLE
+
+# =================== CONFIGURATION ===================
+REPORT_JOB_WORKERS = int(os.getenv("IVEO_REPORT_WORKERS", "2"))
+REPORT_JOB_NICENESS = 10  # Priorité réduite : les sessions interactives passent avant les exports
+REPORT_JOBS_MAX = 16      # Tâches terminées conservées (les plus anciennes sont évincées)
+
+# Rendu par sections (en parallèle) au-delà de cette taille de document HTML
+SECTIONED_RENDER_MIN_CHARS = 500_000
+
+STATUS_PENDING = "En attente"
+STATUS_RUNNING = "En cours"
+STATUS_DONE = "Terminé"
+STATUS_FAILED = "Échec"
+
+STAGE_HTML = "Assemblage HTML"
+STAGE_PDF = "Conversion PDF"
+STAGE_SECTION = "Section {index}/{total} : {name}"
+STAGE_MERGE = "Fusion et numérotation"
+
+
+def _lower_worker_priority():
+    """Initialise un processus de travail avec une priorité d'ordonnancement réduite."""
+    try:
+        os.nice(REPORT_JOB_NICENESS)
+    except (AttributeError, OSError):
+        # os.nice indisponible (Windows) ou refusé : on garde la priorité par défaut
+        pass
+
+
+def _render_document(html_content):
+    """Rend un rapport généré sans feuille de style (report.css appliquée par le moteur)."""
+    return html_to_pdf(html_content, report_css=True)
+
+
+def _render_section(html_content):
+    """Rend une section sans numérotation : les pages sont numérotées après fusion."""
+    return html_to_pdf(html_content, page_numbers=False, report_css=True)
+
+
+class ReportJob:
+    """
+    Tâche de génération d'un rapport, avec l'état de chaque étape.
+
+    L'assemblage HTML est réalisé dans la session avant la soumission ; les
+    étapes suivantes (conversion complète, ou sections puis fusion)
+    s'exécutent dans le pool de processus.
+    """
+
+    def __init__(self, key, stage_names):
+        self.key = key
+        self.stages = {STAGE_HTML: STATUS_DONE}
+        self.stages.update({name: STATUS_PENDING for name in stage_names})
+        self.futures = {}
+        self.result = None
+        self.warnings = []
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._final_status = None
+
+    def stage_status(self, name):
+        """str: État d'une étape (« En cours » dès que son processus l'a prise en charge)."""
+        status = self.stages[name]
+        future = self.futures.get(name)
+        if status == STATUS_PENDING and future is not None and future.running():
+            return STATUS_RUNNING
+        return status
+
+    @property
+    def status(self):
+        """str: État global de la tâche."""
+        if self._final_status is not None:
+            return self._final_status
+        started = any(self.stage_status(name) != STATUS_PENDING for name in self.stages if name != STAGE_HTML)
+        return STATUS_RUNNING if started else STATUS_PENDING
+
+    @property
+    def done(self):
+        """bool: La tâche est terminée (avec ou sans succès)."""
+        return self._final_status is not None
+
+    @property
+    def progress(self):
+        """float: Avancement entre 0 et 1 (une étape en cours compte pour moitié)."""
+        weights = {STATUS_PENDING: 0.0, STATUS_RUNNING: 0.5, STATUS_DONE: 1.0, STATUS_FAILED: 1.0}
+        return sum(weights[self.stage_status(name)] for name in self.stages) / len(self.stages)
+
+    def finish(self, result=None, error=None):
+        """Enregistre l'issue de la tâche (l'horodatage précède l'état final, lu par les sessions)."""
+        self.finished_at = time.time()
+        self.result = result
+        self.error = error
+        self._final_status = STATUS_DONE if result else STATUS_FAILED
+
+
+class ReportJobManager:
+    """
+    Registre des tâches de rapport adossé à un pool de processus.
+
+    Les tâches sont indexées par la clé du rapport (empreintes des données et
+    état des filtres) : une demande déjà en cours ou terminée est réutilisée.
+    """
+
+    def __init__(self, max_workers=REPORT_JOB_WORKERS):
+        self._max_workers = max_workers
+        self._executor = self._create_executor()
+        self._jobs = {}
+        # Réentrant : submit détient le verrou quand _submit recrée un pool défaillant
+        self._lock = threading.RLock()
+
+    def _create_executor(self):
+        # "spawn" : le serveur Streamlit est multi-thread, un fork hériterait de verrous dans un état incohérent
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_lower_worker_priority
+        )
+
+    def _submit(self, fn, *args):
+        """Soumet une fonction au pool, en le recréant une fois si un processus est mort."""
+        executor = self._executor
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                # Un autre thread (rappel de fin de section) a pu recréer le pool entre-temps
+                if self._executor is executor:
+                    self._executor = self._create_executor()
+                    executor.shutdown(wait=False)
+                executor = self._executor
+            return executor.submit(fn, *args)
+
+    def submit(self, key, html_content, sections=None):
+        """
+        Soumet la conversion PDF d'un rapport, sauf si une tâche identique existe déjà.
+
+        Les gros rapports découpables sont rendus section par section en
+        parallèle puis fusionnés ; les autres en une seule passe.
+
+        Args:
+            key: Clé du rapport (hachable)
+            html_content (str): Document HTML à convertir, sans feuille de style (ReportArtifact.pdf_html)
+            sections (list): Documents (nom, HTML) rendables séparément (optionnel)
+
+        Returns:
+            ReportJob: Tâche nouvelle ou existante
+        """
+        sectioned = (
+            SECTIONED_RENDER_AVAILABLE and sections and len(sections) > 1
+            and len(html_content) >= SECTIONED_RENDER_MIN_CHARS
+        )
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != STATUS_FAILED:
+                return job
+            if sectioned:
+                job = self._submit_sections(key, sections)
+            else:
+                job = ReportJob(key, [STAGE_PDF])
+                job.futures[STAGE_PDF] = self._submit(_render_document, html_content)
+                job.futures[STAGE_PDF].add_done_callback(lambda future: self._on_pdf_done(job, future))
+            self._jobs[key] = job
+            self._evict_finished()
+        return job
+
+    def _submit_sections(self, key, sections):
+        """Crée une tâche par section ; la fusion est soumise quand toutes sont rendues."""
+        stage_names = [
+            STAGE_SECTION.format(index=index, total=len(sections), name=name)
+            for index, (name, _) in enumerate(sections, start=1)
+        ]
+        job = ReportJob(key, stage_names + [STAGE_MERGE])
+        section_results = [None] * len(sections)
+        pending = [len(sections)]
+        pending_lock = threading.Lock()
+
+        def on_section_done(index, stage, future):
+            try:
+                pdf_bytes, warnings = future.result()
+            except Exception as e:
+                pdf_bytes, warnings = None, [str(e)]
+            section_results[index] = pdf_bytes
+            job.warnings.extend(warnings)
+            job.stages[stage] = STATUS_DONE if pdf_bytes else STATUS_FAILED
+            with pending_lock:
+                pending[0] -= 1
+                last = pending[0] == 0
+            if not last:
+                return
+            if not all(section_results):
+                job.stages[STAGE_MERGE] = STATUS_FAILED
+                job.finish()
+                return
+            try:
+                merge_future = self._submit(merge_pdf_sections, section_results)
+            except Exception as e:
+                # Pool arrêté ou irrécupérable : la tâche échoue au lieu de rester en attente
+                job.stages[STAGE_MERGE] = STATUS_FAILED
+                job.finish(error=str(e))
+                return
+            job.futures[STAGE_MERGE] = merge_future
+            merge_future.add_done_callback(lambda merge_future: self._on_merge_done(job, merge_future))
+
+        for index, ((_, section_html), stage) in enumerate(zip(sections, stage_names)):
+            future = self._submit(_render_section, section_html)
+            job.futures[stage] = future
+            future.add_done_callback(lambda done, index=index, stage=stage: on_section_done(index, stage, done))
+        return job
+
+    def get(self, key):
+        """Retourne la tâche associée à la clé, ou None si inconnue ou évincée."""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _on_pdf_done(self, job, future):
+        """Enregistre le résultat d'une conversion en une passe."""
+        try:
+            pdf_bytes, warnings = future.result()
+        except Exception as e:
+            job.stages[STAGE_PDF] = STATUS_FAILED
+            job.finish(error=str(e))
+            return
+        job.warnings.extend(warnings)
+        job.stages[STAGE_PDF] = STATUS_DONE if pdf_bytes else STATUS_FAILED
+        job.finish(result=pdf_bytes)
+
+    def _on_merge_done(self, job, future):
+        """Enregistre le PDF fusionné d'un rendu par sections."""
+        try:
+            pdf_bytes, warnings = future.result()
+        except Exception as e:
+            job.stages[STAGE_MERGE] = STATUS_FAILED
+            job.finish(error=str(e))
+            return
+        job.warnings.extend(warnings)
+        job.stages[STAGE_MERGE] = STATUS_DONE
+        job.finish(result=pdf_bytes)
+
+    def _evict_finished(self):
+        """Évince les tâches terminées les plus anciennes au-delà de REPORT_JOBS_MAX."""
+        finished = [key for key, job in self._jobs.items() if job.done]
+        for key in finished[:max(0, len(self._jobs) - REPORT_JOBS_MAX)]:
+            del self._jobs[key]
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    """Retourne le gestionnaire de tâches partagé par toutes les sessions du serveur."""
+    return ReportJobManager()
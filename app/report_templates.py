@@ -0,0 +1,114 @@
+"""
+Gabarits HTML des rapports IVÉO
+===============================
+
+Le balisage statique des rapports (en-tête, table des matières, fiches,
+annexes...) est stocké dans app/assets/templates et la feuille de style dans
+app/assets/report.css. Les gabarits sont lus et compilés (string.Template)
+une seule fois à l'import ; seules les valeurs variables sont substituées à
+chaque rapport, les éléments répétés (lignes, cartes) étant rendus en boucle
+sur un gabarit unitaire.
+
+La feuille de style peut être intégrée au document (rapport autonome, mode
+par défaut) ou liée (un seul fichier CSS partagé par un lot de rapports).
+Les documents destinés à la conversion PDF n'en portent aucune : le moteur
+PDF applique sa copie compilée une fois par processus (app.pdf_render).
+
+Version : 1.0 - 2025.01.16
+"""
+
+import html
+import shutil
+from pathlib import Path
+from string import Template
+
+# =================== CONFIGURATION ===================
+ASSETS_DIR = Path(__file__).parent / "assets"
+TEMPLATES_DIR = ASSETS_DIR / "templates"
+REPORT_CSS_PATH = ASSETS_DIR / "report.css"
+REPORT_CSS_FILENAME = "report.css"
+
+CSS_INLINE = "inline"
+CSS_LINK = "link"
+CSS_NONE = "none"   # Document destiné au moteur PDF, qui applique report.css lui-même
+CSS_MODES = [CSS_INLINE, CSS_LINK]
+
+
+def _load_templates(templates_dir):
+    """Lit et compile tous les gabarits *.html d'un dossier (clé = nom sans extension)."""
+    return {
+        path.stem: Template(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(templates_dir).glob("*.html"))
+    }
+
+
+TEMPLATES = _load_templates(TEMPLATES_DIR)
+REPORT_CSS = REPORT_CSS_PATH.read_text(encoding="utf-8")
+_INLINE_STYLESHEET = f"<style>\n{REPORT_CSS}</style>"
+
+
+def render(name, /, **values):
+    """
+    Rend un gabarit compilé.
+
+    Args:
+        name (str): Nom du gabarit (fichier sans extension)
+        **values: Valeurs des variables $nom du gabarit
+
+    Returns:
+        str: Fragment HTML
+    """
+    return TEMPLATES[name].substitute(values)
+
+
+def render_each(name, rows):
+    """
+    Rend un gabarit unitaire pour chaque élément et concatène les fragments.
+
+    Args:
+        name (str): Nom du gabarit (ligne de tableau, carte...)
+        rows (iterable): Dictionnaires de valeurs, un par élément
+
+    Returns:
+        str: Fragments HTML concaténés
+    """
+    template = TEMPLATES[name]
+    return "".join([template.substitute(row) for row in rows])
+
+
+def stylesheet_html(css_mode=CSS_INLINE, css_href=REPORT_CSS_FILENAME):
+    """
+    Balise de la feuille de style du rapport.
+
+    Args:
+        css_mode (str): CSS_INLINE (balise <style>), CSS_LINK (balise <link>) ou CSS_NONE
+        css_href (str): Adresse de la feuille liée (mode CSS_LINK)
+
+    Returns:
+        str: Balise HTML (vide en mode CSS_NONE)
+
+    Raises:
+        ValueError: Mode inconnu
+    """
+    if css_mode == CSS_INLINE:
+        return _INLINE_STYLESHEET
+    if css_mode == CSS_LINK:
+        return f'<link rel="stylesheet" href="{html.escape(css_href, quote=True)}">'
+    if css_mode == CSS_NONE:
+        return ""
+    raise ValueError(f"Mode CSS inconnu : {css_mode} (attendu : {', '.join(CSS_MODES)})")
+
+
+def write_stylesheet(directory):
+    """
+    Copie la feuille de style à côté de rapports exportés en mode CSS_LINK.
+
+    Args:
+        directory (str | Path): Dossier des rapports
+
+    Returns:
+        Path: Fichier CSS écrit
+    """
+    target = Path(directory) / REPORT_CSS_FILENAME
+    shutil.copyfile(REPORT_CSS_PATH, target)
+    return target
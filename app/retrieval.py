@@ -0,0 +1,197 @@
+"""
+Recherche dans le contenu du classeur pour l'assistant IA
+=========================================================
+
+Chaque ligne des feuilles chargées (entreprises, solutions, analyse
+comparative, y compris les colonnes « Information complémentaire ») devient
+un document texte « colonne : valeur ». Un index BM25 en mémoire (matrice
+creuse scipy) est construit une fois par jeu de données ; pour chaque
+question, seules les lignes les plus pertinentes sont injectées dans le
+prompt, dans la limite d'un budget de caractères.
+
+Ce module n'importe pas Streamlit.
+
+Version : 1.0 - 2025.01.16
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from app.utils import dataframe_fingerprint
+
+# =================== CONFIGURATION ===================
+RETRIEVAL_TOP_K = 8
+RETRIEVAL_MAX_CHARS = 6000   # Budget total des extraits injectés dans le prompt
+DOCUMENT_MAX_CHARS = 1200    # Une ligne très large (matrice comparative) est tronquée
+BM25_K1 = 1.5
+BM25_B = 0.75
+INDEX_CACHE_MAX = 4
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+
+TOKEN_PATTERN = re.compile(r"\w+")
+FIELD_SEPARATOR = " | "
+NA_STRINGS = ["n/a", "nan", "none", "-", ""]
+STOPWORDS = frozenset("""
+    a au aux avec ce ces dans de des du elle en et est il ils je la le les leur lui ma mais me meme mes moi mon
+    ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+    y d l j m n s t c quel quelle quels quelles est sont ont the of and to in is for on what which
+""".split())
+
+# =================== MESSAGES ===================
+LABEL_CONTEXT_HEADER = "EXTRAITS PERTINENTS DES DONNÉES (lignes du classeur les plus proches de la question) :"
+LABEL_CONTEXT_ITEM = "[{sheet}, ligne {row}] {text}"
+
+
+@dataclass(frozen=True)
+class Document:
+    """Ligne d'une feuille du classeur, mise à plat en texte."""
+    sheet: str
+    row: int
+    text: str
+
+
+def _fold(text):
+    """Minuscules sans accents (« Sécurité » et « securite » se rejoignent)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """
+    Découpe un texte en termes d'index.
+
+    Args:
+        text (str): Texte libre
+
+    Returns:
+        list: Termes (minuscules, sans accents ni mots vides, au moins 2 caractères)
+    """
+    return [token for token in TOKEN_PATTERN.findall(_fold(text)) if len(token) > 1 and token not in STOPWORDS]
+
+
+def build_documents(all_dfs, max_chars=DOCUMENT_MAX_CHARS):
+    """
+    Met à plat chaque ligne des feuilles en document « colonne : valeur ».
+
+    Args:
+        all_dfs (dict): Nom de feuille → DataFrame
+        max_chars (int): Longueur maximale d'un document
+
+    Returns:
+        list: Documents, feuille par feuille, dans l'ordre des lignes
+    """
+    documents = []
+    for sheet, df in (all_dfs or {}).items():
+        if df is None or df.empty:
+            continue
+        text = df.astype(str).apply(lambda column: column.str.strip())
+        empty = df.isna() | text.apply(lambda column: column.str.lower().isin(NA_STRINGS))
+        # « colonne : valeur » par cellule, vide pour les cellules non renseignées
+        fields = text.apply(lambda column: f"{column.name}: " + column).mask(empty, "")
+        for position, values in enumerate(fields.itertuples(index=False, name=None)):
+            row_text = FIELD_SEPARATOR.join(value for value in values if value)
+            if row_text:
+                documents.append(Document(sheet, position + 1, row_text[:max_chars]))
+    return documents
+
+
+class BM25Index:
+    """Index BM25 en mémoire : pondérations précalculées dans une matrice creuse documents × termes."""
+
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.documents = list(documents)
+        self.vocabulary = {}
+        rows, cols = [], []
+        for doc_id, document in enumerate(self.documents):
+            for token in tokenize(document.text):
+                rows.append(doc_id)
+                cols.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+        shape = (len(self.documents), max(1, len(self.vocabulary)))
+        # Les doublons (doc, terme) sont additionnés : fréquences des termes
+        tf = sparse.coo_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape).tocsr()
+        tf.sum_duplicates()
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() if len(doc_len) else 0.0
+        doc_freq = np.bincount(tf.indices, minlength=shape[1])
+        idf = np.log1p((shape[0] - doc_freq + 0.5) / (doc_freq + 0.5))
+        # Poids BM25 de chaque entrée non nulle, calculés une fois pour toutes
+        row_of_entry = np.repeat(np.arange(shape[0]), np.diff(tf.indptr))
+        norm = k1 * (1 - b + b * doc_len[row_of_entry] / avg_len) if avg_len else k1
+        weights = tf.copy()
+        weights.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+        self._weights = weights.tocsc()
+
+    def search(self, query, top_k=RETRIEVAL_TOP_K):
+        """
+        Retourne les documents les plus pertinents pour une question.
+
+        Args:
+            query (str): Question de l'utilisateur
+            top_k (int): Nombre maximal de documents
+
+        Returns:
+            list: Couples (Document, score), par score décroissant (scores nuls exclus)
+        """
+        term_ids = sorted({self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary})
+        if not term_ids or not self.documents:
+            return []
+        scores = np.asarray(self._weights[:, term_ids].sum(axis=1)).ravel()
+        top_k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.documents[doc_id], float(scores[doc_id])) for doc_id in ranked if scores[doc_id] > 0]
+
+
+def get_index(all_dfs):
+    """
+    Retourne l'index du jeu de données, construit au premier appel puis mis en cache.
+
+    Args:
+        all_dfs (dict): Nom de feuille → DataFrame
+
+    Returns:
+        BM25Index: Index des lignes de toutes les feuilles
+    """
+    key = tuple((sheet, dataframe_fingerprint(df)) for sheet, df in (all_dfs or {}).items())
+    with _INDEX_CACHE_LOCK:
+        index = _INDEX_CACHE.get(key)
+        if index is not None:
+            _INDEX_CACHE.move_to_end(key)
+            return index
+    index = BM25Index(build_documents(all_dfs))
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[key] = index
+        while len(_INDEX_CACHE) > INDEX_CACHE_MAX:
+            _INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def retrieve_context(query, all_dfs, top_k=RETRIEVAL_TOP_K, max_chars=RETRIEVAL_MAX_CHARS):
+    """
+    Construit le bloc de contexte à injecter dans le prompt pour une question.
+
+    Args:
+        query (str): Question de l'utilisateur
+        all_dfs (dict): Nom de feuille → DataFrame
+        top_k (int): Nombre maximal de lignes
+        max_chars (int): Budget de caractères du bloc
+
+    Returns:
+        str: Extraits pertinents (vide si aucune ligne ne correspond)
+    """
+    lines = []
+    used = len(LABEL_CONTEXT_HEADER)
+    for document, _ in get_index(all_dfs).search(query, top_k):
+        line = LABEL_CONTEXT_ITEM.format(sheet=document.sheet, row=document.row, text=document.text)
+        if used + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join([LABEL_CONTEXT_HEADER, *lines]) if lines else ""
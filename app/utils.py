@@ -12,12 +12,30 @@ ERROR_SHEET_ALIGN = "Feuille 'Evaluation de la finalité' ou 'Alignement avec le
 ERROR_SHEET_SOL = "Feuille 'Solutions' ou 'Solution' introuvable. Feuilles disponibles : {available_sheets}"
 CLEAN_COL_LOGO = "Logo"
 EXCEL_ERRORS = ['#VALUE!', '#NAME?', '#REF!', '#DIV/0!', '#NUM!', '#NULL!']
+# Réponses des entreprises dans l'analyse comparative (rapports, assistant IA)
+NA_STRINGS = ['n/a', 'nan', '-', '']
+YES_VALUES = ['1', '1.0', 'Oui', 'oui', 'OUI', 'Yes', 'yes', 'TRUE', 'True', 'true']
+NO_VALUES = ['0', '0.0', 'Non', 'non', 'NON', 'No', 'no', 'FALSE', 'False', 'false']
+PARTIAL_VALUES = ['0.5', 'Partiel', 'partiel', 'Partiellement', 'partiellement', 'Partial', 'partial']
+
+# Catégories de réponse des entreprises (tableau comparatif)
+ANSWER_YES = "yes"
+ANSWER_NO = "no"
+ANSWER_PARTIAL = "partial"
+ANSWER_NA = "na"
+# Table de correspondance réponse (minuscules) → catégorie, appliquée par un seul map par colonne
+ANSWER_LOOKUP = {
+    **{value.lower(): ANSWER_PARTIAL for value in PARTIAL_VALUES},
+    **{value.lower(): ANSWER_NO for value in NO_VALUES},
+    **{value.lower(): ANSWER_YES for value in YES_VALUES},
+}
 
 import pandas as pd
 import openpyxl
 from openpyxl.drawing.image import Image
 import io
 import os
+import hashlib
 
 def _find_sheet(available_sheets, possible_names, error_message):
     for name in possible_names:
@@ -85,9 +103,9 @@ def extract_images_from_excel(file, sheet_name):
         traceback.print_exc()
     return images_dict
 
-def load_data(file):
+def read_workbook(file):
     """
-    Charge les quatre DataFrames principaux depuis le fichier Excel :
+    Lit les quatre feuilles principales du fichier Excel, sans nettoyage :
      - feuille 'Analyse comparative' (ou 'Comparatif')
      - feuille 'Entreprise' ou 'Entreprises'
      - feuille 'Evaluation de la finalité' (ou 'Alignement avec le besoin')
@@ -104,6 +122,15 @@ def load_data(file):
     df_align = pd.read_excel(xls, sheet_name=sheet_align, engine="openpyxl")
     sheet_sol = _find_sheet(available_sheets, SHEET_SOL_NAMES, ERROR_SHEET_SOL)
     df_sol = pd.read_excel(xls, sheet_name=sheet_sol, engine="openpyxl")
+    return df_comp, df_ent, df_align, df_sol
+
+def sanitize_data(df_comp, df_ent, df_align, df_sol):
+    """
+    Nettoie les DataFrames lus par read_workbook : noms de colonnes sans
+    espaces superflus et erreurs Excel (#VALUE!, #REF!...) retirées de la
+    colonne Logo. Les DataFrames sont modifiés sur place.
+    Retourne : df_comp, df_ent, df_align, df_sol
+    """
     # --- Nettoyage basique des colonnes ---
     df_comp.columns  = [str(col).strip() for col in df_comp.columns]
     df_ent.columns   = [str(col).strip() for col in df_ent.columns]
@@ -112,12 +139,43 @@ def load_data(file):
     # --- Nettoyage des erreurs Excel dans la colonne Logo ---
     if CLEAN_COL_LOGO in df_ent.columns:
         print("Nettoyage de la colonne Logo...")
-        logo_cleaned = 0
-        for i in range(len(df_ent)):
-            current_value = df_ent.iloc[i, df_ent.columns.get_loc(CLEAN_COL_LOGO)]
-            if isinstance(current_value, str) and current_value.strip() in EXCEL_ERRORS:
-                df_ent.at[i, CLEAN_COL_LOGO] = None
-                logo_cleaned += 1
-                print(f"Ligne {i+1}: Erreur Excel '{current_value}' nettoyée")
-        print(f"Total de {logo_cleaned} erreurs Excel nettoyées dans la colonne Logo")
-    return df_comp, df_ent, df_align, df_sol
\ No newline at end of file
+        logos = df_ent[CLEAN_COL_LOGO]
+        excel_errors = logos.map(lambda value: isinstance(value, str) and value.strip() in EXCEL_ERRORS).astype(bool)
+        for i in excel_errors[excel_errors].index:
+            print(f"Ligne {df_ent.index.get_loc(i)+1}: Erreur Excel '{logos[i]}' nettoyée")
+        df_ent.loc[excel_errors, CLEAN_COL_LOGO] = None
+        print(f"Total de {int(excel_errors.sum())} erreurs Excel nettoyées dans la colonne Logo")
+    return df_comp, df_ent, df_align, df_sol
+
+def load_data(file):
+    """
+    Charge et nettoie les quatre DataFrames principaux depuis le fichier Excel
+    (voir read_workbook et sanitize_data).
+    Retourne : df_comp, df_ent, df_align, df_sol
+    """
+    return sanitize_data(*read_workbook(file))
+
+def dataframe_fingerprint(df):
+    """
+    Calcule une empreinte stable du contenu d'un DataFrame (colonnes, index et valeurs).
+
+    Deux DataFrames au contenu identique ont la même empreinte, ce qui permet de
+    l'utiliser comme clé de cache pour les rapports.
+
+    Args:
+        df (pd.DataFrame): DataFrame à résumer (None accepté)
+
+    Returns:
+        str: Empreinte hexadécimale (sha256)
+    """
+    digest = hashlib.sha256()
+    if df is None:
+        digest.update(b"none")
+        return digest.hexdigest()
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    except TypeError:
+        # Cellules non hachables (listes, dict...) : repli sur la représentation texte
+        digest.update(df.astype(str).to_csv(index=True).encode("utf-8"))
+    return digest.hexdigest()
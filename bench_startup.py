@@ -0,0 +1,153 @@
+"""
+Mesure du temps d'import au démarrage de l'application IVÉO BI
+==============================================================
+
+Importe, dans un interpréteur neuf lancé avec ``-X importtime``, les mêmes
+modules que main.py, puis résume le coût des imports :
+
+- temps total et modules les plus coûteux (temps cumulé) ;
+- dépendances lourdes chargées dès le démarrage (moteurs PDF, graphiques,
+  géocodage, OpenAI) alors qu'elles ne devraient l'être qu'à la demande.
+
+Exemples :
+
+    python bench_startup.py
+    python bench_startup.py --runs 5 --top 15
+    python bench_startup.py --max-ms 1500 --fail-on-heavy   # garde-fou en CI
+    python bench_startup.py --json > startup.json             # suivi dans le temps
+
+Version : 1.0 - 2025.01.16
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# =================== CONFIGURATION ===================
+ROOT_DIR = Path(__file__).resolve().parent
+
+# Modules importés par main.py au démarrage
+STARTUP_MODULES = [
+    "streamlit",
+    "app.utils",
+    "app.pages.analyse_comparative",
+    "app.pages.home",
+    "app.pages.entreprise",
+    "app.pages.solution",
+    "sidebar",
+]
+
+# Dépendances qui ne doivent être chargées qu'au premier usage (export, carte, assistant)
+HEAVY_MODULES = [
+    "weasyprint", "pdfkit", "reportlab", "pypdf", "matplotlib", "seaborn",
+    "geopy", "pydeck", "plotly", "openai",
+]
+
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+# =================== MESSAGES ===================
+MSG_RUN_FAILED = "L'import des modules de démarrage a échoué :\n{stderr}"
+MSG_TOTAL = "Temps d'import total : {total:.0f} ms (médiane sur {runs} exécution(s))"
+MSG_TOP = "Modules les plus coûteux (temps cumulé) :"
+MSG_HEAVY = "Dépendances lourdes chargées au démarrage : {modules}"
+MSG_NO_HEAVY = "Aucune dépendance lourde chargée au démarrage."
+MSG_BUDGET_EXCEEDED = "Budget dépassé : {total:.0f} ms > {budget:.0f} ms"
+
+
+def run_importtime(modules=STARTUP_MODULES):
+    """
+    Importe des modules dans un interpréteur neuf avec -X importtime.
+
+    Args:
+        modules (list): Modules à importer, dans l'ordre
+
+    Returns:
+        list: Entrées (module, self_us, cumulative_us, profondeur)
+
+    Raises:
+        RuntimeError: Un import a échoué
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        tail = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(MSG_RUN_FAILED.format(stderr=tail[-2000:]))
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def summarize(entries, top=10):
+    """
+    Résume une exécution -X importtime.
+
+    Args:
+        entries (list): Entrées retournées par run_importtime
+        top (int): Nombre de modules de premier niveau à retenir
+
+    Returns:
+        dict: total_ms, top (module, ms cumulées) et heavy (dépendances lourdes chargées)
+    """
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+    top_level = sorted(
+        ((module, cumulative_us) for module, _, cumulative_us, depth in entries if depth == 0),
+        key=lambda item: item[1], reverse=True
+    )
+    loaded_roots = {module.split(".")[0] for module, _, _, _ in entries}
+    return {
+        "total_ms": total_us / 1000,
+        "top": [(module, cumulative_us / 1000) for module, cumulative_us in top_level[:top]],
+        "heavy": [module for module in HEAVY_MODULES if module in loaded_roots],
+    }
+
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Mesure du coût des imports au démarrage de l'application.")
+    parser.add_argument("--runs", type=int, default=3, help="Nombre d'exécutions (la médiane est retenue)")
+    parser.add_argument("--top", type=int, default=10, help="Nombre de modules coûteux affichés")
+    parser.add_argument("--max-ms", type=float, help="Budget de démarrage : échec au-delà")
+    parser.add_argument("--fail-on-heavy", action="store_true", help="Échec si une dépendance lourde est chargée")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON (suivi des mesures)")
+    args = parser.parse_args(argv)
+
+    try:
+        summaries = [summarize(run_importtime(), args.top) for _ in range(max(1, args.runs))]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    # Exécution médiane : les caches disque sont chauds dès la deuxième
+    median_total = statistics.median(summary["total_ms"] for summary in summaries)
+    summary = min(summaries, key=lambda item: abs(item["total_ms"] - median_total))
+
+    if args.json:
+        print(json.dumps({"runs": len(summaries), **summary}, ensure_ascii=False, indent=2))
+    else:
+        print(MSG_TOTAL.format(total=summary["total_ms"], runs=len(summaries)))
+        print(MSG_TOP)
+        for module, cumulative_ms in summary["top"]:
+            print(f"  {cumulative_ms:9.1f} ms  {module}")
+        print(MSG_HEAVY.format(modules=", ".join(summary["heavy"])) if summary["heavy"] else MSG_NO_HEAVY)
+
+    status = 0
+    if args.max_ms is not None and summary["total_ms"] > args.max_ms:
+        print(MSG_BUDGET_EXCEEDED.format(total=summary["total_ms"], budget=args.max_ms), file=sys.stderr)
+        status = 1
+    if args.fail_on_heavy and summary["heavy"]:
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -126,8 +126,9 @@ with st.sidebar:
     )
     st.markdown("---")
 
-    # 1) lire le dernier chemin ou URL depuis le cookie
-    default_path = sidebar.cookies.get("excel_path") or ""
+    # 1) lire le dernier chemin ou URL depuis les préférences
+    preferences = sidebar.get_preferences()
+    default_path = preferences.get("excel_path") or ""
     # 2) uploader drag & drop
     upload = st.file_uploader(
         UPLOAD_LABEL,
@@ -143,7 +144,7 @@ with st.sidebar:
             f.write(upload.getvalue())
         uploaded_file = upload
         uploaded_file.name = upload.name
-        sidebar.cookies["excel_path"] = saved_path
+        preferences.set("excel_path", saved_path)
     else:
         # 2) Sinon, utiliser le champ texte pour chemin local ou URL
         path_input = st.text_input(
@@ -166,14 +167,14 @@ with st.sidebar:
                 st.stop()
             uploaded_file = BytesIO(resp.content)
             uploaded_file.name = os.path.basename(path_input.split("?")[0])
-            sidebar.cookies["excel_path"] = path_input
+            preferences.set("excel_path", path_input)
         elif os.path.isfile(path_input):
             with open(path_input, "rb") as f:
                 data = f.read()
             from io import BytesIO
             uploaded_file = BytesIO(data)
             uploaded_file.name = os.path.basename(path_input)
-            sidebar.cookies["excel_path"] = path_input
+            preferences.set("excel_path", path_input)
     if not uploaded_file:
         st.error(ERROR_NO_FILE)
         st.stop()
@@ -237,8 +238,9 @@ with st.sidebar:
     sidebar.add_pdf_download_section(df_ent, df_sol, df_comp, df_align)
 
 # -----------------------------------------------------------------------------
-# 9) Sauvegarde **une seule fois** des cookies
+# 9) Écriture des préférences : une fois par exécution, si modifiées
 # -----------------------------------------------------------------------------
-if "cookies_saved" not in st.session_state:
-    sidebar.cookies.save()
-    st.session_state["cookies_saved"] = True
\ No newline at end of file
+preferences = sidebar.get_preferences()
+preferences.flush()
+for warning in preferences.warnings:
+    st.sidebar.warning(warning)
\ No newline at end of file
@@ -4,8 +4,9 @@ Sidebar IVÉO BI — Variables globales pour labels, titres, messages, styles
 # sidebar.py
 
 import streamlit as st
-import random, json
+import random
 from streamlit_cookies_manager import EncryptedCookieManager
+from app.preferences import PreferenceStore
 
 # =================== VARIABLES GLOBALES (labels, titres, messages, styles, états) ===================
 SIDEBAR_SECTION_EXPORT = "Export de rapport"
@@ -17,11 +18,26 @@ SIDEBAR_EXPORT_PDF_BTN = "📄 PDF"
 SIDEBAR_EXPORT_PDF_HELP = "Génère et télécharge le rapport PDF (peut échouer sur certaines plateformes)"
 SIDEBAR_EXPORT_HTML_SUCCESS = "Rapport HTML généré!"
 SIDEBAR_EXPORT_HTML_ERROR = "Erreur lors de la génération HTML"
+SIDEBAR_EXPORT_COMPACT_LABEL = "Export allégé (e-mail)"
+SIDEBAR_EXPORT_COMPACT_HELP = "Miniatures d'images, styles regroupés, HTML minifié et compressé (.html.gz)"
+KEY_EXPORT_COMPACT = "export_compact"
 SIDEBAR_EXPORT_PDF_SUCCESS = "Rapport PDF généré!"
 SIDEBAR_EXPORT_PDF_ERROR = "Erreur PDF: {error}"
 SIDEBAR_EXPORT_PDF_WARNING = "Erreur PDF: {error}"
 SIDEBAR_EXPORT_PDF_INFO = "Utilisez l'export HTML puis convertissez avec votre navigateur (Ctrl+P → Enregistrer en PDF)"
 SIDEBAR_EXPORT_PDF_UNAVAILABLE = "Export PDF indisponible. Utilisez HTML puis convertissez avec votre navigateur."
+SIDEBAR_EXPORT_PDF_QUEUED = "Rapport PDF en préparation ({status})…"
+SIDEBAR_EXPORT_PDF_STAGE = "{stage} : {status}"
+SIDEBAR_EXPORT_JOB_POLL_SECONDS = 2
+KEY_REPORT_JOB = "report_job_key"
+KEY_REPORT_ARTIFACTS = "report_artifacts"
+REPORT_ARTIFACTS_MAX = 4
+LABEL_DOWNLOAD_HTML = "📄 Télécharger le rapport HTML"
+LABEL_DOWNLOAD_PDF = "📄 Télécharger le rapport PDF"
+LABEL_DOWNLOAD_HTML_GZ = "📦 Télécharger le rapport HTML compressé"
+MIME_HTML = "text/html"
+MIME_PDF = "application/pdf"
+MIME_GZIP = "application/gzip"
 SIDEBAR_EXPORT_MODULE_ERROR = "Module de rapport non disponible: {error}"
 SIDEBAR_EXPORT_MODULE_INFO = "Le module de génération de rapport n'est pas accessible"
 SIDEBAR_EXPORT_BTN_INFO = "ℹ️ À propos du rapport"
@@ -64,6 +80,10 @@ SIDEBAR_FILTER_MULTI_HELP = "Choisissez jusqu'à {max} entreprises pour une comp
 SIDEBAR_FILTER_WARNING = "Au-delà de {max} entreprises, le radar devient moins lisible."
 SIDEBAR_SECTION_COLOR = "Couleurs personnalisées"
 SIDEBAR_COLOR_HELP = "Personnalisez la couleur de chaque entreprise"
+KEY_COLORS_STATE = "cmp_colors_current"
+PREF_COLORS = "cmp_colors"
+LEGACY_COLOR_PREFIX = "cmp_color_"
+KEY_PREFERENCES = "preferences_store"
 # Variables globales pour la section alignement
 SIDEBAR_SECTION_ALIGN = "Type d'exigence"
 SIDEBAR_ALIGN_INFO = "{n} types d'exigences disponibles"
@@ -85,6 +105,17 @@ cookies = EncryptedCookieManager(prefix="iveo_", password=COOKIE_PWD)
 if not cookies.ready():
     st.stop()
 
+def get_preferences() -> PreferenceStore:
+    """
+    Préférences de la session (un seul cookie JSON), lues une fois puis gardées en mémoire.
+
+    Les pages modifient ce magasin ; main.py l'écrit dans le cookie une seule
+    fois, en fin d'exécution, si quelque chose a changé.
+    """
+    if KEY_PREFERENCES not in st.session_state:
+        st.session_state[KEY_PREFERENCES] = PreferenceStore(cookies)
+    return st.session_state[KEY_PREFERENCES]
+
 # —————————————————————————————————————————————
 # 2) Styles pour la sidebar moderne
 # —————————————————————————————————————————————
@@ -458,6 +489,76 @@ def create_sidebar_section(title: str, icon: str = ""):
     </div>
     """, unsafe_allow_html=True)
 
+@st.fragment
+def _render_color_pickers(sel: list[str]) -> dict[str, str]:
+    """
+    Color pickers des entreprises, isolés dans un fragment.
+
+    Le fragment ne ré-exécute d'abord que les color pickers. Lorsqu'une couleur
+    déjà affichée change (comparaison avec st.session_state[KEY_COLORS_STATE],
+    les couleurs de l'exécution précédente), toute l'application est relancée
+    pour que les graphiques reçoivent la nouvelle valeur de retour. Ajouter ou
+    retirer une entreprise ne relance rien : l'exécution est déjà complète.
+    Les couleurs sont écrites dans le cookie avec les autres préférences à la
+    fin de l'exécution complète.
+    """
+    preferences = get_preferences()
+    saved = preferences.get(PREF_COLORS, {})
+    couleurs: dict[str, str] = {}
+    for ent in sel:
+        ckey = f"{LEGACY_COLOR_PREFIX}{ent}"
+        prev = saved.get(ent) or preferences.pop_legacy(ckey)
+        if isinstance(prev, str) and prev.startswith("#") and len(prev) == 7:
+            base = prev
+        else:
+            base = _random_color()
+        
+        # Conteneur stylé pour chaque color picker
+        st.markdown(f"""
+        <div style="
+            background: rgba(248, 249, 250, 0.9);
+            border: 1px solid rgba(0, 114, 178, 0.2);
+            border-radius: 10px;
+            padding: 12px;
+            margin: 8px 0;
+            transition: all 0.3s ease;
+        ">
+            <div style="
+                display: flex;
+                align-items: center;
+                gap: 8px;
+                margin-bottom: 8px;
+            ">
+                <div style="
+                    width: 12px;
+                    height: 12px;
+                    background: {base};
+                    border-radius: 50%;
+                    border: 2px solid #fff;
+                "></div>
+                <span style="
+                    font-weight: 600;
+                    color: #333;
+                    font-size: 0.9rem;
+                ">{ent}</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col = st.color_picker(
+            f"Couleur pour {ent}",
+            base,
+            key=ckey,
+            label_visibility="collapsed"
+        )
+        couleurs[ent] = col
+    preferences.set(PREF_COLORS, {**saved, **couleurs})
+    shown = st.session_state.get(KEY_COLORS_STATE, {})
+    st.session_state[KEY_COLORS_STATE] = couleurs
+    if any(shown.get(ent, col) != col for ent, col in couleurs.items()):
+        st.rerun(scope="app")
+    return couleurs
+
 def show_sidebar_comparatif(
     entreprises_disponibles: list[str],
     max_comparaison: int = 6
@@ -466,8 +567,8 @@ def show_sidebar_comparatif(
     apply_sidebar_styles()
     
     KEY_SEL = "cmp_selected"
-    raw = cookies.get(KEY_SEL)
-    previous = json.loads(raw) if raw else entreprises_disponibles[:3]
+    preferences = get_preferences()
+    previous = preferences.get(KEY_SEL) or entreprises_disponibles[:3]
     previous = [e for e in previous if e in entreprises_disponibles]
     if not previous:
         previous = entreprises_disponibles[:3]
@@ -506,8 +607,8 @@ def show_sidebar_comparatif(
             )
         if len(sel) > max_comparaison:
             st.warning(SIDEBAR_FILTER_WARNING.format(max=max_comparaison))
-    # on sérialise la sélection
-    cookies[KEY_SEL] = json.dumps(sel)
+    # on mémorise la sélection (écrite dans le cookie en fin d'exécution si elle a changé)
+    preferences.set(KEY_SEL, list(sel))
     # Section couleurs avec style moderne et icône élégante
     st.sidebar.markdown("<hr style='margin:0.7em 0 1.2em 0; border:0; border-top:2px solid #e0e0e0;'>", unsafe_allow_html=True)
     create_sidebar_section(SIDEBAR_SECTION_COLOR, "")
@@ -527,60 +628,13 @@ def show_sidebar_comparatif(
     </div>
     """, unsafe_allow_html=True)
     
-    couleurs: dict[str, str] = {}
-    for i, ent in enumerate(sel):
-        ckey = f"cmp_color_{ent}"
-        prev = cookies.get(ckey)
-        if isinstance(prev, str) and prev.startswith("#") and len(prev) == 7:
-            base = prev
-        else:
-            base = _random_color()
-        
-        # Conteneur stylé pour chaque color picker
-        st.sidebar.markdown(f"""
-        <div style="
-            background: rgba(248, 249, 250, 0.9);
-            border: 1px solid rgba(0, 114, 178, 0.2);
-            border-radius: 10px;
-            padding: 12px;
-            margin: 8px 0;
-            transition: all 0.3s ease;
-        ">
-            <div style="
-                display: flex;
-                align-items: center;
-                gap: 8px;
-                margin-bottom: 8px;
-            ">
-                <div style="
-                    width: 12px;
-                    height: 12px;
-                    background: {base};
-                    border-radius: 50%;
-                    border: 2px solid #fff;
-                "></div>
-                <span style="
-                    font-weight: 600;
-                    color: #333;
-                    font-size: 0.9rem;
-                ">{ent}</span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col = st.sidebar.color_picker(
-            f"Couleur pour {ent}",
-            base,
-            key=ckey,
-            label_visibility="collapsed"
-        )
-        couleurs[ent] = col
-        cookies[ckey] = col
-        
-    all_color_keys = [f"cmp_color_{e}" for e in entreprises_disponibles]
-    for k in cookies.keys():
-        if k.startswith("cmp_color_") and k not in all_color_keys:
-            del cookies[k]
+    with st.sidebar:
+        couleurs = _render_color_pickers(sel)
+
+    # Couleurs des entreprises absentes du classeur retirées ; anciens cookies par couleur supprimés
+    colors = preferences.get(PREF_COLORS, {})
+    preferences.set(PREF_COLORS, {e: c for e, c in colors.items() if e in entreprises_disponibles})
+    preferences.discard_legacy(LEGACY_COLOR_PREFIX)
 
     return sel, couleurs
 
@@ -594,8 +648,8 @@ def show_sidebar(
     # Appliquer les styles modernes
     apply_sidebar_styles()
     KEY = key if key is not None else f"{label.replace(' ', '_').lower()}_selected"
-    raw = cookies.get(KEY)
-    previous = json.loads(raw) if raw else (default or options[:1])
+    preferences = get_preferences()
+    previous = preferences.get(KEY) or (default or options[:1])
     previous = [v for v in previous if v in options]
     if not previous:
         previous = default or options[:1]
@@ -639,7 +693,7 @@ def show_sidebar(
 
     # Barre horizontale après le filtre entreprises
     st.sidebar.markdown("<hr style='margin:0.7em 0 1.2em 0; border:0; border-top:2px solid #e0e0e0;'>", unsafe_allow_html=True)
-    cookies[KEY] = json.dumps(sel)
+    preferences.set(KEY, list(sel))
     return sel
 
 def show_sidebar_alignement(df_align) -> str:
@@ -648,7 +702,8 @@ def show_sidebar_alignement(df_align) -> str:
     
     KEY = "align_exigence"
     types_ = df_align["Exigence de base"].dropna().unique().tolist()
-    raw = cookies.get(KEY)
+    preferences = get_preferences()
+    raw = preferences.get(KEY)
     
     # Simplification de la logique conditionnelle
     if raw in types_:
@@ -685,9 +740,177 @@ def show_sidebar_alignement(df_align) -> str:
         help=SIDEBAR_ALIGN_RADIO_HELP
     )
     st.sidebar.markdown("</div>", unsafe_allow_html=True)
-    cookies[KEY] = sel if sel is not None else ""
+    preferences.set(KEY, sel if sel is not None else "")
     return sel if sel is not None else ""
 
+def _load_preference_list(key: str) -> list:
+    """Lit une liste des préférences (liste vide si absente ou invalide)."""
+    value = get_preferences().get(key, [])
+    return value if isinstance(value, list) else []
+
+def build_report_request(df_ent=None, df_sol=None, df_comp=None, df_align=None):
+    """
+    Construit la requête de rapport à partir des sélections de l'utilisateur.
+    
+    Seul point de lecture des préférences et du session state pour le rapport :
+    la génération elle-même (app.pdf_generator_html) n'en dépend pas.
+    
+    Args:
+        df_ent: DataFrame des entreprises
+        df_sol: DataFrame des solutions
+        df_comp: DataFrame d'analyse comparative
+        df_align: DataFrame d'alignement
+        
+    Returns:
+        ReportRequest: Données, filtres et images de la solution sélectionnée
+    """
+    from app.pdf_generator_html import ReportRequest
+    selected_solutions = _load_preference_list("solution_selected")
+    selected_solution = selected_solutions[0] if selected_solutions else ""
+    criteria_filters = sorted(
+        (key, value) for key, value in st.session_state.items()
+        if isinstance(key, str) and key.startswith("selected_criteria_") and value
+    )
+    return ReportRequest(
+        df_ent=df_ent,
+        df_sol=df_sol,
+        df_comp=df_comp,
+        df_align=df_align,
+        selected_companies=_load_preference_list("selected_companies"),
+        selected_solution=selected_solution,
+        selected_categories=_load_preference_list("selected_categories"),
+        criteria_filters=criteria_filters,
+        solution_image_urls=_load_preference_list(f"solution_images_urls_{selected_solution}") if selected_solution else [],
+        solution_image_files=_load_preference_list(f"solution_images_files_{selected_solution}") if selected_solution else [],
+    )
+
+def get_report_artifact(request):
+    """
+    Retourne le rapport mis en cache pour les données et filtres de la requête.
+    
+    La clé combine l'empreinte de chaque DataFrame et l'état des filtres ; le cache
+    vit dans le session state car les filtres sont propres à l'utilisateur.
+    
+    Args:
+        request (ReportRequest): Données et filtres du rapport
+        
+    Returns:
+        ReportArtifact: Rapport à matérialiser via .html ou .pdf
+    """
+    from app.pdf_generator_html import ReportArtifact
+    key = request.key
+    artifacts = st.session_state.setdefault(KEY_REPORT_ARTIFACTS, {})
+    artifact = artifacts.pop(key, None)
+    if artifact is None:
+        artifact = ReportArtifact(request)
+    # Réinsertion en fin de dict : l'entrée la plus ancienne est évincée en premier
+    artifacts[key] = artifact
+    while len(artifacts) > REPORT_ARTIFACTS_MAX:
+        artifacts.pop(next(iter(artifacts)))
+    return artifact
+
+def _show_artifact_messages(artifact):
+    """Affiche, une seule fois, les erreurs et avertissements collectés par le rapport."""
+    while artifact.messages:
+        st.warning(artifact.messages.pop(0))
+
+def create_download_button(content, filename, key):
+    """
+    Affiche un bouton de téléchargement servi par Streamlit comme fichier.
+    
+    Le contenu n'est ni encodé en base64 ni injecté dans la page : il est
+    publié par le serveur de médias de Streamlit et téléchargé par une
+    requête HTTP classique (avec Content-Length).
+    
+    Args:
+        content: Contenu du rapport (HTML string, HTML compressé .html.gz ou PDF bytes)
+        filename (str): Nom du fichier
+        key (str): Clé unique du widget
+        
+    Returns:
+        bool: True si le type de contenu est pris en charge
+    """
+    if isinstance(content, bytes) and filename.endswith(".gz"):
+        label, mime = LABEL_DOWNLOAD_HTML_GZ, MIME_GZIP
+    elif isinstance(content, str):
+        label, mime = LABEL_DOWNLOAD_HTML, MIME_HTML
+        filename = filename.replace('.pdf', '.html')
+    elif isinstance(content, bytes):
+        label, mime = LABEL_DOWNLOAD_PDF, MIME_PDF
+        filename = filename.replace('.html', '.pdf')
+    else:
+        return False
+    st.download_button(
+        label,
+        data=content,
+        file_name=filename,
+        mime=mime,
+        key=key,
+        on_click="ignore",  # Pas de ré-exécution du script au téléchargement
+        use_container_width=True
+    )
+    return True
+
+def _render_report_job(job):
+    """
+    Affiche l'état d'une tâche de rapport PDF et, une fois prête, le lien de téléchargement.
+    
+    Args:
+        job (ReportJob): Tâche à afficher
+    """
+    from app.report_jobs import STATUS_DONE
+    from datetime import datetime
+    if not job.done:
+        st.progress(job.progress, text=SIDEBAR_EXPORT_PDF_QUEUED.format(status=job.status.lower()))
+        # Étapes restantes seulement : un gros rapport rendu par sections en compte beaucoup
+        for stage in job.stages:
+            status = job.stage_status(stage)
+            if status != STATUS_DONE:
+                st.caption(SIDEBAR_EXPORT_PDF_STAGE.format(stage=stage, status=status))
+        return
+    for warning in job.warnings:
+        st.warning(warning)
+    if job.status == STATUS_DONE:
+        timestamp = datetime.fromtimestamp(job.finished_at).strftime("%Y%m%d_%H%M%S")
+        filename = f"rapport_iveo_{timestamp}.pdf"
+        st.success(SIDEBAR_EXPORT_PDF_SUCCESS)
+        create_download_button(job.result, filename, key="download_pdf_button")
+    elif job.error:
+        st.warning(SIDEBAR_EXPORT_PDF_WARNING.format(error=job.error))
+        st.info(SIDEBAR_EXPORT_PDF_INFO)
+    else:
+        st.info(SIDEBAR_EXPORT_PDF_UNAVAILABLE)
+
+@st.fragment(run_every=SIDEBAR_EXPORT_JOB_POLL_SECONDS)
+def _poll_report_job(job_key):
+    """
+    Fragment de sondage : ne ré-exécute que l'affichage de la tâche, toutes les quelques secondes.
+    
+    Dès que la tâche est terminée, relance la page pour arrêter le sondage.
+    """
+    from app.report_jobs import get_job_manager
+    job = get_job_manager().get(job_key)
+    if job is None or job.done:
+        st.rerun()
+    _render_report_job(job)
+
+def _show_report_job():
+    """Affiche dans la sidebar la dernière tâche PDF soumise par l'utilisateur."""
+    job_key = st.session_state.get(KEY_REPORT_JOB)
+    if job_key is None:
+        return
+    from app.report_jobs import get_job_manager
+    job = get_job_manager().get(job_key)
+    if job is None:
+        # Tâche évincée du registre : rien à afficher
+        del st.session_state[KEY_REPORT_JOB]
+        return
+    with st.sidebar:
+        if job.done:
+            _render_report_job(job)
+        else:
+            _poll_report_job(job_key)
+
 def add_pdf_download_section(df_ent=None, df_sol=None, df_comp=None, df_align=None):
     """
     Ajoute une section pour télécharger le rapport PDF complet.
@@ -702,7 +925,6 @@ def add_pdf_download_section(df_ent=None, df_sol=None, df_comp=None, df_align=No
     st.sidebar.markdown("---")
     create_sidebar_section(SIDEBAR_SECTION_EXPORT, SIDEBAR_SECTION_EXPORT_ICON)
     try:
-        from app.pdf_generator_html import generate_report_with_export_options, create_download_link
         from datetime import datetime
         # Informations sur le rapport - toujours affichées
         st.sidebar.markdown(f"""
@@ -719,6 +941,11 @@ def add_pdf_download_section(df_ent=None, df_sol=None, df_comp=None, df_align=No
             {SIDEBAR_EXPORT_INFO}
         </div>
         """, unsafe_allow_html=True)
+        compact = st.sidebar.toggle(
+            SIDEBAR_EXPORT_COMPACT_LABEL,
+            key=KEY_EXPORT_COMPACT,
+            help=SIDEBAR_EXPORT_COMPACT_HELP
+        )
         # Boutons d'export - toujours les deux options disponibles
         col1, col2 = st.sidebar.columns(2)
         with col1:
@@ -729,13 +956,20 @@ def add_pdf_download_section(df_ent=None, df_sol=None, df_comp=None, df_align=No
             ):
                 with st.spinner("Génération du rapport HTML..."):
                     try:
-                        reports = generate_report_with_export_options(df_ent, df_sol, df_comp, df_align)
-                        if reports["html"]:
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"rapport_iveo_{timestamp}.html"
-                            download_link = create_download_link(reports["html"], filename)
+                        artifact = get_report_artifact(build_report_request(df_ent, df_sol, df_comp, df_align))
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        filename = f"rapport_iveo_{timestamp}.html"
+                        if compact:
+                            from app.report_export import get_export_profile, export_filename, EXPORT_PROFILE_COMPACT
+                            profile = get_export_profile(EXPORT_PROFILE_COMPACT)
+                            html_content = artifact.export(profile)
+                            filename = export_filename(filename, profile)
+                        else:
+                            html_content = artifact.html
+                        _show_artifact_messages(artifact)
+                        if html_content:
                             st.success(SIDEBAR_EXPORT_HTML_SUCCESS)
-                            st.markdown(download_link, unsafe_allow_html=True)
+                            create_download_button(html_content, filename, key="download_html_button")
                         else:
                             st.error(SIDEBAR_EXPORT_HTML_ERROR)
                     except Exception as e:
@@ -746,20 +980,22 @@ def add_pdf_download_section(df_ent=None, df_sol=None, df_comp=None, df_align=No
                 key="generate_pdf_button",
                 help=SIDEBAR_EXPORT_PDF_HELP
             ):
-                with st.spinner("Génération du rapport PDF..."):
-                    try:
-                        reports = generate_report_with_export_options(df_ent, df_sol, df_comp, df_align)
-                        if reports["pdf"]:
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"rapport_iveo_{timestamp}.pdf"
-                            download_link = create_download_link(reports["pdf"], filename)
-                            st.success(SIDEBAR_EXPORT_PDF_SUCCESS)
-                            st.markdown(download_link, unsafe_allow_html=True)
-                        else:
-                            st.info(SIDEBAR_EXPORT_PDF_UNAVAILABLE)
-                    except Exception as e:
-                        st.warning(SIDEBAR_EXPORT_PDF_WARNING.format(error=str(e)))
-                        st.info(SIDEBAR_EXPORT_PDF_INFO)
+                from app.report_jobs import get_job_manager
+                # La conversion part dans la file de tâches : la session n'est pas bloquée
+                try:
+                    artifact = get_report_artifact(build_report_request(df_ent, df_sol, df_comp, df_align))
+                    pdf_html = artifact.pdf_html
+                    _show_artifact_messages(artifact)
+                    if pdf_html:
+                        get_job_manager().submit(artifact.key, artifact.pdf_html, sections=artifact.sections)
+                        st.session_state[KEY_REPORT_JOB] = artifact.key
+                    else:
+                        st.info(SIDEBAR_EXPORT_PDF_UNAVAILABLE)
+                except Exception as e:
+                    st.warning(SIDEBAR_EXPORT_PDF_WARNING.format(error=str(e)))
+                    st.info(SIDEBAR_EXPORT_PDF_INFO)
+        # Suivi de la tâche PDF en cours (sondage tant qu'elle n'est pas terminée)
+        _show_report_job()
     except ImportError as e:
         st.sidebar.error(SIDEBAR_EXPORT_MODULE_ERROR.format(error=str(e)))
         st.sidebar.info(SIDEBAR_EXPORT_MODULE_INFO)
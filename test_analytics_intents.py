@@ -0,0 +1,79 @@
+"""
+Moteur d'analyse locale de l'assistant IA (app.analytics)
+=========================================================
+
+Questions reconnues (réponse locale) et questions libres ou ambiguës, qui
+doivent rester confiées au modèle (parse_intent retourne None) ; lecture
+des montants de coûts.
+"""
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from app.analytics import (
+    parse_intent, INTENT_COUNT, INTENT_BEST_COVERAGE, INTENT_CHEAPEST_TCO, INTENT_LOCATION
+)
+
+RECOGNIZED = [
+    ("Combien d'exigences ?", INTENT_COUNT, {"what": "exigences"}),
+    ("Combien y a-t-il d'entreprises ?", INTENT_COUNT, {"what": "entreprises"}),
+    ("Combien de solutions au total ?", INTENT_COUNT, {"what": "solutions"}),
+    ("Quel est le nombre de domaines ?", INTENT_COUNT, {"what": "domaines"}),
+    ("How many requirements are there?", INTENT_COUNT, {"what": "requirements"}),
+    ("Quelle solution répond au plus d'exigences ?", INTENT_BEST_COVERAGE, {"subject": "solution"}),
+    ("Quelle entreprise répond au plus d'exigences dans le domaine Sécurité ?", INTENT_BEST_COVERAGE,
+     {"subject": "entreprise", "domain": "securite"}),
+    ("Quelles sont les 3 entreprises qui couvrent le plus d'exigences ?", INTENT_BEST_COVERAGE,
+     {"subject": "entreprises", "n": "3"}),
+    ("Quelle est l'entreprise qui a la meilleure couverture des exigences ?", INTENT_BEST_COVERAGE,
+     {"subject": "entreprise"}),
+    ("Which solution meets the most requirements in Domaine Sécurité?", INTENT_BEST_COVERAGE,
+     {"subject": "solution", "domain": "securite"}),
+    ("Quelle est la solution la moins chère ?", INTENT_CHEAPEST_TCO, {}),
+    ("Quelles sont les 3 solutions les moins chères sur 10 ans ?", INTENT_CHEAPEST_TCO, {"n": "3", "years": "10"}),
+    ("Quelle solution a le coût total de possession le plus bas sur 7 ans ?", INTENT_CHEAPEST_TCO, {"years": "7"}),
+    ("cheapest 5-year TCO", INTENT_CHEAPEST_TCO, {"years": "5"}),
+    ("Quelles entreprises ont leur siège au Québec ?", INTENT_LOCATION, {"place": "quebec"}),
+    ("Quelles entreprises sont situées en France ?", INTENT_LOCATION, {"place": "france"}),
+    ("Quelle entreprise a son siège social à Montréal ?", INTENT_LOCATION, {"place": "montreal"}),
+    ("Companies headquartered in Québec", INTENT_LOCATION, {"place": "quebec"}),
+]
+
+FREE_FORM = [
+    "Combien coûte la solution Acme ?",
+    "Combien d'exigences Acme ne couvre-t-elle pas ?",
+    "Combien de solutions proposent une API ?",
+    "Quelles exigences sont les plus critiques ?",
+    "Quelle est la couverture géographique d'Acme ?",
+    "Quelle entreprise est située le plus loin de Montréal ?",
+    "Quelles solutions sont basées en France ?",
+    "Pourquoi la solution Acme est-elle la moins chère ?",
+    "Quelle solution répond au plus d'exigences de sécurité selon vous, et pourquoi ?",
+    "Explique-moi la stratégie de l'entreprise Acme",
+    "",
+]
+
+
+@pytest.mark.parametrize("question, intent, params", RECOGNIZED)
+def test_recognized_questions(question, intent, params):
+    assert parse_intent(question) == (intent, params)
+
+
+@pytest.mark.parametrize("question", FREE_FORM)
+def test_free_form_questions_go_to_the_model(question):
+    assert parse_intent(question) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12 500 $", 12500.0),
+    ("12,500 $", 12500.0),
+    ("$12,500.00", 12500.0),
+    ("1.250.000 €", 1250000.0),
+    ("1 234,56", 1234.56),
+    ("12,5 k$", 12.5),
+])
+def test_amounts_strip_thousands_separators(text, expected):
+    import pandas as pd
+    from app.analytics import _amounts
+    assert _amounts(pd.Series([text])).iloc[0] == pytest.approx(expected)
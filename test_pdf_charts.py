@@ -0,0 +1,31 @@
+"""
+Graphiques du rapport PDF (app.pdf_charts)
+==========================================
+
+Chaque moteur (images matplotlib, dessins vectoriels ReportLab) doit
+retourner un flowable ReportLab, y compris quand le PNG vient du cache.
+"""
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("reportlab")
+
+from reportlab.platypus import Flowable
+
+from app.pdf_charts import CHART_GENERATORS, CHART_BACKEND_RASTER, CHART_BACKEND_VECTOR
+
+DF_ENT = pd.DataFrame({
+    "Entreprise": ["Acme", "Bravo", "Cobalt"],
+    "Secteur d'activité": ["Informatique", "Informatique", "Conseil"],
+})
+
+
+@pytest.mark.parametrize("backend", [CHART_BACKEND_RASTER, CHART_BACKEND_VECTOR])
+def test_companies_chart_returns_flowable(backend):
+    if backend == CHART_BACKEND_RASTER:
+        pytest.importorskip("matplotlib")
+    generator = CHART_GENERATORS[backend]()
+    for _ in range(2):
+        chart = generator.create_companies_chart(DF_ENT)
+        assert isinstance(chart, Flowable)
@@ -0,0 +1,36 @@
+"""
+Rapport PDF ReportLab (app.pdf_generator)
+=========================================
+
+Le générateur reçoit les sélections de l'utilisateur en paramètre (sans
+Streamlit) et replie les exigences de la matrice comparative en texte brut.
+"""
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("reportlab")
+
+from app.pdf_generator import generate_report_pdf, _wrapped_column
+
+DF_ENT = pd.DataFrame({"Entreprise": ["Acme", "Bravo"], "Secteur d'activité": ["Informatique", "Conseil"]})
+DF_SOL = pd.DataFrame({"Solution": ["Alpha"], "Catégorie": ["ERP"]})
+DF_COMP = pd.DataFrame({
+    "Exigence": ["Le système doit permettre la gestion des accès et des rôles", None],
+    "Domaine": ["Sécurité", "Sécurité"],
+    "Acme": ["Oui", "Partiel"],
+    "Bravo": ["Non", ""],
+})
+
+
+def test_generate_report_pdf_with_preferences():
+    preferences = {"selected_companies": ["Acme"], "solution_selected": ["Alpha"], "selected_categories": []}
+    buffer = generate_report_pdf(DF_ENT, DF_SOL, DF_COMP, chart_backend=None, preferences=preferences)
+    assert buffer.getvalue().startswith(b"%PDF")
+
+
+def test_wrapped_column_splits_long_requirements():
+    cells = _wrapped_column(DF_COMP, "Exigence", 60, 100)
+    assert "\n" in cells[0]
+    assert cells[0].replace("\n", " ") == DF_COMP.loc[0, "Exigence"]
+    assert cells[1] == "N/A"
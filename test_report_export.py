@@ -0,0 +1,26 @@
+"""
+Profils d'export des rapports HTML (app.report_export)
+======================================================
+
+Le profil « texte » retire les images, regroupe les styles répétés et
+compresse le document.
+"""
+
+import gzip
+
+from app.report_export import EXPORT_PROFILE_TEXT, apply_export_profile, get_export_profile
+
+HTML = (
+    '<html><head></head><body>'
+    '<p style="color: red">A</p><p style="color: red">B</p>'
+    '<img src="https://example.com/logo.png" alt="Logo">'
+    '</body></html>'
+)
+
+
+def test_text_profile_drops_images():
+    exported = apply_export_profile(HTML, get_export_profile(EXPORT_PROFILE_TEXT))
+    html = gzip.decompress(exported).decode("utf-8")
+    assert "<img" not in html
+    assert "A</p>" in html and "B</p>" in html
+    assert 'style="color: red"' not in html
@@ -0,0 +1,76 @@
+"""
+Rendu d'un rapport complet (app.report)
+=======================================
+
+Un classeur minimal (une entreprise, une solution, une exigence) est rendu
+de bout en bout : gabarits des fiches, section comparative et commande
+« build » de la ligne de commande.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+from app.pdf_generator_html import ReportRequest, generate_html_report
+from app.report import main
+
+COMPANY = "Acme Conseil"
+SOLUTION = "Alpha ERP"
+REQUIREMENT = "Authentification SSO"
+
+
+def _frames():
+    """Retourne les quatre feuilles minimales : comparatif, entreprises, alignement, solutions."""
+    df_comp = pd.DataFrame({"Exigence": [REQUIREMENT], "Domaine": ["Sécurité"], COMPANY: ["Oui"]})
+    df_ent = pd.DataFrame({
+        "Entreprise": [COMPANY],
+        "Secteur d'activité": ["Informatique"],
+        "Localisation": ["Paris"],
+        "Statut": ["PME"],
+    })
+    df_align = df_comp.copy()
+    df_sol = pd.DataFrame({"Solution": [SOLUTION], "Catégorie": ["ERP"], "Fournisseur": [COMPANY]})
+    return df_comp, df_ent, df_align, df_sol
+
+
+def test_generate_html_report_renders_cards():
+    df_comp, df_ent, df_align, df_sol = _frames()
+    request = ReportRequest(
+        df_ent=df_ent,
+        df_sol=df_sol,
+        df_comp=df_comp,
+        df_align=df_align,
+        selected_companies=[COMPANY],
+        selected_solution=SOLUTION,
+        selected_categories=[],
+        criteria_filters={},
+    )
+    html = generate_html_report(request)
+    assert COMPANY in html
+    assert SOLUTION in html
+    assert REQUIREMENT in html
+
+
+def test_build_command_writes_html(tmp_path):
+    df_comp, df_ent, df_align, df_sol = _frames()
+    workbook = tmp_path / "classeur.xlsx"
+    with pd.ExcelWriter(workbook, engine="openpyxl") as writer:
+        df_comp.to_excel(writer, sheet_name="Analyse comparative", index=False)
+        df_ent.to_excel(writer, sheet_name="Entreprises", index=False)
+        df_sol.to_excel(writer, sheet_name="Solutions", index=False)
+    output = tmp_path / "rapport.html"
+
+    main(["build", str(workbook), "-o", str(output), "--solution", SOLUTION])
+
+    html = output.read_text(encoding="utf-8")
+    assert COMPANY in html
+    assert SOLUTION in html
+
+
+def test_report_cli_does_not_import_streamlit():
+    code = "import sys, app.report; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0